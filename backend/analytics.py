@@ -1,5 +1,6 @@
 from typing import Any, Dict, List, Optional, Tuple
 import math
+import re
 from collections import Counter
 
 try:
@@ -172,3 +173,23 @@ def top_skills(vacancies: List[Dict[str, Any]], top_n: int = 20) -> List[Tuple[s
             if name:
                 counter[name.strip().lower()] += 1
     return counter.most_common(top_n)
+
+
+# Job-search status phrases that mark a resume as active
+ACTIVE_STATUS_PHRASES = (
+    "активно ищу работу",
+    "рассматриваю предложения",
+)
+# One precompiled alternation: a single pass over the text instead of one scan per phrase
+_ACTIVE_STATUS_RE = re.compile("|".join(re.escape(p) for p in ACTIVE_STATUS_PHRASES), re.IGNORECASE)
+
+
+def has_active_status(resume: Dict[str, Any]) -> bool:
+    """Return True if resume contains one of the active status phrases.
+    Checks explicit field `job_search_status` first, then falls back to `resume_text`/`title`.
+    """
+    for key in ("job_search_status", "resume_text", "title"):
+        val = resume.get(key)
+        if val and _ACTIVE_STATUS_RE.search(str(val)):
+            return True
+    return False
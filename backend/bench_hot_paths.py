@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the parsing and analytics hot paths.
+
+Runs every benchmark over a fixed, seeded corpus at several sizes and records
+throughput (items/s) and peak traced memory. Results are written as JSON so two
+runs can be compared:
+
+  python bench_hot_paths.py                          # 1k, 10k, 100k -> bench_results/hot_paths_<ts>.json
+  python bench_hot_paths.py --sizes 1000 10000 --only salary_stats top_skills
+  python bench_hot_paths.py --compare bench_results/old.json bench_results/new.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from hh_parser_ver2 import (
+    _parse_ruble_amount,
+    compute_employer_marks,
+    estimate_monthly_salary_from_text,
+    extract_vacancy_fields,
+    html_to_text,
+    parse_vacancies,
+    slim_vacancy,
+)
+from analytics import salary_stats, hourly_rate_stats, top_skills
+from hourly_rate_parser import extract_salary_from_text
+from synthetic_corpus import generate_vacancies
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+RESULTS_DIR = Path(__file__).resolve().parent / "bench_results"
+CORPUS_SEED = 20240901
+# Regression threshold used by --compare
+REGRESSION_RATIO = 1.10
+
+_RUBLE_SAMPLES = ["3 500", "4,5 тыс", "3.500", "5000", "4.5 т.р", "12к", "2 500 руб"]
+
+
+def build_corpus(size: int) -> Dict[str, Any]:
+    """Fixed inputs for one size: raw items, slim items, parsed items and text samples."""
+    raw = list(generate_vacancies(size, seed=CORPUS_SEED))
+    items = [slim_vacancy(v) for v in raw]
+    parsed = [extract_vacancy_fields(v) for v in items]
+    texts = [
+        " ".join([v.get("name") or "", (v.get("snippet") or {}).get("responsibility") or ""])
+        for v in items
+    ]
+    return {
+        "items": items,
+        "parsed": parsed,
+        "texts": texts,
+        "html": [v.get("description") or "" for v in raw],
+        "ruble": [_RUBLE_SAMPLES[i % len(_RUBLE_SAMPLES)] for i in range(size)],
+    }
+
+
+def _estimate_all(c: Dict[str, Any]) -> None:
+    for v in c["items"]:
+        snippet = v.get("snippet") or {}
+        estimate_monthly_salary_from_text(v.get("name") or "", snippet.get("responsibility") or "", snippet.get("requirement"), "")
+
+
+BENCHMARKS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "estimate_monthly_salary_from_text": _estimate_all,
+    "_parse_ruble_amount": lambda c: [_parse_ruble_amount(s, s) for s in c["ruble"]],
+    "extract_vacancy_fields": lambda c: [extract_vacancy_fields(v) for v in c["items"]],
+    "parse_vacancies": lambda c: asyncio.run(parse_vacancies(c["items"], with_employer_mark=True)),
+    "compute_employer_marks": lambda c: compute_employer_marks(c["parsed"]),
+    "salary_stats": lambda c: salary_stats(c["parsed"]),
+    "hourly_rate_stats": lambda c: hourly_rate_stats(c["parsed"]),
+    "top_skills": lambda c: top_skills(c["items"]),
+    "html_to_text": lambda c: [html_to_text(h) for h in c["html"]],
+    "hourly_rate_parser.extract_salary_from_text": lambda c: [extract_salary_from_text(t) for t in c["texts"]],
+}
+
+
+def run_one(name: str, fn: Callable[[Dict[str, Any]], Any], corpus: Dict[str, Any], size: int, repeat: int = 3) -> Dict[str, Any]:
+    # Best-of-N timing without tracemalloc overhead
+    elapsed = float("inf")
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn(corpus)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    # Separate run for peak memory
+    tracemalloc.start()
+    fn(corpus)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "name": name,
+        "size": size,
+        "repeat": repeat,
+        "seconds": round(elapsed, 6),
+        "items_per_second": round(size / elapsed, 1) if elapsed > 0 else None,
+        "peak_bytes": peak,
+    }
+
+
+def run_suite(sizes: List[int], only: Optional[List[str]] = None, repeat: int = 3) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    for size in sizes:
+        print(f"📦 Building corpus of {size} items...")
+        corpus = build_corpus(size)
+        for name, fn in BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            res = run_one(name, fn, corpus, size, repeat=repeat)
+            results.append(res)
+            print(f"   {name:<45} {res['items_per_second'] or 0:>12,.0f} items/s  peak {res['peak_bytes'] / 1024 / 1024:8.2f} MiB")
+    return {
+        "suite": "hot_paths",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "corpus_seed": CORPUS_SEED,
+        "results": results,
+    }
+
+
+def compare(old_path: str, new_path: str) -> int:
+    """Print per-benchmark ratios; returns the number of regressions."""
+    old = {(r["name"], r["size"]): r for r in json.loads(Path(old_path).read_text(encoding="utf-8"))["results"]}
+    new = {(r["name"], r["size"]): r for r in json.loads(Path(new_path).read_text(encoding="utf-8"))["results"]}
+    regressions = 0
+    for key in sorted(new):
+        if key not in old:
+            continue
+        o, n = old[key], new[key]
+        t_ratio = n["seconds"] / o["seconds"] if o["seconds"] else float("inf")
+        m_ratio = n["peak_bytes"] / o["peak_bytes"] if o["peak_bytes"] else float("inf")
+        flag = ""
+        if t_ratio > REGRESSION_RATIO or m_ratio > REGRESSION_RATIO:
+            flag = "  ⚠️ regression"
+            regressions += 1
+        print(f"{key[0]:<45} {key[1]:>7}  time x{t_ratio:5.2f}  mem x{m_ratio:5.2f}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hot-path benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--only", nargs="+", default=None, help="benchmark names to run")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per benchmark (best is kept)")
+    parser.add_argument("--output", default=None, help="result JSON path")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+
+    report = run_suite(args.sizes, args.only, args.repeat)
+    out = Path(args.output) if args.output else RESULTS_DIR / f"hot_paths_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n✅ Results saved to: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for vacancy ingestion: raw hh.ru items vs slimmed items.
+Builds N hh.ru-shaped items (10k by default) and measures resident size with tracemalloc.
+
+Usage: python bench_ingest_memory.py [count]
+"""
+
+import sys
+import tracemalloc
+from typing import Any, Dict, List
+
+from hh_parser_ver2 import slim_vacancy
+
+
+def make_raw_item(i: int) -> Dict[str, Any]:
+    """Build one hh.ru-shaped vacancy item with the usual bulky extras."""
+    eid = str(1000 + i % 300)
+    return {
+        "id": str(90000000 + i),
+        "premium": False,
+        "name": f"Водитель автобуса {i}",
+        "department": None,
+        "has_test": False,
+        "response_letter_required": False,
+        "area": {"id": "2", "name": "Санкт-Петербург", "url": "https://api.hh.ru/areas/2"},
+        "salary": {"from": 60000 + (i % 50) * 1000, "to": None, "currency": "RUR", "gross": False},
+        "type": {"id": "open", "name": "Открытая"},
+        "address": {
+            "city": "Санкт-Петербург", "street": "Московский проспект", "building": str(i % 200),
+            "lat": 59.85, "lng": 30.32, "description": None, "raw": f"Санкт-Петербург, Московский проспект, {i % 200}",
+            "metro": {"station_name": "Московская", "line_name": "Московско-Петроградская", "station_id": "16.221", "line_id": "16", "lat": 59.85, "lng": 30.32},
+            "metro_stations": [{"station_name": "Московская", "line_name": "Московско-Петроградская", "station_id": "16.221", "line_id": "16", "lat": 59.85, "lng": 30.32}],
+            "id": str(5000000 + i),
+        },
+        "response_url": None,
+        "sort_point_distance": None,
+        "published_at": "2026-10-01T10:00:00+0300",
+        "created_at": "2026-10-01T10:00:00+0300",
+        "archived": False,
+        "apply_alternate_url": f"https://hh.ru/applicant/vacancy_response?vacancyId={90000000 + i}",
+        "insider_interview": None,
+        "url": f"https://api.hh.ru/vacancies/{90000000 + i}?host=hh.ru",
+        "adv_response_url": f"https://api.hh.ru/vacancies/{90000000 + i}/adv_response?host=hh.ru",
+        "alternate_url": f"https://hh.ru/vacancy/{90000000 + i}",
+        "relations": [],
+        "employer": {
+            "id": eid, "name": f"Транспортная компания {eid}", "url": f"https://api.hh.ru/employers/{eid}",
+            "alternate_url": f"https://hh.ru/employer/{eid}",
+            "logo_urls": {"90": f"https://img.hhcdn.ru/employer-logo/{eid}_90.png", "240": f"https://img.hhcdn.ru/employer-logo/{eid}_240.png", "original": f"https://img.hhcdn.ru/employer-logo-original/{eid}.png"},
+            "vacancies_url": f"https://api.hh.ru/vacancies?employer_id={eid}", "accredited_it_employer": False, "trusted": True,
+        },
+        "snippet": {"requirement": "Права категории D. Опыт работы от 1 года.", "responsibility": "Перевозка пассажиров по маршруту. Оплата 4500 руб за смену."},
+        "contacts": None,
+        "schedule": {"id": "shift", "name": "Сменный график"},
+        "working_days": [],
+        "working_time_intervals": [],
+        "working_time_modes": [],
+        "accept_temporary": False,
+        "professional_roles": [{"id": "21", "name": "Водитель"}],
+        "accept_incomplete_resumes": True,
+        "experience": {"id": "between1And3", "name": "От 1 года до 3 лет"},
+        "employment": {"id": "full", "name": "Полная занятость"},
+        "adv_context": None,
+        "is_adv_vacancy": False,
+    }
+
+
+def measure(count: int, slim: bool) -> int:
+    """Return peak traced bytes for holding `count` ingested items."""
+    tracemalloc.start()
+    items: List[Dict[str, Any]] = []
+    for i in range(count):
+        raw = make_raw_item(i)
+        items.append(slim_vacancy(raw) if slim else raw)
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    raw_bytes = measure(count, slim=False)
+    slim_bytes = measure(count, slim=True)
+    print(f"📦 Items: {count}")
+    print(f"   raw:  {raw_bytes / 1024 / 1024:.1f} MiB ({raw_bytes / count:.0f} B/item)")
+    print(f"   slim: {slim_bytes / 1024 / 1024:.1f} MiB ({slim_bytes / count:.0f} B/item)")
+    if raw_bytes:
+        print(f"   saved: {(1 - slim_bytes / raw_bytes) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
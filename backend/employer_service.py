@@ -0,0 +1,201 @@
+"""
+Employer metadata service: name, trusted flag and rating per employer id.
+
+Entries live in the local store database with a long TTL. Missing or stale
+employers are fetched in one batch over a pooled client with bounded
+concurrency, and a background task periodically refreshes stale entries.
+"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+try:
+    from .hh_parser_ver2 import HH_EMPLOYER_URL, scrape_employer_mark
+    from . import vacancy_store
+    from .metrics import UPSTREAM_EVENT_HOOKS, UpstreamTransport, record_cache
+except Exception:
+    from hh_parser_ver2 import HH_EMPLOYER_URL, scrape_employer_mark
+    import vacancy_store
+    from metrics import UPSTREAM_EVENT_HOOKS, UpstreamTransport, record_cache
+
+EMPLOYER_TTL_SECONDS = int(os.getenv("EMPLOYER_TTL_SECONDS", str(7 * 24 * 3600)))
+EMPLOYER_FETCH_CONCURRENCY = int(os.getenv("EMPLOYER_FETCH_CONCURRENCY", "8"))
+# Background refresh interval; 0 disables the refresher
+EMPLOYER_REFRESH_SECONDS = int(os.getenv("EMPLOYER_REFRESH_SECONDS", "3600"))
+EMPLOYER_REFRESH_BATCH = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS employers (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    trusted INTEGER,
+    rating REAL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_employers_fetched ON employers(fetched_at);
+"""
+
+_initialized: set = set()
+
+
+def _connect(path: Optional[Path] = None):
+    conn = vacancy_store.connect(path)
+    key = str(path or vacancy_store.STORE_PATH)
+    if key not in _initialized:
+        conn.executescript(_SCHEMA)
+        _initialized.add(key)
+    return conn
+
+
+def load_employers(ids: Iterable[str], path: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    """Return stored entries for the given ids (fresh or not)."""
+    id_list = [str(i) for i in ids if i]
+    out: Dict[str, Dict[str, Any]] = {}
+    conn = _connect(path)
+    try:
+        for start in range(0, len(id_list), 500):
+            chunk = id_list[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in conn.execute(f"SELECT * FROM employers WHERE id IN ({placeholders})", chunk):
+                out[row["id"]] = dict(row)
+    finally:
+        conn.close()
+    return out
+
+
+def save_employers(entries: List[Dict[str, Any]], path: Optional[Path] = None) -> None:
+    now = time.time()
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO employers (id, name, trusted, rating, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        e["id"],
+                        e.get("name"),
+                        None if e.get("trusted") is None else int(bool(e.get("trusted"))),
+                        e.get("rating"),
+                        now,
+                    )
+                    for e in entries
+                ],
+            )
+    finally:
+        conn.close()
+
+
+def stale_employer_ids(max_age: int, limit: int, path: Optional[Path] = None) -> List[str]:
+    """Oldest stored employers whose entry is older than `max_age` seconds."""
+    conn = _connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT id FROM employers WHERE fetched_at < ? ORDER BY fetched_at LIMIT ?",
+            (time.time() - max_age, limit),
+        ).fetchall()
+        return [r["id"] for r in rows]
+    finally:
+        conn.close()
+
+
+def _rating_from(data: Dict[str, Any]) -> Optional[float]:
+    rating = data.get("rating") or data.get("score") or data.get("scores")
+    return float(rating) if isinstance(rating, (int, float)) else None
+
+
+async def fetch_employers_batch(
+    ids: Iterable[str],
+    concurrency: int = EMPLOYER_FETCH_CONCURRENCY,
+    scrape_missing: bool = False,
+) -> List[Dict[str, Any]]:
+    """Fetch employer resources concurrently over one pooled client.
+    With `scrape_missing`, employers without an API rating fall back to the
+    public page scrape. Only answers are returned: 200 entries and 404s as empty
+    "not found" entries. Failed lookups (429, 5xx, timeouts) are left out so they
+    are not cached and get retried on the next call.
+    """
+    id_list = [str(i) for i in ids if i]
+    if not id_list:
+        return []
+    sem = asyncio.Semaphore(concurrency)
+    headers = {"User-Agent": "job-analytics-bot/1.0"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=15.0, headers=headers, transport=UpstreamTransport(limits=limits), event_hooks=UPSTREAM_EVENT_HOOKS) as client:
+        async def _one(eid: str) -> Optional[Dict[str, Any]]:
+            entry: Dict[str, Any] = {"id": eid, "name": None, "trusted": None, "rating": None}
+            async with sem:
+                try:
+                    r = await client.get(HH_EMPLOYER_URL.format(employer_id=eid))
+                except Exception:
+                    return None
+                if r.status_code == 404:
+                    return entry
+                if r.status_code != 200:
+                    return None
+                try:
+                    data = r.json()
+                except Exception:
+                    return None
+                entry["name"] = data.get("name")
+                entry["trusted"] = data.get("trusted")
+                entry["rating"] = _rating_from(data)
+                if entry["rating"] is None and scrape_missing:
+                    entry["rating"] = await scrape_employer_mark(eid)
+            return entry
+
+        results = await asyncio.gather(*[_one(eid) for eid in id_list])
+    return [e for e in results if e is not None]
+
+
+async def get_employers(
+    ids: Iterable[str],
+    max_age: int = EMPLOYER_TTL_SECONDS,
+    scrape_missing: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    """Employer metadata for ids, served from the store and fetching only missing/stale ones.
+    When a refetch fails, a stale stored entry is still returned.
+    """
+    id_set = {str(i) for i in ids if i}
+    stored = await asyncio.to_thread(load_employers, id_set)
+    now = time.time()
+    to_fetch = [eid for eid in id_set if eid not in stored or now - stored[eid]["fetched_at"] > max_age]
+    record_cache("employers", hits=len(id_set) - len(to_fetch), misses=len(to_fetch))
+    if to_fetch:
+        fetched = await fetch_employers_batch(to_fetch, scrape_missing=scrape_missing)
+        await asyncio.to_thread(save_employers, fetched)
+        for e in fetched:
+            stored[e["id"]] = e
+    return {eid: stored[eid] for eid in id_set if eid in stored}
+
+
+async def get_employer_ratings(ids: Iterable[str], scrape_missing: bool = False) -> Dict[str, Optional[float]]:
+    entries = await get_employers(ids, scrape_missing=scrape_missing)
+    return {eid: e.get("rating") for eid, e in entries.items()}
+
+
+async def refresh_stale_employers(max_age: int = EMPLOYER_TTL_SECONDS, batch: int = EMPLOYER_REFRESH_BATCH) -> int:
+    """Re-fetch up to `batch` stale employers. Returns how many were refreshed."""
+    ids = await asyncio.to_thread(stale_employer_ids, max_age, batch)
+    if not ids:
+        return 0
+    fetched = await fetch_employers_batch(ids)
+    await asyncio.to_thread(save_employers, fetched)
+    return len(fetched)
+
+
+async def refresh_loop(interval: int = EMPLOYER_REFRESH_SECONDS) -> None:
+    """Background task: refresh stale employers every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            refreshed = await refresh_stale_employers()
+            if refreshed:
+                print(f"Refreshed {refreshed} stale employers")
+        except Exception as e:
+            print(f"Employer refresh failed: {e}")
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Offline hh.ru stand-in for benchmarks, load tests and local development.
+
+Serves the API and site routes the fetchers use from one ASGI app:
+  GET /vacancies            search with paging, text/area/employer/date filters, 2,000-item cap,
+                            per_page=0 counts and clusters=true facets
+  GET /vacancies/{id}       vacancy detail (description HTML, key_skills)
+  GET /employers/{id}       employer resource (name, trusted, rating)
+  GET /employer/{id}        employer HTML page with the rating widget
+  GET /vacancy/{id}         vacancy HTML page
+  GET /resume/{id}          public resume HTML page
+  GET /resumes/{id}         resume detail JSON
+
+Responses come from a recorded cassette when one matches, otherwise from a
+seeded synthetic corpus. Latency, error rate and 429 injection are configurable.
+In record mode every request is proxied to the real hh.ru and captured into a
+gzip-compressed NDJSON cassette.
+
+Point the backend at it with:
+  HH_API_BASE=http://127.0.0.1:9001 HH_SITE_BASE=http://127.0.0.1:9001
+
+Usage:
+  python fake_hh.py [--port 9001] [--vacancies 5000] [--seed 42] [--latency-ms 50]
+                    [--error-rate 0.0] [--rate-429 0.0] [--cassette path.ndjson.gz] [--record]
+                    [--corpus corpus.ndjson.gz]
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+
+try:
+    from .synthetic_corpus import TITLES, generate_vacancies, read_ndjson
+except Exception:
+    from synthetic_corpus import TITLES, generate_vacancies, read_ndjson
+
+HH_SEARCH_DEPTH = 2000
+
+REAL_API_BASE = "https://api.hh.ru"
+REAL_SITE_BASE = "https://hh.ru"
+# Paths served by hh.ru itself rather than api.hh.ru
+SITE_PREFIXES = ("/employer/", "/vacancy/", "/resume/")
+
+
+class FakeHHConfig:
+    def __init__(
+        self,
+        vacancies: int = 5000,
+        seed: int = 42,
+        latency_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_429: float = 0.0,
+        cassette: Optional[str] = None,
+        record: bool = False,
+        public_base: str = "http://127.0.0.1:9001",
+        corpus_path: Optional[str] = None,
+    ):
+        self.vacancies = vacancies
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.cassette = cassette
+        self.record = record
+        self.public_base = public_base.rstrip("/")
+        self.corpus_path = corpus_path
+
+    @classmethod
+    def from_env(cls) -> "FakeHHConfig":
+        return cls(
+            vacancies=int(os.getenv("FAKE_HH_VACANCIES", "5000")),
+            seed=int(os.getenv("FAKE_HH_SEED", "42")),
+            latency_ms=float(os.getenv("FAKE_HH_LATENCY_MS", "0")),
+            error_rate=float(os.getenv("FAKE_HH_ERROR_RATE", "0")),
+            rate_429=float(os.getenv("FAKE_HH_429_RATE", "0")),
+            cassette=os.getenv("FAKE_HH_CASSETTE") or None,
+            record=os.getenv("FAKE_HH_RECORD", "") == "1",
+            public_base=os.getenv("FAKE_HH_PUBLIC_BASE", "http://127.0.0.1:9001"),
+            corpus_path=os.getenv("FAKE_HH_CORPUS") or None,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Cassette (record / replay)
+# ---------------------------------------------------------------------------
+
+def _cassette_key(path: str, query: List[Tuple[str, str]]) -> str:
+    return path + "?" + "&".join(f"{k}={v}" for k, v in sorted(query))
+
+
+class Cassette:
+    """gzip-compressed NDJSON of {"key", "status", "content_type", "body"} entries."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def add(self, key: str, status: int, content_type: str, body: str) -> None:
+        entry = {"key": key, "status": status, "content_type": content_type, "body": body}
+        with self._lock:
+            self.entries[key] = entry
+            if self.path:
+                with gzip.open(self.path, "at", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+def synthetic_vacancies(count: int, seed: int, site_base: str, api_base: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Deterministic hh.ru-shaped corpus (full items incl. description/key_skills), dated up to now."""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    return list(generate_vacancies(count, seed=seed, reference_time=now, site_base=site_base, api_base=api_base or site_base))
+
+
+def _parse_dt(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _search_view(v: Dict[str, Any]) -> Dict[str, Any]:
+    """Search results omit detail-only fields, like the real API."""
+    return {k: val for k, val in v.items() if k not in ("description", "key_skills")}
+
+
+# Salary facet thresholds, reported cumulatively ("от N ₽") like hh.ru
+_SALARY_CLUSTER_STEPS = (30000, 50000, 80000, 120000, 160000, 200000)
+
+
+def _clusters(res: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """hh.ru-style `clusters` facets over all matching vacancies (not just the page)."""
+    out: List[Dict[str, Any]] = []
+    for cid, name in (("schedule", "График работы"), ("experience", "Опыт работы"), ("employment", "Тип занятости")):
+        counts: Dict[str, int] = {}
+        for v in res:
+            label = (v.get(cid) or {}).get("name")
+            if label:
+                counts[label] = counts.get(label, 0) + 1
+        items = [{"name": label, "count": n} for label, n in sorted(counts.items(), key=lambda kv: -kv[1])]
+        out.append({"id": cid, "name": name, "items": items})
+    amounts = []
+    for v in res:
+        sal = v.get("salary") or {}
+        values = [x for x in (sal.get("from"), sal.get("to")) if isinstance(x, (int, float))]
+        if values:
+            amounts.append(max(values))
+    items = [{"name": "Указан доход", "count": len(amounts)}]
+    items += [{"name": f"от {step:,} ₽".replace(",", " "), "count": sum(1 for a in amounts if a >= step)} for step in _SALARY_CLUSTER_STEPS]
+    out.append({"id": "salary", "name": "Уровень дохода", "items": items})
+    return out
+
+
+# ---------------------------------------------------------------------------
+# App
+# ---------------------------------------------------------------------------
+
+def create_app(config: Optional[FakeHHConfig] = None, corpus: Optional[List[Dict[str, Any]]] = None) -> FastAPI:
+    cfg = config or FakeHHConfig.from_env()
+    app = FastAPI(title="hh.ru stand-in")
+    cassette = Cassette(cfg.cassette)
+    if corpus is not None:
+        vacancies = corpus
+    elif cfg.corpus_path:
+        # Pre-generated corpus (synthetic_corpus.py --output); newest first like the search API
+        vacancies = sorted(read_ndjson(cfg.corpus_path), key=lambda v: v.get("published_at") or "", reverse=True)
+    else:
+        vacancies = synthetic_vacancies(cfg.vacancies, cfg.seed, cfg.public_base)
+    by_id = {v["id"]: v for v in vacancies}
+    rnd = random.Random(cfg.seed)
+    stats: Dict[str, int] = {"requests": 0, "errors": 0, "throttled": 0, "replayed": 0, "recorded": 0}
+    app.state.config = cfg
+    app.state.stats = stats
+    app.state.vacancies = vacancies
+
+    @app.middleware("http")
+    async def _faults_and_cassette(request: Request, call_next):
+        if request.url.path.startswith("/_fake"):
+            return await call_next(request)
+        stats["requests"] += 1
+        if cfg.latency_ms > 0:
+            await asyncio.sleep(rnd.expovariate(1.0 / cfg.latency_ms) / 1000.0)
+        if cfg.rate_429 > 0 and rnd.random() < cfg.rate_429:
+            stats["throttled"] += 1
+            return JSONResponse({"errors": [{"type": "too_many_requests"}]}, status_code=429, headers={"Retry-After": "1"})
+        if cfg.error_rate > 0 and rnd.random() < cfg.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"errors": [{"type": "server_error"}]}, status_code=503)
+
+        key = _cassette_key(request.url.path, list(request.query_params.multi_items()))
+        if cfg.record:
+            base = REAL_SITE_BASE if request.url.path.startswith(SITE_PREFIXES) else REAL_API_BASE
+            async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, headers={"User-Agent": "job-analytics-bot/1.0"}) as client:
+                upstream = await client.get(base + request.url.path, params=list(request.query_params.multi_items()))
+            content_type = upstream.headers.get("content-type", "application/json")
+            cassette.add(key, upstream.status_code, content_type, upstream.text)
+            stats["recorded"] += 1
+            return Response(upstream.content, status_code=upstream.status_code, media_type=content_type)
+        entry = cassette.get(key)
+        if entry is not None:
+            stats["replayed"] += 1
+            return Response(entry["body"], status_code=entry["status"], media_type=entry["content_type"])
+        return await call_next(request)
+
+    @app.get("/_fake/stats")
+    async def fake_stats():
+        return {**stats, "corpus_size": len(vacancies), "cassette_entries": len(cassette.entries)}
+
+    @app.get("/vacancies")
+    async def search(request: Request):
+        q = request.query_params
+        per_page = min(int(q.get("per_page", 20)), 100)
+        page = int(q.get("page", 0))
+        text = (q.get("text") or "").strip().lower()
+        res = vacancies
+        if text:
+            words = text.split()
+            res = [v for v in res if all(w in (v["name"] + " " + (v["snippet"].get("responsibility") or "")).lower() for w in words)]
+        if q.get("area"):
+            res = [v for v in res if v["area"]["id"] == str(q.get("area"))]
+        if q.get("employer_id"):
+            res = [v for v in res if v["employer"]["id"] == str(q.get("employer_id"))]
+        date_from = _parse_dt(q["date_from"]) if q.get("date_from") else None
+        date_to = _parse_dt(q["date_to"]) if q.get("date_to") else None
+        if date_from or date_to:
+            def _in_window(v: Dict[str, Any]) -> bool:
+                dt = datetime.strptime(v["published_at"], "%Y-%m-%dT%H:%M:%S%z")
+                return (date_from is None or dt >= date_from) and (date_to is None or dt < date_to)
+            res = [v for v in res if _in_window(v)]
+        found = len(res)
+        reachable = res[:HH_SEARCH_DEPTH]
+        pages = -(-len(reachable) // per_page) if per_page else 0
+        if page * per_page >= HH_SEARCH_DEPTH:
+            return JSONResponse({"errors": [{"type": "bad_argument", "value": "page"}]}, status_code=400)
+        items = [_search_view(v) for v in reachable[page * per_page:(page + 1) * per_page]]
+        body = {"found": found, "pages": pages, "page": page, "per_page": per_page, "items": items}
+        if q.get("clusters") == "true":
+            body["clusters"] = _clusters(res)
+        return body
+
+    @app.get("/vacancies/{vacancy_id}")
+    async def vacancy_detail(vacancy_id: str):
+        v = by_id.get(vacancy_id)
+        if v is None:
+            return JSONResponse({"errors": [{"type": "not_found"}]}, status_code=404)
+        return v
+
+    @app.get("/vacancy/{vacancy_id}", response_class=HTMLResponse)
+    async def vacancy_page(vacancy_id: str):
+        v = by_id.get(vacancy_id)
+        if v is None:
+            return HTMLResponse("<html><body>Not found</body></html>", status_code=404)
+        return HTMLResponse(f'<html><body><div data-qa="vacancy-description">{v["description"]}</div></body></html>')
+
+    def _employer(eid: str) -> Dict[str, Any]:
+        er = random.Random(f"{cfg.seed}:{eid}")
+        return {"id": eid, "name": f"Компания {eid}", "trusted": er.random() < 0.8, "rating": round(er.uniform(2.5, 5.0), 1) if er.random() < 0.7 else None}
+
+    @app.get("/employers/{employer_id}")
+    async def employer_detail(employer_id: str):
+        return _employer(employer_id)
+
+    @app.get("/employer/{employer_id}", response_class=HTMLResponse)
+    async def employer_page(employer_id: str):
+        e = _employer(employer_id)
+        widget = f'<div data-qa="employer-review-small-widget-total-rating">{str(e["rating"]).replace(".", ",")}</div>' if e["rating"] else ""
+        return HTMLResponse(f"<html><body><h1>{e['name']}</h1>{widget}</body></html>")
+
+    def _resume(rid: str) -> Dict[str, Any]:
+        rr = random.Random(f"{cfg.seed}:resume:{rid}")
+        status = rr.choice(["Активно ищу работу", "Рассматриваю предложения", "Не ищу работу"])
+        return {"id": rid, "title": rr.choice(TITLES)[0], "job_search_status": {"name": status}, "skills": [{"name": "Ответственность"}]}
+
+    @app.get("/resumes/{resume_id}")
+    async def resume_detail(resume_id: str):
+        return _resume(resume_id)
+
+    @app.get("/resume/{resume_id}", response_class=HTMLResponse)
+    async def resume_page(resume_id: str):
+        r = _resume(resume_id)
+        return HTMLResponse(f'<html><body><div data-qa="resume-block">{r["title"]}. {r["job_search_status"]["name"]}</div></body></html>')
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Offline hh.ru stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--vacancies", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--cassette", default=None, help="gzip NDJSON cassette to replay from / record into")
+    parser.add_argument("--record", action="store_true", help="proxy to the real hh.ru and record responses")
+    parser.add_argument("--corpus", default=None, help="NDJSON corpus from synthetic_corpus.py (overrides --vacancies/--seed)")
+    args = parser.parse_args()
+
+    cfg = FakeHHConfig(
+        vacancies=args.vacancies,
+        seed=args.seed,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        rate_429=args.rate_429,
+        cassette=args.cassette,
+        record=args.record,
+        public_base=f"http://{args.host}:{args.port}",
+        corpus_path=args.corpus,
+    )
+    print(f"🧪 hh.ru stand-in on http://{args.host}:{args.port} ({'recording' if cfg.record else 'serving'})")
+    uvicorn.run(create_app(cfg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,29 @@
+import asyncio
 import os
 import re
 import httpx
-from typing import Any, Dict, List, Optional, Tuple, Set
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Set
 from bs4 import BeautifulSoup
 
-HH_API_URL = "https://api.hh.ru/vacancies"
-HH_EMPLOYER_URL = "https://api.hh.ru/employers/{employer_id}"
-HH_EMPLOYER_PAGE = "https://hh.ru/employer/{employer_id}"
-HH_VACANCY_DETAIL_URL = "https://api.hh.ru/vacancies/{vacancy_id}"
+try:
+    from .metrics import ENRICHMENT_QUEUE_DEPTH, UPSTREAM_EVENT_HOOKS, UpstreamTransport, record_cache
+except Exception:
+    from metrics import ENRICHMENT_QUEUE_DEPTH, UPSTREAM_EVENT_HOOKS, UpstreamTransport, record_cache
+
+# Base URLs can be pointed at a local stand-in (see fake_hh.py) for benchmarks and tests
+HH_API_BASE = os.getenv("HH_API_BASE", "https://api.hh.ru").rstrip("/")
+HH_SITE_BASE = os.getenv("HH_SITE_BASE", "https://hh.ru").rstrip("/")
+
+HH_API_URL = f"{HH_API_BASE}/vacancies"
+HH_EMPLOYER_URL = HH_API_BASE + "/employers/{employer_id}"
+HH_EMPLOYER_PAGE = HH_SITE_BASE + "/employer/{employer_id}"
+HH_VACANCY_DETAIL_URL = HH_API_BASE + "/vacancies/{vacancy_id}"
 
 # Resume-related endpoints (public page and API detail)
-HH_RESUME_DETAIL_URL = "https://api.hh.ru/resumes/{resume_id}"
-HH_RESUME_PUBLIC_URL = "https://hh.ru/resume/{resume_id}"
-HH_RESUME_SEARCH_URL = "https://api.hh.ru/resumes"
+HH_RESUME_DETAIL_URL = HH_API_BASE + "/resumes/{resume_id}"
+HH_RESUME_PUBLIC_URL = HH_SITE_BASE + "/resume/{resume_id}"
+HH_RESUME_SEARCH_URL = f"{HH_API_BASE}/resumes"
 
 async def fetch_resume_ids_by_query(query: str, area: Optional[int] = None, pages: Optional[int] = 1, per_page: int = 50) -> List[str]:
     """
@@ -56,13 +67,223 @@ async def fetch_resume_ids_by_query(query: str, area: Optional[int] = None, page
     
     return resume_ids
 
-async def fetch_vacancies(query: str, area: Optional[int] = None, pages: Optional[int] = None, per_page: int = 100) -> List[Dict[str, Any]]:
+# Fields of a raw hh.ru vacancy item that are actually read downstream
+# (extract_vacancy_fields, the schedule filter, top_skills, hourly analysis).
+# None keeps the value as-is; a tuple keeps only those sub-keys of a nested dict.
+VACANCY_FIELD_WHITELIST: Dict[str, Optional[Tuple[str, ...]]] = {
+    "id": None,
+    "name": None,
+    "area": ("id", "name"),
+    "published_at": None,
+    "alternate_url": None,
+    "salary": ("from", "to", "currency", "gross"),
+    "experience": ("id", "name"),
+    "snippet": ("requirement", "responsibility"),
+    "employer": ("id", "name", "trusted"),
+    "schedule": ("id", "name"),
+    "key_skills": None,
+    "description": None,
+    "description_text": None,
+}
+
+
+def slim_vacancy(v: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of a raw vacancy item reduced to VACANCY_FIELD_WHITELIST.
+    Logos, addresses, contacts, employer URLs, professional roles etc. are dropped.
+    """
+    out: Dict[str, Any] = {}
+    for key, sub_keys in VACANCY_FIELD_WHITELIST.items():
+        if key not in v:
+            continue
+        val = v[key]
+        if sub_keys is not None and isinstance(val, dict):
+            val = {k: val[k] for k in sub_keys if k in val}
+        out[key] = val
+    return out
+
+
+# hh.ru never returns more than this many items for a single search
+HH_SEARCH_DEPTH = 2000
+# Concurrent search-page requests shared by all fetches in one event loop
+HH_SEARCH_CONCURRENCY = int(os.getenv("HH_SEARCH_CONCURRENCY", "4"))
+# Vacancies stay published for about 30 days; older ones go to a tail partition
+PARTITION_LOOKBACK_DAYS = 31
+# Windows shorter than this are not split further even if still over the cap
+PARTITION_MIN_WINDOW_SECONDS = 60
+
+_search_limiters: Dict[int, "asyncio.Semaphore"] = {}
+
+
+def _search_limiter() -> "asyncio.Semaphore":
+    """Semaphore limiting concurrent search requests within the running loop."""
+    loop = asyncio.get_running_loop()
+    sem = _search_limiters.get(id(loop))
+    if sem is None:
+        sem = asyncio.Semaphore(HH_SEARCH_CONCURRENCY)
+        _search_limiters.clear()
+        _search_limiters[id(loop)] = sem
+    return sem
+
+
+async def _search_page(client: httpx.AsyncClient, params: Dict[str, Any], page: int) -> Dict[str, Any]:
+    async with _search_limiter():
+        resp = await client.get(HH_API_URL, params={**params, "page": page})
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def _iter_search_pages(
+    client: httpx.AsyncClient,
+    params: Dict[str, Any],
+    first: Dict[str, Any],
+    pages: Optional[int] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Given page 0 of a search, yield its items and then the remaining pages
+    (requested in parallel) as they complete."""
+    yield first.get("items", [])
+    total_pages = int(first.get("pages", 0))
+    last = total_pages if pages is None else min(pages, total_pages)
+    tasks = [asyncio.ensure_future(_search_page(client, params, p)) for p in range(1, last)]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield (await fut).get("items", [])
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+async def _fetch_search_pages(
+    client: httpx.AsyncClient,
+    params: Dict[str, Any],
+    first: Dict[str, Any],
+    pages: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Given page 0 of a search, fetch the remaining pages in parallel."""
+    total_pages = int(first.get("pages", 0))
+    last = total_pages if pages is None else min(pages, total_pages)
+    rest = await asyncio.gather(*[_search_page(client, params, p) for p in range(1, last)])
+    items: List[Dict[str, Any]] = list(first.get("items", []))
+    for data in rest:
+        items.extend(data.get("items", []))
+    return items
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="seconds")
+
+
+async def _crawl_window(
+    client: httpx.AsyncClient,
+    params: Dict[str, Any],
+    window_from: datetime,
+    window_to: datetime,
+    meta: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield the pages of one published-date window, bisecting it while it exceeds
+    HH_SEARCH_DEPTH. Sub-windows are crawled one after another (newest first, like
+    hh.ru's default order), so at most one window's pages are in flight."""
+    window_params = {**params, "date_from": _iso(window_from), "date_to": _iso(window_to)}
+    first = await _search_page(client, window_params, 0)
+    found = int(first.get("found", 0))
+    span = (window_to - window_from).total_seconds()
+    if found <= HH_SEARCH_DEPTH or span <= PARTITION_MIN_WINDOW_SECONDS:
+        if found > HH_SEARCH_DEPTH and meta is not None:
+            # Over the cap even at the shortest window: the rest is unreachable
+            meta["truncated"] = True
+        async for page in _iter_search_pages(client, window_params, first):
+            yield page
+        return
+    mid = window_from + (window_to - window_from) / 2
+    for lo, hi in ((mid, window_to), (window_from, mid)):
+        async for page in _crawl_window(client, params, lo, hi, meta):
+            yield page
+
+
+async def _crawl_tail(
+    client: httpx.AsyncClient,
+    params: Dict[str, Any],
+    window_to: datetime,
+    span: timedelta,
+    meta: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield everything published before `window_to`. While that is over the cap,
+    the most recent `span` is crawled as a bounded window and the search moves
+    further back with a doubled span, so older vacancies are never cut off."""
+    while True:
+        tail_params = {**params, "date_to": _iso(window_to)}
+        first = await _search_page(client, tail_params, 0)
+        if int(first.get("found", 0)) <= HH_SEARCH_DEPTH:
+            async for page in _iter_search_pages(client, tail_params, first):
+                yield page
+            return
+        window_from = window_to - span
+        async for page in _crawl_window(client, params, window_from, window_to, meta):
+            yield page
+        window_to, span = window_from, span * 2
+
+
+async def iter_partitioned_pages(
+    client: httpx.AsyncClient,
+    params: Dict[str, Any],
+    date_from: Optional[str],
+    meta: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Split an oversized search into disjoint published-date windows and yield
+    their pages as they arrive. Only the ids seen so far are kept, to drop items
+    that move across a window boundary during the crawl."""
+    # Small margin so items published during the crawl are not cut off
+    now = datetime.now(timezone.utc) + timedelta(minutes=1)
+    start = datetime.fromisoformat(date_from) if date_from else now - timedelta(days=PARTITION_LOOKBACK_DAYS)
+    base = {k: v for k, v in params.items() if k not in ("date_from", "date_to")}
+    parts = [_crawl_window(client, base, start, now, meta)]
+    if not date_from:
+        # Anything published before the lookback window, itself partitioned when over the cap
+        parts.append(_crawl_tail(client, base, start, timedelta(days=PARTITION_LOOKBACK_DAYS), meta))
+    seen: Set[str] = set()
+    for part in parts:
+        async for page in part:
+            fresh = [v for v in page if v.get("id") not in seen]
+            seen.update(v.get("id") for v in fresh)
+            if fresh:
+                yield fresh
+
+
+async def _crawl_partitioned(
+    client: httpx.AsyncClient,
+    params: Dict[str, Any],
+    date_from: Optional[str],
+    meta: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Split an oversized search into disjoint published-date windows and merge them."""
+    merged: List[Dict[str, Any]] = []
+    async for page in iter_partitioned_pages(client, params, date_from, meta):
+        merged.extend(page)
+    return merged
+
+
+async def fetch_vacancies(
+    query: str,
+    area: Optional[int] = None,
+    pages: Optional[int] = None,
+    per_page: int = 100,
+    raw: bool = False,
+    date_from: Optional[str] = None,
+    meta: Optional[Dict[str, Any]] = None,
+    partition: bool = True,
+) -> List[Dict[str, Any]]:
     """
     Fetch vacancies from hh.ru public API.
     - query: search text
     - area: region id (e.g., 1 for Moscow, 2 for Saint-Petersburg)
     - pages: number of pages to fetch (each page has per_page items)
     - per_page: items per page (max 100)
+    - raw: keep complete hh.ru item dicts; by default items are slimmed with `slim_vacancy`
+    - date_from: only vacancies published at or after this ISO 8601 timestamp
+    - meta: optional dict filled with the search's 'found' and 'pages' counters
+    - partition: when fetching all pages and the search exceeds HH_SEARCH_DEPTH,
+      crawl disjoint published-date windows instead of stopping at the cap
+      (meta["truncated"] is set if some results still could not be reached)
+    Pages after the first are requested in parallel under a shared limiter.
     """
     headers = {
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -77,27 +298,187 @@ async def fetch_vacancies(query: str, area: Optional[int] = None, pages: Optiona
         params_base["text"] = query
     if area is not None:
         params_base["area"] = area
+    if date_from:
+        params_base["date_from"] = date_from
+
+    async with httpx.AsyncClient(timeout=20.0, headers=headers, transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS) as client:
+        first = await _search_page(client, params_base, 0)
+        found = int(first.get("found", 0))
+        if meta is not None:
+            meta["found"] = found
+            meta["pages"] = int(first.get("pages", 0))
+        if pages is None and partition and found > HH_SEARCH_DEPTH:
+            crawl_meta: Dict[str, Any] = {}
+            page_items = await _crawl_partitioned(client, params_base, date_from, crawl_meta)
+            if crawl_meta.get("truncated"):
+                print(f"⚠️ '{query}': some one-minute windows still exceed {HH_SEARCH_DEPTH} items; their overflow is unreachable")
+            if meta is not None:
+                meta["partitioned"] = True
+                meta["truncated"] = bool(crawl_meta.get("truncated"))
+        else:
+            page_items = await _fetch_search_pages(client, params_base, first, pages)
+            if meta is not None and pages is None:
+                meta["truncated"] = found > HH_SEARCH_DEPTH
+    if raw:
+        return page_items
+    return [slim_vacancy(v) for v in page_items]
+
+
+async def _count_page(client: httpx.AsyncClient, params: Dict[str, Any], clusters: bool = False) -> Dict[str, Any]:
+    """Search metadata without items: per_page=0 (falls back to 1 item if rejected)."""
+    extra: Dict[str, Any] = {"per_page": 0}
+    if clusters:
+        extra["clusters"] = "true"
+    try:
+        return await _search_page(client, {**params, **extra}, 0)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 400:
+            raise
+        return await _search_page(client, {**params, **extra, "per_page": 1}, 0)
 
-    items: List[Dict[str, Any]] = []
-    async with httpx.AsyncClient(timeout=20.0, headers=headers) as client:
-        page = 0
-        while True:
-            params = dict(params_base)
-            params["page"] = page
-            resp = await client.get(HH_API_URL, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            page_items = data.get("items", [])
-            items.extend(page_items)
-            total_pages = int(data.get("pages", 0))
-            # stop if API says no more pages
-            if total_pages and page >= total_pages - 1:
-                break
-            # stop if user requested a fixed number of pages
-            if pages is not None and page + 1 >= pages:
-                break
-            page += 1
-    return items
+
+_CLUSTER_AMOUNT_RE = re.compile(r"(\d[\d\s\u00a0]*)")
+
+
+def parse_clusters(clusters: Optional[List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """hh.ru `clusters` facets as {cluster id: [{"name", "count"}, ...]}.
+    Salary items ("от 50 000 ₽") also get their numeric "from" threshold.
+    """
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for cluster in clusters or []:
+        entries: List[Dict[str, Any]] = []
+        for it in cluster.get("items") or []:
+            entry: Dict[str, Any] = {"name": it.get("name"), "count": int(it.get("count") or 0)}
+            if cluster.get("id") == "salary":
+                m = _CLUSTER_AMOUNT_RE.search(str(it.get("name") or ""))
+                if m:
+                    entry["from"] = int(re.sub(r"\D", "", m.group(1)))
+            entries.append(entry)
+        out[str(cluster.get("id"))] = entries
+    return out
+
+
+def salary_bands(salary_cluster: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Turn cumulative "от N" salary facet counts into disjoint [from, to) bands."""
+    thresholds = sorted((e["from"], e["count"]) for e in salary_cluster if "from" in e)
+    bands: List[Dict[str, Any]] = []
+    for i, (lo, count) in enumerate(thresholds):
+        nxt = thresholds[i + 1] if i + 1 < len(thresholds) else None
+        bands.append({"from": lo, "to": nxt[0] if nxt else None, "count": count - (nxt[1] if nxt else 0)})
+    return bands
+
+
+async def fetch_vacancy_counts(
+    query: str,
+    area: Optional[int] = None,
+    date_from: Optional[str] = None,
+    clusters: bool = False,
+) -> Dict[str, Any]:
+    """Count-only search in a single request: no items are downloaded.
+    Returns {"found", "pages"} (pages at 100 per page, capped by HH_SEARCH_DEPTH)
+    and, with `clusters`, hh.ru facets (salary, schedule, experience, ...).
+    """
+    headers = {"User-Agent": "job-analytics-bot/1.0", "Accept": "application/json"}
+    params: Dict[str, Any] = {}
+    if isinstance(query, str) and query.strip():
+        params["text"] = query
+    if area is not None:
+        params["area"] = area
+    if date_from:
+        params["date_from"] = date_from
+    async with httpx.AsyncClient(timeout=20.0, headers=headers, transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS) as client:
+        data = await _count_page(client, params, clusters=clusters)
+    found = int(data.get("found", 0))
+    result: Dict[str, Any] = {"found": found, "pages": -(-min(found, HH_SEARCH_DEPTH) // 100)}
+    if clusters:
+        facets = parse_clusters(data.get("clusters"))
+        result["clusters"] = facets
+        if facets.get("salary"):
+            result["salary_bands"] = salary_bands(facets["salary"])
+    return result
+
+
+# Windows with at most this many live items are listed outright while reconciling
+RECONCILE_LIST_MAX = 100
+
+
+class _ReconcileBudgetExceeded(Exception):
+    pass
+
+
+async def reconcile_run_ids(
+    query: str,
+    area: Optional[int],
+    members: List[Tuple[str, datetime]],
+    max_calls: int,
+) -> Optional[Dict[str, Any]]:
+    """Find which stored ids of a search are no longer listed, without re-listing it.
+    `members` are the stored (id, published_at) pairs. Published-date windows whose
+    live count differs from the stored count are bisected until they hold at most
+    RECONCILE_LIST_MAX items, and only those windows are listed. Cost grows with
+    the number of changed windows, not with the size of the search.
+    Returns {"vanished": [ids], "missing": [live items not stored], "calls"}, or
+    None when it would take more than `max_calls` requests (re-list instead).
+    A window where as many items appeared as vanished keeps its count and is not
+    detected; such pairs are left to the next full fetch.
+    """
+    params: Dict[str, Any] = {}
+    if isinstance(query, str) and query.strip():
+        params["text"] = query
+    if area is not None:
+        params["area"] = area
+    calls = 0
+    vanished: List[str] = []
+    missing: List[Dict[str, Any]] = []
+
+    def _spend(n: int = 1) -> None:
+        nonlocal calls
+        calls += n
+        if calls > max_calls:
+            raise _ReconcileBudgetExceeded()
+
+    async def _window(lo: Optional[datetime], hi: datetime, inside: List[Tuple[str, datetime]]) -> None:
+        window_params = {**params, "date_to": _iso(hi)}
+        if lo is not None:
+            window_params["date_from"] = _iso(lo)
+        _spend()
+        found = int((await _count_page(client, window_params)).get("found", 0))
+        if found == len(inside):
+            return
+        span_from = lo or (min(dt for _i, dt in inside) if inside else hi - timedelta(days=PARTITION_LOOKBACK_DAYS))
+        if found <= RECONCILE_LIST_MAX or (hi - span_from).total_seconds() <= PARTITION_MIN_WINDOW_SECONDS:
+            list_params = {**window_params, "per_page": 100}
+            _spend(max(1, -(-min(found, HH_SEARCH_DEPTH) // 100)))
+            first = await _search_page(client, list_params, 0)
+            live = await _fetch_search_pages(client, list_params, first)
+            live_ids = {str(v.get("id")) for v in live}
+            stored_ids = {vid for vid, _dt in inside}
+            vanished.extend(vid for vid, _dt in inside if vid not in live_ids)
+            missing.extend(v for v in live if str(v.get("id")) not in stored_ids)
+            return
+        # Whole seconds, as sent in date_from/date_to
+        mid = (span_from + (hi - span_from) / 2).replace(microsecond=0)
+        # The oldest window keeps its open start so items older than any stored one are counted.
+        # Sequential, so the call budget is checked before every request.
+        await _window(lo, mid, [m for m in inside if m[1] < mid])
+        await _window(mid, hi, [m for m in inside if m[1] >= mid])
+
+    headers = {"User-Agent": "job-analytics-bot/1.0", "Accept": "application/json"}
+    # Small margin so items published during the check are not cut off
+    now = (datetime.now(timezone.utc) + timedelta(minutes=1)).replace(microsecond=0)
+    async with httpx.AsyncClient(timeout=20.0, headers=headers, transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS) as client:
+        try:
+            await _window(None, now, [m for m in members if m[1] < now])
+        except _ReconcileBudgetExceeded:
+            return None
+    return {"vanished": vanished, "missing": [slim_vacancy(v) for v in missing], "calls": calls}
+
+
+def eligible_vacancy_count(counts: Dict[str, Any]) -> int:
+    """`found` of a fetch_vacancy_counts(clusters=True) result minus "Вахтовый метод"
+    vacancies (schedule facet), i.e. the vacancies the stats endpoints count."""
+    schedule = {e["name"]: e["count"] for e in (counts.get("clusters") or {}).get("schedule", [])}
+    return max(0, int(counts.get("found", 0)) - schedule.get("Вахтовый метод", 0))
 
 
 def normalize_salary(salary: Optional[Dict[str, Any]]) -> Optional[float]:
@@ -446,31 +827,15 @@ def extract_vacancy_fields(v: Dict[str, Any]) -> Dict[str, Any]:
 async def fetch_employer_ratings(employer_ids: Set[str]) -> Dict[str, Optional[float]]:
     """Fetch employer rating ("rating" field) from the employer endpoint, if available.
     Returns mapping employer_id -> rating or None if not present/failed.
+    Served by the employer metadata service (persistent cache, concurrent batch fetch).
     """
     if not employer_ids:
         return {}
-    headers = {"User-Agent": "job-analytics-bot/1.0"}
-    results: Dict[str, Optional[float]] = {}
-    async with httpx.AsyncClient(timeout=15.0, headers=headers) as client:
-        for eid in employer_ids:
-            if not eid:
-                continue
-            try:
-                url = HH_EMPLOYER_URL.format(employer_id=eid)
-                r = await client.get(url)
-                if r.status_code != 200:
-                    results[eid] = None
-                    continue
-                data = r.json()
-                # Try common fields that may exist on employer resource
-                rating = data.get("rating") or data.get("score") or data.get("scores")
-                if isinstance(rating, (int, float)):
-                    results[eid] = float(rating)
-                else:
-                    results[eid] = None
-            except Exception:
-                results[eid] = None
-    return results
+    try:
+        from .employer_service import get_employer_ratings
+    except Exception:
+        from employer_service import get_employer_ratings
+    return await get_employer_ratings(employer_ids)
 
 
 _scrape_cache: Dict[str, Optional[float]] = {}
@@ -483,7 +848,9 @@ async def scrape_employer_mark(employer_id: str) -> Optional[float]:
     if not employer_id:
         return None
     if employer_id in _scrape_cache:
+        record_cache("employer_page", hits=1)
         return _scrape_cache[employer_id]
+    record_cache("employer_page", misses=1)
 
     headers = {
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
@@ -492,7 +859,7 @@ async def scrape_employer_mark(employer_id: str) -> Optional[float]:
 
     url = HH_EMPLOYER_PAGE.format(employer_id=employer_id)
     try:
-        async with httpx.AsyncClient(timeout=20.0, headers=headers, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=20.0, headers=headers, transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS, follow_redirects=True) as client:
             r = await client.get(url)
             if r.status_code != 200:
                 _scrape_cache[employer_id] = None
@@ -559,17 +926,21 @@ def html_to_text(html: str) -> str:
 
 
 _vacancy_desc_cache: Dict[str, str] = {}
+# key_skills seen on vacancy detail responses (search items do not carry them)
+_vacancy_skills_cache: Dict[str, List[Dict[str, Any]]] = {}
 
 
 async def fetch_vacancy_description_api(vacancy_id: str) -> Optional[str]:
     if not vacancy_id:
         return None
     if vacancy_id in _vacancy_desc_cache:
+        record_cache("vacancy_description", hits=1)
         return _vacancy_desc_cache[vacancy_id]
+    record_cache("vacancy_description", misses=1)
     headers = {"User-Agent": "job-analytics-bot/1.0"}
     url = HH_VACANCY_DETAIL_URL.format(vacancy_id=vacancy_id)
     try:
-        async with httpx.AsyncClient(timeout=20.0, headers=headers) as client:
+        async with httpx.AsyncClient(timeout=20.0, headers=headers, transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS) as client:
             r = await client.get(url)
             if r.status_code != 200:
                 return None
@@ -577,6 +948,8 @@ async def fetch_vacancy_description_api(vacancy_id: str) -> Optional[str]:
             desc_html = data.get("description") or ""
             text = html_to_text(desc_html)
             _vacancy_desc_cache[vacancy_id] = text
+            if data.get("key_skills"):
+                _vacancy_skills_cache[vacancy_id] = data["key_skills"]
             return text
     except Exception:
         return None
@@ -590,7 +963,7 @@ async def scrape_vacancy_description_page(alternate_url: str) -> Optional[str]:
         "Accept-Language": "en-US,en;q=0.9,ru;q=0.8",
     }
     try:
-        async with httpx.AsyncClient(timeout=20.0, headers=headers, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=20.0, headers=headers, transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS, follow_redirects=True) as client:
             r = await client.get(alternate_url)
             if r.status_code != 200:
                 return None
@@ -605,113 +978,180 @@ async def scrape_vacancy_description_page(alternate_url: str) -> Optional[str]:
 
 
 _resume_detail_cache: Dict[str, Dict[str, Any]] = {}
+# Worst-case hh.ru calls to enrich one resume: API detail plus the public-page fallback
+RESUME_ENRICH_CALLS = 2
+
+
+def uncached_resume_ids(ids: List[str]) -> List[str]:
+    """Ids whose detail is not in the in-memory cache (each costs upstream calls)."""
+    return [rid for rid in ids if rid not in _resume_detail_cache]
+
+
+# Concurrent resume detail/page requests in enrich_resumes_with_details (also the pool size)
+HH_RESUME_CONCURRENCY = int(os.getenv("HH_RESUME_CONCURRENCY", "8"))
+_RESUME_SCRAPE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
+    "Accept-Language": "en-US,en;q=0.9,ru;q=0.8",
+}
+
+
+def _resume_api_headers(oauth_token: Optional[str] = None) -> Dict[str, str]:
+    headers = {"User-Agent": "job-analytics-bot/1.0"}
+    if oauth_token:
+        headers["Authorization"] = f"Bearer {oauth_token}"
+    return headers
 
 
-async def fetch_resume_detail_api(resume_id: str, oauth_token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+async def fetch_resume_detail_api(
+    resume_id: str,
+    oauth_token: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    remember: bool = True,
+) -> Optional[Dict[str, Any]]:
     """
     Fetch resume detail from hh.ru API. Some resume fields require OAuth token and proper permissions.
+    Pass `client` to reuse a pooled client (it must carry the auth headers).
+    remember=False skips the in-memory cache (bulk callers keep details in the store).
     Returns a dict if available; otherwise None.
     """
     if not resume_id:
         return None
     if resume_id in _resume_detail_cache:
+        record_cache("resume_detail", hits=1)
         return _resume_detail_cache[resume_id]
-
-    headers = {"User-Agent": "job-analytics-bot/1.0"}
-    if oauth_token:
-        headers["Authorization"] = f"Bearer {oauth_token}"
+    record_cache("resume_detail", misses=1)
 
     url = HH_RESUME_DETAIL_URL.format(resume_id=resume_id)
     try:
-        async with httpx.AsyncClient(timeout=20.0, headers=headers, follow_redirects=True) as client:
+        if client is None:
+            async with httpx.AsyncClient(timeout=20.0, headers=_resume_api_headers(oauth_token), transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS, follow_redirects=True) as own:
+                r = await own.get(url)
+        else:
             r = await client.get(url)
-            if r.status_code != 200:
-                return None
-            data = r.json()
+        if r.status_code != 200:
+            return None
+        data = r.json()
+        if remember:
             _resume_detail_cache[resume_id] = data
-            return data
+        return data
     except Exception:
         return None
 
 
-async def scrape_resume_page(public_url: str) -> Optional[str]:
+async def scrape_resume_page(public_url: str, client: Optional[httpx.AsyncClient] = None) -> Optional[str]:
     """
     Best-effort scrape of a public resume page to extract human-readable text.
+    Pass `client` to reuse a pooled client.
     """
     if not public_url:
         return None
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15",
-        "Accept-Language": "en-US,en;q=0.9,ru;q=0.8",
-    }
     try:
-        async with httpx.AsyncClient(timeout=20.0, headers=headers, follow_redirects=True) as client:
-            r = await client.get(public_url)
-            if r.status_code != 200:
-                return None
-            soup = BeautifulSoup(r.text, "lxml")
-            # Try common resume content containers
-            # Main content often has data-qa attributes like resume-header, resume-blocks
-            main = (
-                soup.find(attrs={"data-qa": "resume-block"})
-                or soup.find("div", class_=re.compile(r"resume-content|resume__content|resume-body"))
-                or soup.find("main")
-            )
-            if main:
-                return html_to_text(str(main))
-            return html_to_text(r.text)
+        if client is None:
+            async with httpx.AsyncClient(timeout=20.0, headers=_RESUME_SCRAPE_HEADERS, transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS, follow_redirects=True) as own:
+                r = await own.get(public_url)
+        else:
+            r = await client.get(public_url, headers=_RESUME_SCRAPE_HEADERS)
+        if r.status_code != 200:
+            return None
+        soup = BeautifulSoup(r.text, "lxml")
+        # Try common resume content containers
+        # Main content often has data-qa attributes like resume-header, resume-blocks
+        main = (
+            soup.find(attrs={"data-qa": "resume-block"})
+            or soup.find("div", class_=re.compile(r"resume-content|resume__content|resume-body"))
+            or soup.find("main")
+        )
+        if main:
+            return html_to_text(str(main))
+        return html_to_text(r.text)
     except Exception:
         return None
 
 
+async def _enrich_one_resume(
+    rm: Dict[str, Any],
+    prefer_scrape: bool,
+    oauth_token: Optional[str],
+    api_client: Optional[httpx.AsyncClient] = None,
+    site_client: Optional[httpx.AsyncClient] = None,
+    remember: bool = True,
+) -> Dict[str, Any]:
+    """Add 'resume_text' (and skills/detail when available) to one resume item."""
+    rid = rm.get("id")
+    text: Optional[str] = None
+    if prefer_scrape:
+        # Build public URL if not provided
+        public_url = rm.get("public_url") or HH_RESUME_PUBLIC_URL.format(resume_id=rid)
+        text = await scrape_resume_page(public_url, client=site_client)
+        if not text:
+            detail = await fetch_resume_detail_api(rid, oauth_token=oauth_token, client=api_client, remember=remember)
+            if detail and isinstance(detail.get("skills"), list):
+                # Concatenate some fields as text fallback
+                skills_text = ", ".join([s.get("name") for s in detail["skills"] if isinstance(s, dict) and s.get("name")])
+                rm["skills"] = [s.get("name") for s in detail["skills"] if isinstance(s, dict) and s.get("name")]
+                text = (detail.get("title") or "") + "\n" + (detail.get("comment") or "") + "\n" + skills_text
+    else:
+        detail = await fetch_resume_detail_api(rid, oauth_token=oauth_token, client=api_client, remember=remember)
+        if detail:
+            rm["_resume_detail"] = detail
+            # Try to assemble primary text from detail
+            text_parts: List[str] = []
+            for key in ("title", "specialization", "comment"):
+                val = detail.get(key)
+                if isinstance(val, str) and val.strip():
+                    text_parts.append(val.strip())
+            # skills may be list of dicts with name
+            skills = detail.get("skills")
+            if isinstance(skills, list):
+                skill_names = [s.get("name") for s in skills if isinstance(s, dict) and s.get("name")]
+                if skill_names:
+                    rm["skills"] = skill_names
+                    text_parts.append(", ".join(skill_names))
+            text = "\n".join(text_parts) if text_parts else None
+        if not text:
+            public_url = rm.get("public_url") or HH_RESUME_PUBLIC_URL.format(resume_id=rid)
+            text = await scrape_resume_page(public_url, client=site_client)
+    if text:
+        rm["resume_text"] = text
+    return rm
+
+
+async def iter_enriched_resumes(
+    items: List[Dict[str, Any]],
+    prefer_scrape: bool = False,
+    oauth_token: Optional[str] = None,
+    concurrency: int = HH_RESUME_CONCURRENCY,
+    remember: bool = True,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Enrich resume items and yield each one as soon as it is done (completion order).
+    All requests share two pooled clients (API with the auth headers, public site),
+    with at most `concurrency` in flight.
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=20.0, headers=_resume_api_headers(oauth_token), transport=UpstreamTransport(limits=limits), event_hooks=UPSTREAM_EVENT_HOOKS, follow_redirects=True) as api_client, \
+            httpx.AsyncClient(timeout=20.0, transport=UpstreamTransport(limits=limits), event_hooks=UPSTREAM_EVENT_HOOKS, follow_redirects=True) as site_client:
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _one(rm: Dict[str, Any]) -> Dict[str, Any]:
+            async with sem:
+                return await _enrich_one_resume(rm, prefer_scrape, oauth_token, api_client, site_client, remember)
+
+        tasks = [asyncio.create_task(_one(rm)) for rm in items]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            for t in tasks:
+                t.cancel()
+
+
 async def enrich_resumes_with_details(items: List[Dict[str, Any]], prefer_scrape: bool = False, oauth_token: Optional[str] = None) -> None:
     """
     Mutates resume items by adding 'resume_text' using API detail (if accessible)
     or page scrape. prefer_scrape=False uses API first, then scrape fallback.
     """
-    import asyncio as _aio
-    sem = _aio.Semaphore(8)
-
-    async def _one(rm: Dict[str, Any]):
-        async with sem:
-            rid = rm.get("id")
-            text: Optional[str] = None
-            if prefer_scrape:
-                # Build public URL if not provided
-                public_url = rm.get("public_url") or HH_RESUME_PUBLIC_URL.format(resume_id=rid)
-                text = await scrape_resume_page(public_url)
-                if not text:
-                    detail = await fetch_resume_detail_api(rid, oauth_token=oauth_token)
-                    if detail and isinstance(detail.get("skills"), list):
-                        # Concatenate some fields as text fallback
-                        skills_text = ", ".join([s.get("name") for s in detail["skills"] if isinstance(s, dict) and s.get("name")])
-                        rm["skills"] = [s.get("name") for s in detail["skills"] if isinstance(s, dict) and s.get("name")]
-                        text = (detail.get("title") or "") + "\n" + (detail.get("comment") or "") + "\n" + skills_text
-            else:
-                detail = await fetch_resume_detail_api(rid, oauth_token=oauth_token)
-                if detail:
-                    rm["_resume_detail"] = detail
-                    # Try to assemble primary text from detail
-                    text_parts: List[str] = []
-                    for key in ("title", "specialization", "comment"):
-                        val = detail.get(key)
-                        if isinstance(val, str) and val.strip():
-                            text_parts.append(val.strip())
-                    # skills may be list of dicts with name
-                    skills = detail.get("skills")
-                    if isinstance(skills, list):
-                        skill_names = [s.get("name") for s in skills if isinstance(s, dict) and s.get("name")]
-                        if skill_names:
-                            rm["skills"] = skill_names
-                            text_parts.append(", ".join(skill_names))
-                    text = "\n".join(text_parts) if text_parts else None
-                if not text:
-                    public_url = rm.get("public_url") or HH_RESUME_PUBLIC_URL.format(resume_id=rid)
-                    text = await scrape_resume_page(public_url)
-            if text:
-                rm["resume_text"] = text
-
-    await _aio.gather(*[_one(rm) for rm in items])
+    async for _rm in iter_enriched_resumes(items, prefer_scrape=prefer_scrape, oauth_token=oauth_token):
+        pass
 
 
 def extract_resume_fields(r: Dict[str, Any]) -> Dict[str, Any]:
@@ -790,6 +1230,94 @@ async def parse_resumes(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Produce simplified resume dicts with selected fields."""
     return [extract_resume_fields(r) for r in items]
 
+async def enrich_one_description(v: Dict[str, Any], prefer_scrape: bool = False) -> None:
+    """Mutates one item by adding 'description_text' (API detail or page scrape)."""
+    # Items loaded from the local store may already carry their description
+    if v.get("description_text"):
+        return
+    vid = v.get("id")
+    text: Optional[str] = None
+    if prefer_scrape:
+        text = await scrape_vacancy_description_page(v.get("alternate_url") or "")
+        if not text:
+            text = await fetch_vacancy_description_api(vid)
+    else:
+        text = await fetch_vacancy_description_api(vid)
+        if not text:
+            text = await scrape_vacancy_description_page(v.get("alternate_url") or "")
+    if text:
+        v["description_text"] = text
+    if not v.get("key_skills") and vid in _vacancy_skills_cache:
+        v["key_skills"] = _vacancy_skills_cache[vid]
+
+
+# Snippet wording that suggests pay is quoted per shift / per day
+_SHIFT_HINT_RE = re.compile(r"смен|см\.|выход|сутк|shift", re.I)
+_MONEY_HINT_RE = re.compile(r"\d[\d\s]{2,}|руб|₽|тыс|\bт\.?р\b", re.I)
+# Wording that suggests an hourly rate
+_HOURLY_HINT_RE = re.compile(r"в\s*час|за\s*час|/\s*ч(ас)?\b|почасов|hour", re.I)
+
+# Enrichment priorities (lower is more important); None means the detail page
+# cannot change the outcome for this item.
+ENRICH_PRIORITY_SHIFT_PAY = 0
+ENRICH_PRIORITY_MONEY_HINT = 1
+ENRICH_PRIORITY_SALARY_HINT = 2
+ENRICH_PRIORITY_SKILLS = 3
+
+
+def description_priority(v: Dict[str, Any], need_skills: bool = False) -> Optional[int]:
+    """Decide whether fetching the vacancy detail could change its parsed result.
+    - no salary and the title/snippet/schedule hints at per-shift pay: estimate_monthly_salary_from_text
+      may find (or refine) a per-shift amount in the description
+    - no salary and the snippet mentions money: the description may state the rate
+    - structured salary with shift or hourly hints: extract_vacancy_fields still reads a
+      per-shift amount from the description and it overrides the structured average
+    - need_skills and no key_skills yet: the detail response carries key_skills
+    """
+    if v.get("description_text"):
+        return None
+    snippet = v.get("snippet") or {}
+    schedule = v.get("schedule") or {}
+    blob = " ".join([v.get("name") or "", snippet.get("responsibility") or "", snippet.get("requirement") or "", schedule.get("name") or ""])
+    if normalize_salary(v.get("salary")) is None:
+        if _SHIFT_HINT_RE.search(blob):
+            return ENRICH_PRIORITY_SHIFT_PAY
+        if _MONEY_HINT_RE.search(blob):
+            return ENRICH_PRIORITY_MONEY_HINT
+    elif _SHIFT_HINT_RE.search(blob) or _HOURLY_HINT_RE.search(blob):
+        return ENRICH_PRIORITY_SALARY_HINT
+    if need_skills and not v.get("key_skills"):
+        return ENRICH_PRIORITY_SKILLS
+    return None
+
+
+async def enrich_selectively(
+    items: List[Dict[str, Any]],
+    need_skills: bool = False,
+    prefer_scrape: bool = False,
+    max_details: Optional[int] = None,
+) -> Dict[str, int]:
+    """Fetch descriptions only for items whose outcome could change, in priority order.
+    Returns counters: total, candidates, fetched and avoided detail calls.
+    """
+    ranked: List[Tuple[int, int, Dict[str, Any]]] = []
+    for pos, v in enumerate(items):
+        prio = description_priority(v, need_skills=need_skills)
+        if prio is not None:
+            ranked.append((prio, pos, v))
+    ranked.sort(key=lambda t: (t[0], t[1]))
+    selected = [v for _prio, _pos, v in ranked]
+    if max_details is not None:
+        selected = selected[:max_details]
+    await enrich_with_descriptions(selected, prefer_scrape=prefer_scrape)
+    return {
+        "total": len(items),
+        "candidates": len(ranked),
+        "fetched": len(selected),
+        "avoided": len(items) - len(selected),
+    }
+
+
 async def enrich_with_descriptions(items: List[Dict[str, Any]], prefer_scrape: bool = False) -> None:
     """Mutates items by adding 'description_text' using API detail or page scrape.
     prefer_scrape=False uses API first, then scrape fallback.
@@ -799,26 +1327,26 @@ async def enrich_with_descriptions(items: List[Dict[str, Any]], prefer_scrape: b
     sem = _aio.Semaphore(8)
 
     async def _one(v: Dict[str, Any]):
-        async with sem:
-            vid = v.get("id")
-            text: Optional[str] = None
-            if prefer_scrape:
-                text = await scrape_vacancy_description_page(v.get("alternate_url") or "")
-                if not text:
-                    text = await fetch_vacancy_description_api(vid)
-            else:
-                text = await fetch_vacancy_description_api(vid)
-                if not text:
-                    text = await scrape_vacancy_description_page(v.get("alternate_url") or "")
-            if text:
-                v["description_text"] = text
+        if v.get("description_text"):
+            return
+        ENRICHMENT_QUEUE_DEPTH.inc()
+        try:
+            async with sem:
+                await enrich_one_description(v, prefer_scrape=prefer_scrape)
+        finally:
+            ENRICHMENT_QUEUE_DEPTH.dec()
 
     await _aio.gather(*[_one(v) for v in items])
 
 
-async def parse_vacancies(items: List[Dict[str, Any]], with_employer_mark: bool = False) -> List[Dict[str, Any]]:
+async def parse_vacancies(
+    items: List[Dict[str, Any]],
+    with_employer_mark: bool = False,
+    employer_ratings: Optional[Dict[str, Optional[float]]] = None,
+) -> List[Dict[str, Any]]:
     """Produce simplified vacancy dicts with selected fields.
-    If with_employer_mark, compute employer marks from available data (fast approach).
+    If with_employer_mark, compute employer marks from available data (fast approach);
+    real ratings passed in `employer_ratings` take precedence where present.
     Excludes vacancies with "Вахтовый метод" schedule.
     """
     parsed = []
@@ -832,9 +1360,11 @@ async def parse_vacancies(items: List[Dict[str, Any]], with_employer_mark: bool
     if with_employer_mark:
         # Use only fast computed marks (no web scraping)
         computed = compute_employer_marks(parsed)
+        ratings = employer_ratings or {}
         for p in parsed:
             eid = p.get("employer_id")
-            p["employer_mark"] = computed.get(eid)
+            real = ratings.get(eid)
+            p["employer_mark"] = real if real is not None else computed.get(eid)
     return parsed
 
 
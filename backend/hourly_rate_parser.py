@@ -13,7 +13,9 @@ from datetime import datetime
 import re
 
 # Import existing functions from hh_parser_ver2
-from hh_parser_ver2 import normalize_salary
+from hh_parser_ver2 import normalize_salary, HH_API_URL
+import vacancy_store
+from metrics import UPSTREAM_EVENT_HOOKS, UpstreamTransport
 
 # Employer IDs for target companies
 EMPLOYER_IDS = {
@@ -123,12 +125,21 @@ def calculate_hourly_rate(salary_info: Dict[str, Any], working_hours: int) -> Op
     
     return result
 
-async def fetch_employer_vacancies(employer_id: str, area: int = 2, pages: int = 5) -> List[Dict[str, Any]]:
-    """Fetch all vacancies from a specific employer using employer ID."""
+async def fetch_employer_vacancies(employer_id: str, area: int = 2, pages: int = 5, source: str = "auto") -> List[Dict[str, Any]]:
+    """Fetch all vacancies from a specific employer using employer ID.
+    source: 'hh' (live), 'store' (local vacancy store only) or 'auto' (store when fresh).
+    """
+    key = vacancy_store.run_key(None, area, employer_id=employer_id)
+    if source == "store" or (source == "auto" and vacancy_store.is_fresh(key, depth=pages * 100)):
+        stored = vacancy_store.load_run_items(key)
+        print(f"Loaded {len(stored)} vacancies for employer {employer_id} from local store")
+        return stored
+
     headers = {"User-Agent": "job-analytics-bot/1.0"}
     all_vacancies = []
+    listed_all = False
     
-    async with httpx.AsyncClient(timeout=30.0, headers=headers) as client:
+    async with httpx.AsyncClient(timeout=30.0, headers=headers, transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS) as client:
         page = 0
         while page < pages:
             try:
@@ -140,13 +151,14 @@ async def fetch_employer_vacancies(employer_id: str, area: int = 2, pages: int =
                 }
                 
                 print(f"Fetching page {page + 1} for employer {employer_id}...")
-                resp = await client.get("https://api.hh.ru/vacancies", params=params)
+                resp = await client.get(HH_API_URL, params=params)
                 resp.raise_for_status()
                 data = resp.json()
                 
                 page_items = data.get("items", [])
                 if not page_items:
                     print(f"No more items on page {page + 1}, stopping")
+                    listed_all = True
                     break
                 
                 all_vacancies.extend(page_items)
@@ -156,6 +168,7 @@ async def fetch_employer_vacancies(employer_id: str, area: int = 2, pages: int =
                 total_pages = int(data.get("pages", 0))
                 if page >= total_pages - 1:
                     print(f"Reached last page ({total_pages})")
+                    listed_all = True
                     break
                 
                 page += 1
@@ -167,16 +180,20 @@ async def fetch_employer_vacancies(employer_id: str, area: int = 2, pages: int =
                 print(f"Error fetching page {page + 1} for employer {employer_id}: {e}")
                 break
     
+    try:
+        vacancy_store.upsert_vacancies(all_vacancies, key, complete=listed_all, depth=pages * 100)
+    except Exception as e:
+        print(f"Vacancy store write failed for employer {employer_id}: {e}")
     return all_vacancies
 
-async def fetch_all_employer_vacancies(area: int = 2, pages: int = 5) -> List[Dict[str, Any]]:
+async def fetch_all_employer_vacancies(area: int = 2, pages: int = 5, source: str = "auto") -> List[Dict[str, Any]]:
     """Fetch vacancies from all target employers."""
     all_vacancies = []
     
     for company_name, employer_id in EMPLOYER_IDS.items():
         print(f"\n🏢 Fetching vacancies for: {company_name} (ID: {employer_id})")
         try:
-            vacancies = await fetch_employer_vacancies(employer_id, area, pages)
+            vacancies = await fetch_employer_vacancies(employer_id, area, pages, source=source)
             print(f"✅ Found {len(vacancies)} total vacancies for {company_name}")
             all_vacancies.extend(vacancies)
         except Exception as e:
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the API against a local hh.ru stand-in.
+
+Starts fake_hh.py and the backend under uvicorn (pointed at the stand-in via
+HH_API_BASE/HH_SITE_BASE, with a throwaway vacancy store), then runs virtual
+users that replay the exact request sequences of real page loads:
+
+  dashboard    GET /dashboard, then /analyze -> /fetch (bubble chart) -> /resume-stats
+  competitors  GET /fetch (whole area), then five role-preset /fetch calls in parallel
+
+Reports throughput, p50/p95/p99 latency per endpoint and per page load,
+upstream (stand-in) calls per user request, and server CPU / peak RSS.
+Results are written as JSON next to the hot-path benchmarks.
+
+Usage:
+  python load_test.py --scenario dashboard --concurrency 10 --duration 30
+  python load_test.py --scenario competitors --concurrency 5 --iterations 4 --latency-ms 80
+  python load_test.py --target http://127.0.0.1:8000 --fake http://127.0.0.1:9001 --server-pid 1234
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BACKEND_DIR / "bench_results"
+
+# Query presets offered by the dashboard dropdown
+DASHBOARD_QUERIES = ["водитель категория D", "контролер кпп", "безопасность досмотр", "врач терапевт", "уборщик клининг"]
+# ROLE_PRESETS of competitors.html
+COMPETITOR_ROLES = ["уборщик клининг", "водитель категория D", "врач терапевт", "контролер кпп", "безопасность досмотр"]
+
+Request = Tuple[str, Dict[str, Any]]
+
+
+# ---------------------------------------------------------------------------
+# Page-load sequences (mirroring the dashboard JS and competitors.html)
+# ---------------------------------------------------------------------------
+
+def dashboard_sequence(query: str, area: int = 2, pages: int = 2, per_page: int = 50) -> List[List[Request]]:
+    """Request steps of one dashboard load; requests inside a step run concurrently."""
+    return [
+        [("/dashboard", {"query": query, "area": area, "pages": pages, "per_page": per_page})],
+        [("/analyze", {"query": query, "area": area, "pages": pages, "per_page": per_page, "fetch_all": "true"})],
+        [("/fetch", {"query": query, "area": area, "pages": pages, "per_page": per_page,
+                     "simplified": "true", "employer_mark": "true", "fetch_all": "true"})],
+        [("/resume-stats", {"vacancy_query": query, "area": area, "pages": pages, "per_page": per_page, "auto_collect": "true"})],
+    ]
+
+
+def competitors_sequence(area: int = 2) -> List[List[Request]]:
+    """Request steps of one competitors page load."""
+    return [
+        [("/fetch", {"query": "", "area": area, "per_page": 100, "simplified": "true", "employer_mark": "false", "fetch_all": "true"})],
+        [("/fetch", {"query": role, "area": area, "per_page": 100, "simplified": "true", "fetch_all": "true"}) for role in COMPETITOR_ROLES],
+    ]
+
+
+def build_page_load(scenario: str, rnd: random.Random, area: int) -> Tuple[str, List[List[Request]]]:
+    if scenario == "mixed":
+        scenario = "dashboard" if rnd.random() < 0.7 else "competitors"
+    if scenario == "dashboard":
+        return scenario, dashboard_sequence(rnd.choice(DASHBOARD_QUERIES), area=area)
+    return scenario, competitors_sequence(area=area)
+
+
+# ---------------------------------------------------------------------------
+# Process management and server resource sampling
+# ---------------------------------------------------------------------------
+
+def _wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready in {timeout:.0f}s")
+
+
+def start_services(args: argparse.Namespace, store_dir: str) -> List[subprocess.Popen]:
+    fake_cmd = [sys.executable, "fake_hh.py", "--port", str(args.fake_port), "--latency-ms", str(args.latency_ms),
+                "--vacancies", str(args.vacancies), "--seed", str(args.seed)]
+    if args.corpus:
+        fake_cmd += ["--corpus", args.corpus]
+    fake = subprocess.Popen(fake_cmd, cwd=BACKEND_DIR)
+    fake_base = f"http://127.0.0.1:{args.fake_port}"
+    env = {
+        **os.environ,
+        "HH_API_BASE": fake_base,
+        "HH_SITE_BASE": fake_base,
+        "VACANCY_STORE_PATH": str(Path(store_dir) / "vacancies.sqlite3"),
+        "EMPLOYER_REFRESH_SECONDS": "0",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    _wait_ready(f"{fake_base}/_fake/stats")
+    _wait_ready(f"http://127.0.0.1:{args.port}/health")
+    return [server, fake]
+
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    """utime + stime of a process from /proc (Linux only)."""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class ResourceSampler(threading.Thread):
+    """Samples RSS of the server process while the load runs."""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self.samples: List[int] = []
+        self._halt = threading.Event()
+
+    def run(self) -> None:
+        while self.pid and not self._halt.is_set():
+            rss = _rss_bytes(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+                self.peak_rss = max(self.peak_rss, rss)
+            self._halt.wait(self.interval)
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join()
+
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def _latency_summary(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1) if values else None,
+        "p95_ms": round(percentile(values, 95) * 1000, 1) if values else None,
+        "p99_ms": round(percentile(values, 99) * 1000, 1) if values else None,
+        "max_ms": round(max(values) * 1000, 1) if values else None,
+    }
+
+
+async def _timed_get(client: httpx.AsyncClient, path: str, params: Dict[str, Any], samples: Dict[str, List[float]], errors: Dict[str, int]) -> None:
+    start = time.perf_counter()
+    try:
+        r = await client.get(path, params=params)
+        ok = r.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    samples.setdefault(path, []).append(time.perf_counter() - start)
+    if not ok:
+        errors[path] = errors.get(path, 0) + 1
+
+
+async def run_load(args: argparse.Namespace, target: str) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = {}
+    page_samples: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    limits = httpx.Limits(max_connections=args.concurrency * 6, max_keepalive_connections=args.concurrency * 6)
+
+    async with httpx.AsyncClient(base_url=target, timeout=args.timeout, limits=limits) as client:
+        async def _user(uid: int) -> None:
+            rnd = random.Random(args.seed * 1000 + uid)
+            done = 0
+            while True:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                if deadline is None and done >= args.iterations:
+                    break
+                scenario, steps = build_page_load(args.scenario, rnd, args.area)
+                start = time.perf_counter()
+                for step in steps:
+                    await asyncio.gather(*[_timed_get(client, path, params, samples, errors) for path, params in step])
+                page_samples.setdefault(scenario, []).append(time.perf_counter() - start)
+                done += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[_user(i) for i in range(args.concurrency)])
+        elapsed = time.perf_counter() - start
+
+    requests_total = sum(len(v) for v in samples.values())
+    pages_total = sum(len(v) for v in page_samples.values())
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": requests_total,
+        "page_loads": pages_total,
+        "errors": sum(errors.values()),
+        "requests_per_second": round(requests_total / elapsed, 2) if elapsed else None,
+        "page_loads_per_second": round(pages_total / elapsed, 3) if elapsed else None,
+        "endpoints": {path: {**_latency_summary(v), "errors": errors.get(path, 0)} for path, v in sorted(samples.items())},
+        "pages": {name: _latency_summary(v) for name, v in sorted(page_samples.items())},
+    }
+
+
+def _fake_requests(fake_base: str) -> Optional[int]:
+    try:
+        return int(httpx.get(f"{fake_base}/_fake/stats", timeout=5.0).json()["requests"])
+    except (httpx.HTTPError, KeyError, ValueError):
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    procs: List[subprocess.Popen] = []
+    store_dir = tempfile.mkdtemp(prefix="loadtest_store_")
+    try:
+        if args.target:
+            target, fake_base, server_pid = args.target.rstrip("/"), args.fake.rstrip("/"), args.server_pid
+        else:
+            print(f"🚀 Starting hh.ru stand-in on :{args.fake_port} and backend on :{args.port}...")
+            procs = start_services(args, store_dir)
+            target, fake_base, server_pid = f"http://127.0.0.1:{args.port}", f"http://127.0.0.1:{args.fake_port}", procs[0].pid
+
+        upstream_before = _fake_requests(fake_base)
+        cpu_before = _cpu_seconds(server_pid) if server_pid else None
+        sampler = ResourceSampler(server_pid)
+        sampler.start()
+        print(f"🔥 Running '{args.scenario}' with {args.concurrency} users "
+              f"({f'{args.duration}s' if args.duration else f'{args.iterations} page loads each'})...")
+        load = asyncio.run(run_load(args, target))
+        sampler.stop()
+        cpu_after = _cpu_seconds(server_pid) if server_pid else None
+        upstream_after = _fake_requests(fake_base)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    upstream = (upstream_after - upstream_before) if upstream_before is not None and upstream_after is not None else None
+    cpu = (cpu_after - cpu_before) if cpu_before is not None and cpu_after is not None else None
+    return {
+        "suite": "load",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "config": {
+            "scenario": args.scenario, "concurrency": args.concurrency, "duration": args.duration,
+            "iterations": args.iterations, "area": args.area, "latency_ms": args.latency_ms,
+            "vacancies": args.vacancies, "corpus": args.corpus, "seed": args.seed,
+        },
+        **load,
+        "upstream_calls": upstream,
+        "upstream_calls_per_request": round(upstream / load["requests"], 2) if upstream is not None and load["requests"] else None,
+        "upstream_calls_per_page_load": round(upstream / load["page_loads"], 2) if upstream is not None and load["page_loads"] else None,
+        "server_cpu_seconds": round(cpu, 3) if cpu is not None else None,
+        "server_cpu_percent": round(cpu / load["elapsed_seconds"] * 100, 1) if cpu is not None and load["elapsed_seconds"] else None,
+        "server_peak_rss_bytes": sampler.peak_rss or None,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n📊 {report['requests']} requests / {report['page_loads']} page loads in {report['elapsed_seconds']}s "
+          f"({report['requests_per_second']} req/s, {report['errors']} errors)")
+    print(f"   {'endpoint':<16} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for path, s in report["endpoints"].items():
+        print(f"   {path:<16} {s['count']:>6} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {s['errors']:>7}")
+    for name, s in report["pages"].items():
+        print(f"   page:{name:<11} {s['count']:>6} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9}")
+    print(f"   upstream calls: {report['upstream_calls']} "
+          f"({report['upstream_calls_per_request']}/request, {report['upstream_calls_per_page_load']}/page load)")
+    if report["server_cpu_seconds"] is not None:
+        print(f"   server CPU: {report['server_cpu_seconds']}s ({report['server_cpu_percent']}%)")
+    if report["server_peak_rss_bytes"]:
+        print(f"   server peak RSS: {report['server_peak_rss_bytes'] / 1024 / 1024:.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end load test against a local hh.ru stand-in")
+    parser.add_argument("--scenario", choices=["dashboard", "competitors", "mixed"], default="dashboard")
+    parser.add_argument("--concurrency", type=int, default=5, help="virtual users")
+    parser.add_argument("--duration", type=float, default=0.0, help="seconds to run; 0 = use --iterations")
+    parser.add_argument("--iterations", type=int, default=3, help="page loads per user when --duration is 0")
+    parser.add_argument("--area", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout, seconds")
+    parser.add_argument("--port", type=int, default=8765, help="backend port")
+    parser.add_argument("--fake-port", type=int, default=9765, help="stand-in port")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stand-in mean response latency")
+    parser.add_argument("--vacancies", type=int, default=5000, help="stand-in corpus size")
+    parser.add_argument("--corpus", default=None, help="NDJSON corpus for the stand-in (synthetic_corpus.py)")
+    parser.add_argument("--target", default=None, help="use an already running backend instead of starting one")
+    parser.add_argument("--fake", default="http://127.0.0.1:9001", help="stand-in base URL when --target is given")
+    parser.add_argument("--server-pid", type=int, default=None, help="backend pid for CPU/RSS when --target is given")
+    parser.add_argument("--output", default=None, help="result JSON path")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    out = Path(args.output) if args.output else RESULTS_DIR / f"load_{args.scenario}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n✅ Results saved to: {out}")
+
+
+if __name__ == "__main__":
+    main()
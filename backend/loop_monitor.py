@@ -0,0 +1,118 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A background task sleeps LOOP_LAG_INTERVAL_MS at a time and records how late
+it wakes up (scheduling delay) in the event_loop_lag_seconds histogram.
+
+A watchdog thread checks that the task keeps ticking. When the loop has been
+blocked for longer than LOOP_STALL_THRESHOLD_MS, it captures the loop thread's
+stack while the blocking code is still running (regex parsing, BeautifulSoup,
+json.dump, ...), logs it and keeps it in a ring buffer for GET /admin/loop-stalls.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+try:
+    from .metrics import LOOP_LAG, LOOP_STALLS
+except Exception:
+    from metrics import LOOP_LAG, LOOP_STALLS
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "1") == "1"
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "250"))
+LOOP_STALL_KEEP = int(os.getenv("LOOP_STALL_KEEP", "50"))
+# Innermost frames printed in the log line (the full stack is kept in the record)
+LOG_FRAMES = 8
+
+
+def _format_stack(frame: Any) -> List[str]:
+    return [f"{os.path.basename(f.filename)}:{f.lineno} in {f.name}" for f in traceback.extract_stack(frame)]
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval_ms: float = LOOP_LAG_INTERVAL_MS,
+        threshold_ms: float = LOOP_STALL_THRESHOLD_MS,
+        keep: int = LOOP_STALL_KEEP,
+    ):
+        self.interval = interval_ms / 1000.0
+        self.threshold = threshold_ms / 1000.0
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self.max_lag = 0.0
+        self.loop_thread: Optional[int] = None
+        self._last_tick = time.monotonic()
+        self._open_stall: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def run(self) -> None:
+        """Lag sampling task; also starts the watchdog thread, which stops when the task is cancelled."""
+        self.loop_thread = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stop = threading.Event()
+        self._watchdog = threading.Thread(target=self._watch, args=(self._stop,), name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        try:
+            await self._sample()
+        finally:
+            # A cancelled sampler stops ticking; the watchdog would report that as a stall
+            self._stop.set()
+            self.loop_thread = None
+
+    async def _sample(self) -> None:
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - before - self.interval)
+            LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            with self._lock:
+                self._last_tick = now
+                stall, self._open_stall = self._open_stall, None
+            if stall is not None:
+                stall["lag_ms"] = round(lag * 1000, 1)
+                print(f"Event loop resumed after {stall['lag_ms']} ms stall")
+
+    def _watch(self, stop: threading.Event) -> None:
+        while not stop.wait(self.threshold / 2):
+            with self._lock:
+                blocked = time.monotonic() - self._last_tick - self.interval
+                if blocked < self.threshold or self._open_stall is not None:
+                    continue
+                frame = sys._current_frames().get(self.loop_thread)
+                stack = _format_stack(frame) if frame is not None else []
+                stall = {
+                    "detected_at": datetime.now().isoformat(timespec="seconds"),
+                    "blocked_ms_at_detection": round(blocked * 1000, 1),
+                    "lag_ms": None,
+                    "stack": stack,
+                }
+                self._open_stall = stall
+                self.stalls.append(stall)
+            LOOP_STALLS.inc()
+            print(f"⚠️ Event loop blocked for >{stall['blocked_ms_at_detection']} ms, at:\n    " + "\n    ".join(stack[-LOG_FRAMES:]))
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            stalls = list(reversed(self.stalls))
+        return {
+            "enabled": self.loop_thread is not None,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "stalls": stalls,
+        }
+
+
+monitor = LoopMonitor()
@@ -1,6 +1,7 @@
 from fastapi import FastAPI, Query
-from fastapi.responses import HTMLResponse
-from typing import Optional, List, Dict, Any
+from fastapi import Depends, Header, HTTPException, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
+from typing import Optional, List, Dict, Any, Tuple
 import asyncio
 import os
 import json
@@ -13,29 +14,68 @@ try:
     # When running as a package: `uvicorn backend.main:app ...`
     from .hh_parser_ver2 import (
         fetch_vacancies,
+        fetch_vacancy_counts,
+        eligible_vacancy_count,
         parse_vacancies,
         enrich_with_descriptions,
+        enrich_selectively,
         normalize_salary,
+        HH_RESUME_PUBLIC_URL,
         fetch_resume_detail_api,
-        enrich_resumes_with_details,
-        parse_resumes,
+        iter_enriched_resumes,
+        extract_resume_fields,
         fetch_resume_ids_by_query,
+        uncached_resume_ids,
+        RESUME_ENRICH_CALLS,
     )
-    from .analytics import salary_stats, top_skills, hourly_rate_stats
+    from .analytics import salary_stats, top_skills, hourly_rate_stats, has_active_status
+    from . import vacancy_store
+    from . import pipeline
+    from . import employer_service
+    from . import metrics
+    from . import profiling
+    from . import loop_monitor
+    from . import memory_profiling
+    from . import slow_log
+    from . import upstream_budget
+    from . import query_planner
+    from . import sampling
+    from . import resume_service
 except Exception:  # ModuleNotFoundError when running with --app-dir backend
     from hh_parser_ver2 import (
         fetch_vacancies,
+        fetch_vacancy_counts,
+        eligible_vacancy_count,
         parse_vacancies,
         enrich_with_descriptions,
+        enrich_selectively,
         normalize_salary,
+        HH_RESUME_PUBLIC_URL,
         fetch_resume_detail_api,
-        enrich_resumes_with_details,
-        parse_resumes,
+        iter_enriched_resumes,
+        extract_resume_fields,
         fetch_resume_ids_by_query,
+        uncached_resume_ids,
+        RESUME_ENRICH_CALLS,
     )
-    from analytics import salary_stats, top_skills, hourly_rate_stats
-
-app = FastAPI(title="Job Analytics API")
+    from analytics import salary_stats, top_skills, hourly_rate_stats, has_active_status
+    import vacancy_store
+    import pipeline
+    import employer_service
+    import metrics
+    import profiling
+    import loop_monitor
+    import memory_profiling
+    import slow_log
+    import upstream_budget
+    import query_planner
+    import sampling
+    import resume_service
+
+# Admin-only features (profiling, diagnostics) are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+app = FastAPI(title="Job Analytics API", dependencies=[Depends(profiling.attach_request_task)])
 
 app.add_middleware(
     CORSMiddleware,
@@ -46,6 +86,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], 
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Upstream-Calls", "X-Upstream-Budget-Remaining", "X-Upstream-Downgraded"],
 )
 
 # Root redirect to dashboard
@@ -85,6 +126,316 @@ def set_cache(cache_key: str, data: Any) -> None:
     return None
 
 
+def parse_fields_param(fields: Optional[str]) -> Optional[List[str]]:
+    """Split a comma-separated `fields` query value into a list of keys.
+    Returns None when no projection was requested.
+    """
+    if not fields:
+        return None
+    keys = [f.strip() for f in fields.split(",") if f.strip()]
+    return keys or None
+
+
+def project_item(item: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Keep only the requested keys of an item.
+    Dotted keys (e.g. 'employer.name', 'salary.from') select nested values of raw
+    hh.ru objects and are rebuilt as nested dicts. Missing keys are skipped.
+    """
+    out: Dict[str, Any] = {}
+    for key in fields:
+        parts = key.split(".")
+        src: Any = item
+        found = True
+        for part in parts:
+            if not isinstance(src, dict) or part not in src:
+                found = False
+                break
+            src = src[part]
+        if not found:
+            continue
+        dst = out
+        for part in parts[:-1]:
+            nxt = dst.get(part)
+            if not isinstance(nxt, dict):
+                nxt = {}
+                dst[part] = nxt
+            dst = nxt
+        dst[parts[-1]] = src
+    return out
+
+
+def project_items(items: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Apply `project_item` to every item; no-op when fields is None."""
+    if not fields:
+        return items
+    return [project_item(it, fields) for it in items]
+
+
+@app.on_event("startup")
+async def start_employer_refresh():
+    if employer_service.EMPLOYER_REFRESH_SECONDS > 0:
+        # Keep a reference: the loop only holds a weak one, and shutdown cancels it
+        app.state.employer_refresh_task = asyncio.create_task(employer_service.refresh_loop())
+
+
+async def _cancel_state_task(name: str) -> None:
+    """Cancel a background task kept on app.state and wait for it to finish."""
+    task = getattr(app.state, name, None)
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        setattr(app.state, name, None)
+
+
+@app.on_event("shutdown")
+async def stop_employer_refresh():
+    await _cancel_state_task("employer_refresh_task")
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    if loop_monitor.LOOP_MONITOR_ENABLED:
+        app.state.loop_monitor_task = asyncio.create_task(loop_monitor.monitor.run())
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await _cancel_state_task("loop_monitor_task")
+
+
+def finish_request_metrics(request: Request, timing: metrics.RequestTiming, status: int) -> None:
+    """Record the latency histogram and slow-log entry of a finished request."""
+    # Route template keeps label cardinality low (unmatched paths are grouped)
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    duration = time.perf_counter() - timing.start
+    metrics.HTTP_REQUEST_DURATION.observe(duration, route=route, method=request.method, status=str(status))
+    slow_log.maybe_record(request.method, route, request.query_params, status, duration, timing)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    status = 500
+    timing, token = metrics.begin_request_timing(request.url.path)
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        if timing.handler_done is not None:
+            # Endpoints decorated with @metrics.server_timed
+            response.headers["Server-Timing"] = timing.server_timing()
+        # Upstream cost of this request and what is left of the daily hh.ru quota.
+        # A deferred (streamed) response reports its cost in the body instead.
+        if not timing.deferred:
+            response.headers["X-Upstream-Calls"] = str(timing.upstream_calls)
+        budget_left = upstream_budget.remaining()
+        if budget_left is not None:
+            response.headers["X-Upstream-Budget-Remaining"] = str(budget_left)
+        if timing.downgraded:
+            response.headers["X-Upstream-Downgraded"] = ",".join(timing.downgraded)
+        return response
+    finally:
+        metrics.end_request_timing(token)
+        # Headers are out but a deferred body is still streaming; it records itself when done
+        if not timing.deferred or status != 200:
+            finish_request_metrics(request, timing, status)
+
+
+async def fit_upstream_budget(query: str, area: Optional[int], pages: Optional[int], per_page: int, include_description: bool = False, source: str = "hh", sample_fraction: Optional[float] = None) -> Dict[str, Any]:
+    """Check a vacancy search against the daily hh.ru budget before running it.
+    With `sample_fraction` the cost is that of approximate=true sampling, which
+    cannot be downgraded. Returns the (possibly downgraded) plan; raises 429 when it cannot fit."""
+    live = source == "hh"
+    if source == "auto":
+        key = vacancy_store.run_key(query, area)
+        depth = pages * per_page if pages is not None else None
+        live = not await asyncio.to_thread(vacancy_store.is_fresh, key, pages is None, depth=depth)
+    search = None
+    if live and pages is None and upstream_budget.remaining() is not None:
+        # Size fetch-all from the live total: partitioned crawls go past SEARCH_DEPTH
+        found = (await fetch_vacancy_counts(query, area=area))["found"]
+        if sample_fraction is not None:
+            search = query_planner._sample_calls(found, per_page, sample_fraction)
+        else:
+            search = query_planner._search_calls(found, None, per_page)
+    plan = upstream_budget.plan_fetch(pages, per_page, include_description, live=live, search=search)
+    if sample_fraction is not None and plan["downgraded"]:
+        # Fewer pages would turn the sample into a truncated listing
+        plan["allowed"] = False
+    if not plan["allowed"]:
+        raise HTTPException(status_code=429, detail={
+            "error": "hh.ru call budget exhausted",
+            "estimated_calls": plan["estimate"]["total"],
+            "remaining": plan["remaining"],
+        })
+    if plan["downgraded"]:
+        timing = metrics.current_timing()
+        if timing is not None:
+            timing.downgraded.extend(plan["downgraded"])
+        print(f"⚠️ Downgraded '{query}' to fit hh.ru budget ({plan['remaining']} calls left): {', '.join(plan['downgraded'])}")
+    return plan
+
+
+def fit_resume_budget(missing: int) -> int:
+    """Check `missing` resume enrichments (not stored or cached) against the daily hh.ru
+    budget. Returns how many of them may be fetched; raises 429 when none fit."""
+    if not missing:
+        return 0
+    plan = upstream_budget.plan_items(missing, RESUME_ENRICH_CALLS)
+    if not plan["allowed"]:
+        raise HTTPException(status_code=429, detail={
+            "error": "hh.ru call budget exhausted",
+            "estimated_calls": plan["estimate"],
+            "remaining": plan["remaining"],
+        })
+    if plan["trimmed"]:
+        timing = metrics.current_timing()
+        if timing is not None:
+            timing.downgraded.append(f"resumes={plan['items']}")
+        print(f"⚠️ Trimmed {plan['trimmed']} of {missing} uncached resumes to fit hh.ru budget ({plan['remaining']} calls left)")
+    return plan["items"]
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token == ADMIN_TOKEN
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """Admin-only per-request profiling: `profile=1` query parameter or `X-Profile: 1` header."""
+    wanted = request.query_params.get("profile") == "1" or request.headers.get("x-profile") == "1"
+    if not wanted or not is_admin(request.headers.get("x-admin-token")):
+        return await call_next(request)
+    profiler, token = profiling.begin(request.method, request.url.path, request.url.query)
+    try:
+        response = await call_next(request)
+    finally:
+        profiling.finish(profiler, token)
+    response.headers["X-Profile-Id"] = str(profiler.id)
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus text exposition of request, upstream, cache and stage metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def admin_profiles():
+    """Recent request profiles (newest first)."""
+    return {"profiles": profiling.list_profiles()}
+
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def admin_profile(profile_id: int, format: str = Query("json", pattern="^(json|folded)$", description="'folded' = collapsed stacks for flamegraph.pl / speedscope")):
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(profile["folded"])
+    return profile["summary"]
+
+
+@app.get("/admin/loop-stalls", dependencies=[Depends(require_admin)])
+async def admin_loop_stalls():
+    """Event-loop lag summary and recent stalls with the stack of the blocking code."""
+    return loop_monitor.monitor.report()
+
+
+@app.get("/admin/upstream-budget", dependencies=[Depends(require_admin)])
+async def admin_upstream_budget():
+    """hh.ru calls in the rolling 24h window by originating route, against HH_DAILY_QUOTA."""
+    return upstream_budget.report()
+
+
+@app.get("/admin/slow-requests", dependencies=[Depends(require_admin)])
+async def admin_slow_requests(
+    limit: int = Query(50, ge=1, le=1000),
+    route: Optional[str] = Query(None, description="Only this route template, e.g. /analyze"),
+):
+    """Recent requests slower than SLOW_REQUEST_MS, newest first."""
+    return {
+        "threshold_ms": slow_log.SLOW_REQUEST_MS,
+        "file": slow_log.SLOW_LOG_FILE or None,
+        "entries": slow_log.recent(limit=limit, route=route),
+    }
+
+
+@app.delete("/admin/slow-requests", dependencies=[Depends(require_admin)])
+async def admin_clear_slow_requests():
+    return {"cleared": slow_log.clear()}
+
+
+@app.post("/admin/memory/tracemalloc/start", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_start(frames: int = Query(1, ge=1, le=50, description="Traceback depth kept per allocation")):
+    return memory_profiling.start(frames)
+
+
+@app.post("/admin/memory/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_stop():
+    """Stop tracing. Kept snapshots stay available for diffs."""
+    return memory_profiling.stop()
+
+
+@app.get("/admin/memory/tracemalloc", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_status():
+    return memory_profiling.status()
+
+
+@app.post("/admin/memory/snapshots", dependencies=[Depends(require_admin)])
+async def admin_memory_snapshot(
+    group_by: str = Query("lineno", pattern="^(filename|lineno|traceback)$"),
+    limit: int = Query(25, ge=1, le=500),
+):
+    """Take a tracemalloc snapshot and return its top allocators."""
+    try:
+        entry = memory_profiling.take_snapshot()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return memory_profiling.snapshot_top(entry["id"], group_by=group_by, limit=limit)
+
+
+@app.get("/admin/memory/snapshots/{snapshot_id}", dependencies=[Depends(require_admin)])
+async def admin_memory_snapshot_top(
+    snapshot_id: int,
+    group_by: str = Query("lineno", pattern="^(filename|lineno|traceback)$", description="'filename' groups by module"),
+    limit: int = Query(25, ge=1, le=500),
+):
+    try:
+        return memory_profiling.snapshot_top(snapshot_id, group_by=group_by, limit=limit)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+
+
+@app.get("/admin/memory/diff", dependencies=[Depends(require_admin)])
+async def admin_memory_diff(
+    base: int = Query(..., description="Earlier snapshot id"),
+    target: int = Query(..., description="Later snapshot id"),
+    group_by: str = Query("lineno", pattern="^(filename|lineno|traceback)$"),
+    limit: int = Query(25, ge=1, le=500),
+):
+    """Allocation growth between two snapshots, largest increase first."""
+    try:
+        return memory_profiling.snapshot_diff(base, target, group_by=group_by, limit=limit)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+
+
+@app.get("/admin/memory/caches", dependencies=[Depends(require_admin)])
+async def admin_memory_caches():
+    """Deep size of every known cache and store, plus process RSS."""
+    return memory_profiling.cache_report(extra={"main.cache": cache})
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
@@ -108,10 +459,20 @@ async def clear_cache():
     return {"message": "Cache disabled; nothing to clear"}
 
 
+@app.get("/store/info")
+async def store_info():
+    """Size and freshness settings of the local vacancy store."""
+    return await asyncio.to_thread(vacancy_store.store_stats)
+
+
 @app.get("/salary-validation")
+@metrics.server_timed
 async def salary_validation(query: str = Query(...), area: int = Query(2), pages: int = Query(1, ge=1, le=5), per_page: int = Query(50, ge=1, le=100)):
     """Validate salary parsing by showing raw salary data and normalized values."""
-    items = await fetch_vacancies(query=query, area=area, pages=pages, per_page=per_page)
+    pages = (await fit_upstream_budget(query, area, pages, per_page))["pages"]
+    with metrics.stage("fetch"):
+        items = await fetch_vacancies(query=query, area=area, pages=pages, per_page=per_page)
+    metrics.record_items("fetched", len(items))
     
     salary_samples = []
     for item in items[:10]:  # Show first 10 items
@@ -141,13 +502,18 @@ async def salary_validation(query: str = Query(...), area: int = Query(2), pages
 
 
 @app.get("/employer-marks")
+@metrics.server_timed
 async def employer_marks(query: str = Query(...), area: int = Query(2), pages: int = Query(1, ge=1, le=3), per_page: int = Query(20, ge=1, le=50)):
     """Show employer marks computation details and performance."""
     import time
     start_time = time.time()
     
-    items = await fetch_vacancies(query=query, area=area, pages=pages, per_page=per_page)
-    parsed = await parse_vacancies(items, with_employer_mark=True)
+    pages = (await fit_upstream_budget(query, area, pages, per_page))["pages"]
+    with metrics.stage("fetch"):
+        items = await fetch_vacancies(query=query, area=area, pages=pages, per_page=per_page)
+    with metrics.stage("parse"):
+        parsed = await parse_vacancies(items, with_employer_mark=True)
+    metrics.record_items("fetched", len(items))
     
     end_time = time.time()
     processing_time = round((end_time - start_time) * 1000, 2)
@@ -174,7 +540,39 @@ async def employer_marks(query: str = Query(...), area: int = Query(2), pages: i
     }
 
 
+@app.get("/facets")
+@metrics.server_timed
+async def facets(
+    query: str = Query(..., description="Search query"),
+    area: Optional[int] = Query(None),
+):
+    """Vacancy count and coarse distributions (salary bands, schedule, experience,
+    employment) from a single count-only hh.ru request with clusters."""
+    with metrics.stage("fetch"):
+        return await fetch_vacancy_counts(query, area=area, clusters=True)
+
+
+@app.get("/plan")
+async def plan(
+    query: str = Query(..., description="Search query"),
+    area: Optional[int] = Query(None),
+    pages: Optional[int] = Query(None),
+    per_page: int = Query(100, ge=1, le=100),
+    fetch_all: bool = Query(True, description="Plan a fetch of all available pages"),
+    include_description: bool = Query(False),
+    enrich: str = Query("all", pattern="^(need|all)$"),
+    source: str = Query("auto", pattern="^(auto|store|hh|index)$"),
+    incremental: bool = Query(False),
+):
+    """Estimate a search before running it: whether the store or hh.ru answers it,
+    upstream calls (search pages, partitioned crawl, detail calls), expected latency
+    and whether it fits the remaining hh.ru budget. Costs one 1-item hh.ru request
+    when the search would go live."""
+    return await query_planner.plan_search(query, area, None if fetch_all else pages, per_page, include_description=include_description, enrich=enrich, source=source, incremental=incremental)
+
+
 @app.get("/fetch")
+@metrics.server_timed
 async def fetch(
     query: str = Query(..., description="Search query, e.g. 'data scientist'"),
     area: Optional[int] = Query(None),
@@ -183,10 +581,20 @@ async def fetch(
     simplified: bool = Query(False),
     employer_mark: bool = Query(False),
     include_description: bool = Query(False),
-    fetch_all: bool = Query(True, description="If true, ignore 'pages' and fetch all available pages")
+    fetch_all: bool = Query(True, description="If true, ignore 'pages' and fetch all available pages"),
+    fields: Optional[str] = Query(None, description="Comma-separated keys to keep in each item, e.g. 'id,title,salary_avg' or 'id,name,employer.name'"),
+    raw: bool = Query(False, description="Return complete hh.ru items instead of the slimmed ingestion shape (ignored when simplified)"),
+    source: str = Query("auto", pattern="^(auto|store|hh|index)$", description="'hh' = live API, 'store' = local vacancy store only, 'auto' = store when fresh, 'index' = local full-text search"),
+    incremental: bool = Query(False, description="Refresh fetch-all runs from hh.ru incrementally using the stored published_at watermark"),
+    enrich: str = Query("all", pattern="^(need|all)$", description="With include_description: 'all' fetches every vacancy, 'need' fetches details only where they can change the result"),
+    employer_mark_source: str = Query("computed", pattern="^(computed|hh)$", description="'computed' = fast marks from vacancy signals, 'hh' = real employer ratings (cached) with computed fallback"),
+    dry_run: bool = Query(False, description="Only estimate upstream calls and latency (see /plan)")
 ):
+    if dry_run:
+        return await query_planner.plan_search(query, area, None if fetch_all else pages, per_page, include_description=include_description, enrich=enrich, source=source, incremental=incremental, raw=raw and not simplified)
+    field_list = parse_fields_param(fields)
     # Generate cache key
-    cache_key = get_cache_key(query, area, pages, per_page, simplified=simplified, employer_mark=employer_mark, include_description=include_description)
+    cache_key = get_cache_key(query, area, pages, per_page, simplified=simplified, employer_mark=employer_mark, include_description=include_description, fields=field_list, raw=raw, source=source, incremental=incremental, enrich=enrich, employer_mark_source=employer_mark_source)
     
     # Check cache first
     cached_result = get_from_cache(cache_key)
@@ -196,9 +604,26 @@ async def fetch(
     # Fetch data if not in cache
     # If fetch_all, ignore client-specified pages and fetch everything available
     effective_pages = None if fetch_all else pages
-    items = await fetch_vacancies(query=query, area=area, pages=effective_pages, per_page=per_page)
+    plan = await fit_upstream_budget(query, area, effective_pages, per_page, include_description, source="hh" if raw and not simplified else source)
+    effective_pages, include_description = plan["pages"], plan["include_description"]
+    with metrics.stage("fetch"):
+        if raw and not simplified:
+            # The store only keeps slim items, so raw payloads always come from hh.ru
+            items = await fetch_vacancies(query=query, area=area, pages=effective_pages, per_page=per_page, raw=True)
+        else:
+            items = await vacancy_store.fetch_vacancies_via_store(query=query, area=area, pages=effective_pages, per_page=per_page, source=source, incremental=incremental)
+    metrics.record_items("fetched", len(items))
+    enrichment: Optional[Dict[str, int]] = None
     if include_description:
-        await enrich_with_descriptions(items)
+        with metrics.stage("enrich"):
+            if enrich == "all":
+                await enrich_with_descriptions(items)
+            else:
+                # Unsimplified items are returned with key_skills, which only detail responses carry
+                enrichment = await enrich_selectively(items, need_skills=not simplified)
+        if not raw:
+            # Persist enriched descriptions for later store/full-text queries
+            await asyncio.to_thread(vacancy_store.upsert_vacancies, items)
     
     # Filter out vacancies with "Вахтовый метод" schedule from raw items
     filtered_items = []
@@ -209,7 +634,12 @@ async def fetch(
               filtered_items.append(item)
     
     if simplified:
-        parsed = await parse_vacancies(filtered_items, with_employer_mark=employer_mark)
+        ratings = None
+        if employer_mark and employer_mark_source == "hh":
+            employer_ids = {(it.get("employer") or {}).get("id") for it in filtered_items}
+            ratings = await employer_service.get_employer_ratings(employer_ids)
+        with metrics.stage("parse"):
+            parsed = await parse_vacancies(filtered_items, with_employer_mark=employer_mark, employer_ratings=ratings)
         # Change all Metro vacancies rating to 3.4
         for item in parsed:
             if (item.get("employer_name") and 
@@ -230,9 +660,13 @@ async def fetch(
             item for item in parsed
             if item.get("title") != "Инспектор по досмотру"
         ]
-        result = {"count": len(parsed), "items": parsed}
+        result = {"count": len(parsed), "items": project_items(parsed, field_list)}
     else:
-        result = {"count": len(filtered_items), "items": filtered_items}
+        result = {"count": len(filtered_items), "items": project_items(filtered_items, field_list)}
+    if enrichment is not None:
+        result["enrichment"] = enrichment
+        metrics.record_items("enriched", enrichment.get("fetched", 0))
+    metrics.record_items("returned", result["count"])
     
     # Store in cache
     set_cache(cache_key, result)
@@ -240,15 +674,37 @@ async def fetch(
 
 
 @app.get("/analyze")
+@metrics.server_timed
 async def analyze(
     query: str = Query(...),
     area: Optional[int] = Query(None),
     pages: Optional[int] = Query(None),
     per_page: int = Query(100, ge=1, le=100),
-    fetch_all: bool = Query(True, description="If true, ignore 'pages' and fetch all available pages")
+    fetch_all: bool = Query(True, description="If true, ignore 'pages' and fetch all available pages"),
+    source: str = Query("auto", pattern="^(auto|store|hh|index)$", description="'hh' = live API, 'store' = local vacancy store only, 'auto' = store when fresh, 'index' = local full-text search"),
+    incremental: bool = Query(False, description="Refresh fetch-all runs from hh.ru incrementally using the stored published_at watermark"),
+    streaming: bool = Query(False, description="Compute aggregates with the streaming pipeline straight from hh.ru (bounded memory, bypasses the store)"),
+    dry_run: bool = Query(False, description="Only estimate upstream calls and latency (see /plan)"),
+    approximate: bool = Query(False, description="Estimate the stats from a random sample of search pages, with bootstrap confidence intervals (exact store data is used when fresh)"),
+    sample_fraction: float = Query(0.1, gt=0, le=1, description="Share of search pages fetched with approximate=true"),
+    seed: Optional[int] = Query(None, description="Random seed for a reproducible approximate sample"),
+    include_description: bool = Query(False, description="With streaming=true: fetch descriptions (selectively) while paging, for per-shift pay and skills"),
+    page_concurrency: int = Query(4, ge=1, le=16, description="With streaming=true: concurrent search-page requests"),
+    enrich_concurrency: int = Query(8, ge=1, le=32, description="With streaming=true: concurrent vacancy-detail requests"),
 ):
+    if dry_run:
+        sampled = approximate and fetch_all and source in ("auto", "hh")
+        return await query_planner.plan_search(query, area, None if fetch_all else pages, per_page, include_description=streaming and include_description, enrich="need", source="hh" if streaming else source, incremental=incremental, sample_fraction=sample_fraction if sampled else None)
+    if approximate and fetch_all and source in ("auto", "hh"):
+        key = vacancy_store.run_key(query, area)
+        if source == "hh" or not await asyncio.to_thread(vacancy_store.is_fresh, key, True):
+            await fit_upstream_budget(query, area, None, per_page, source="hh", sample_fraction=sample_fraction)
+            result = await sampling.analyze_sampled(query=query, area=area, per_page=per_page, sample_fraction=sample_fraction, seed=seed)
+            metrics.record_items("returned", result["count"])
+            return result
     # Generate cache key for analyze endpoint
-    cache_key = get_cache_key(query, area, pages, per_page, endpoint="analyze")
+    include_description = streaming and include_description
+    cache_key = get_cache_key(query, area, pages, per_page, endpoint="analyze", source=source, incremental=incremental, streaming=streaming, include_description=include_description)
     
     # Check cache first
     cached_result = get_from_cache(cache_key)
@@ -257,7 +713,21 @@ async def analyze(
     
     # Fetch and analyze data if not in cache
     effective_pages = None if fetch_all else pages
-    items = await fetch_vacancies(query=query, area=area, pages=effective_pages, per_page=per_page)
+    plan = await fit_upstream_budget(query, area, effective_pages, per_page, include_description, source="hh" if streaming else source)
+    effective_pages, include_description = plan["pages"], plan["include_description"]
+    if streaming:
+        agg = await pipeline.analyze_stream(
+            query=query, area=area, pages=effective_pages, per_page=per_page,
+            include_description=include_description,
+            page_concurrency=page_concurrency, enrich_concurrency=enrich_concurrency,
+        )
+        metrics.record_items("returned", agg["count"])
+        result = {"query": query, "area": area, "count": agg["count"], "salaries": agg["salaries"], "hourly_rates": agg["hourly_rates"], "skills": agg["skills"]}
+        set_cache(cache_key, result)
+        return result
+    with metrics.stage("fetch"):
+        items = await vacancy_store.fetch_vacancies_via_store(query=query, area=area, pages=effective_pages, per_page=per_page, source=source, incremental=incremental)
+    metrics.record_items("fetched", len(items))
     
     # Filter out vacancies with "Вахтовый метод" schedule from raw items
     filtered_items = []
@@ -268,11 +738,14 @@ async def analyze(
               filtered_items.append(item)
     
     # Use parsed vacancies so per-shift monthly estimates are considered
-    parsed_for_stats = await parse_vacancies(filtered_items, with_employer_mark=False)
-    salaries = salary_stats(parsed_for_stats)
-    hourly_rates = hourly_rate_stats(parsed_for_stats)
-    skills = top_skills(filtered_items, top_n=20)
+    with metrics.stage("parse"):
+        parsed_for_stats = await parse_vacancies(filtered_items, with_employer_mark=False)
+    with metrics.stage("stats"):
+        salaries = salary_stats(parsed_for_stats)
+        hourly_rates = hourly_rate_stats(parsed_for_stats)
+        skills = top_skills(filtered_items, top_n=20)
     result = {"query": query, "area": area, "count": len(filtered_items), "salaries": salaries, "hourly_rates": hourly_rates, "skills": skills}
+    metrics.record_items("returned", len(filtered_items))
     
     # Store in cache
     set_cache(cache_key, result)
@@ -280,12 +753,13 @@ async def analyze(
 
 
 @app.get("/resume-stats")
+@metrics.server_timed
 async def resume_stats(
     resume_ids: List[str] = Query([], description="List of resume IDs to analyze (optional)"),
     vacancy_query: str = Query(..., description="Vacancy search text for denominator"),
     area: Optional[int] = Query(None),
-    pages: Optional[int] = Query(1, ge=1, le=5),
-    per_page: int = Query(50, ge=1, le=100),
+    pages: Optional[int] = Query(None, deprecated=True, description="Deprecated, ignored: vacancy_count now covers every matching vacancy, not the first pages*per_page"),
+    per_page: Optional[int] = Query(None, deprecated=True, description="Deprecated, ignored: vacancy_count now covers every matching vacancy, not the first pages*per_page"),
     oauth_token: Optional[str] = Query(None, description="Optional OAuth token for resume detail"),
     auto_collect: bool = Query(True, description="Automatically collect resume IDs from vacancy search")
 ):
@@ -293,102 +767,106 @@ async def resume_stats(
     - Active resumes: count of resumes whose job search status indicates activity.
       Specifically, status text contains "Активно ищу работу" or "Рассматриваю предложения".
     - Resumes per vacancy: active resumes divided by number of vacancies for `vacancy_query`.
+      vacancy_count is every matching vacancy (hh.ru `found`) minus "Вахтовый метод" ones,
+      read from one count-only request; it no longer stops at the first pages*per_page results.
     - If no resume_ids provided and auto_collect=True, automatically search for relevant resumes.
     """
     import datetime as _dt
 
-    # Auto-collect resume IDs if none provided and auto_collect is enabled
-    if not resume_ids and auto_collect:
-        try:
-            auto_resume_ids = await fetch_resume_ids_by_query(
-                query=vacancy_query, 
-                area=area, 
-                pages=1,  # Limit to 1 page for performance
-                per_page=50  # Limit to 20 resumes for performance
-            )
-            resume_ids = auto_resume_ids
-        except Exception as e:
-            print(f"Error auto-collecting resume IDs: {e}")
-            resume_ids = []
-
-    # Build rough resume items from given IDs; enrich to get details/updated_at
-    resume_items: List[Dict[str, Any]] = [{"id": rid, "public_url": f"https://hh.ru/resume/{rid}"} for rid in resume_ids if rid]
+    async def _resume_side(resume_ids: List[str]) -> Tuple[List[str], int, List[Dict[str, Any]], int]:
+        """Collect, enrich and classify resumes.
+        Returns (resume ids, total, active resumes, ids skipped to fit the hh.ru budget)."""
+        # Auto-collect resume IDs if none provided and auto_collect is enabled
+        if not resume_ids and auto_collect:
+            try:
+                auto_resume_ids = await fetch_resume_ids_by_query(
+                    query=vacancy_query, 
+                    area=area, 
+                    pages=1,  # Limit to 1 page for performance
+                    per_page=50  # Limit to 20 resumes for performance
+                )
+                resume_ids = auto_resume_ids
+            except Exception as e:
+                print(f"Error auto-collecting resume IDs: {e}")
+                resume_ids = []
+
+        # Build rough resume items from given IDs; enrich to get details/updated_at
+        resume_items: List[Dict[str, Any]] = [{"id": rid, "public_url": HH_RESUME_PUBLIC_URL.format(resume_id=rid)} for rid in resume_ids if rid]
     
-    # For auto-collected resumes, create mock data since we can't access real resume details
-    if resume_items and auto_collect and not oauth_token:
-        import random
-        import datetime
+        # For auto-collected resumes, create mock data since we can't access real resume details
+        if resume_items and auto_collect and not oauth_token:
+            import random
+            import datetime
         
-        # Create mock resume data
-        for item in resume_items:
-            # Generate realistic mock data
-            days_ago = random.randint(1, 90)  # Resume updated 1-90 days ago
-            updated_date = datetime.datetime.utcnow() - datetime.timedelta(days=days_ago)
-            # Mock job-search status
-            possible_statuses = [
-                "Активно ищу работу",
-                "Рассматриваю предложения",
-                "Не ищу работу",
-                "Откликнусь на интересные предложения",
-            ]
-            # Bias towards active statuses a bit so stats are informative
-            weights = [0.35, 0.35, 0.15, 0.15]
-            status_choice = random.choices(possible_statuses, weights=weights, k=1)[0]
+            # Create mock resume data
+            for item in resume_items:
+                # Generate realistic mock data
+                days_ago = random.randint(1, 90)  # Resume updated 1-90 days ago
+                updated_date = datetime.datetime.utcnow() - datetime.timedelta(days=days_ago)
+                # Mock job-search status
+                possible_statuses = [
+                    "Активно ищу работу",
+                    "Рассматриваю предложения",
+                    "Не ищу работу",
+                    "Откликнусь на интересные предложения",
+                ]
+                # Bias towards active statuses a bit so stats are informative
+                weights = [0.35, 0.35, 0.15, 0.15]
+                status_choice = random.choices(possible_statuses, weights=weights, k=1)[0]
             
-            item.update({
-                "title": f"Кандидат на позицию {vacancy_query}",
-                "updated_at": updated_date.isoformat() + "Z",
-                "area": {"name": "Санкт-Петербург"} if area == 2 else {"name": "Москва"},
-                "salary": None,
-                "key_skills": [{"name": skill} for skill in [
-                    "Работа в команде", "Ответственность", "Внимательность", 
-                    "Коммуникабельность", "Опыт работы"
-                ][:random.randint(2, 5)]]
-            })
-            # Provide text fields so status-based detection works without OAuth
-            item["resume_text"] = f"Статус: {status_choice}. Опыт работы, навыки и другие разделы резюме."
-            # Also include an explicit field for downstream parsers
-            item["job_search_status"] = status_choice
+                item.update({
+                    "title": f"Кандидат на позицию {vacancy_query}",
+                    "updated_at": updated_date.isoformat() + "Z",
+                    "area": {"name": "Санкт-Петербург"} if area == 2 else {"name": "Москва"},
+                    "salary": None,
+                    "key_skills": [{"name": skill} for skill in [
+                        "Работа в команде", "Ответственность", "Внимательность", 
+                        "Коммуникабельность", "Опыт работы"
+                    ][:random.randint(2, 5)]]
+                })
+                # Provide text fields so status-based detection works without OAuth
+                item["resume_text"] = f"Статус: {status_choice}. Опыт работы, навыки и другие разделы резюме."
+                # Also include an explicit field for downstream parsers
+                item["job_search_status"] = status_choice
         
-        parsed_resumes = resume_items  # Use mock data directly
-    else:
-        # Use real resume enrichment for manually provided IDs or with OAuth
-        if resume_items:
-            await enrich_resumes_with_details(resume_items, prefer_scrape=False, oauth_token=oauth_token)
-        parsed_resumes = await parse_resumes(resume_items) if resume_items else []
-
-    # Determine activity by job-search status phrases
-    ACTIVE_STATUS_PHRASES = [
-        "активно ищу работу",
-        "рассматриваю предложения",
-    ]
-
-    def _has_active_status(resume: Dict[str, Any]) -> bool:
-        """Return True if resume contains one of the active status phrases.
-        Checks explicit field `job_search_status` first, then falls back to `resume_text`/`title`.
-        """
-        # Prefer structured field if present
-        status_val = (resume.get("job_search_status") or "").strip().casefold()
-        if status_val and any(p in status_val for p in ACTIVE_STATUS_PHRASES):
-            return True
-        # Fallback to aggregated text search
-        blob = " ".join([
-            str(resume.get("resume_text") or ""),
-            str(resume.get("title") or ""),
-        ]).strip().casefold()
-        if not blob:
-            return False
-        return any(p in blob for p in ACTIVE_STATUS_PHRASES)
-
-    active_list: List[Dict[str, Any]] = [r for r in parsed_resumes if _has_active_status(r)]
+            parsed_resumes = resume_items  # Use mock data directly
+            return resume_ids, len(parsed_resumes), [r for r in parsed_resumes if has_active_status(r)], 0
+
+        # Uncached details cost up to RESUME_ENRICH_CALLS each; keep as many as the budget allows
+        missing = uncached_resume_ids([rm["id"] for rm in resume_items])
+        keep = fit_resume_budget(len(missing))
+        trimmed = len(missing) - keep
+        if trimmed:
+            dropped = set(missing[keep:])
+            resume_items = [rm for rm in resume_items if rm["id"] not in dropped]
+
+        # Use real resume enrichment for manually provided IDs or with OAuth.
+        # Details arrive over a pooled client and are counted as each one completes.
+        positions = {id(rm): pos for pos, rm in enumerate(resume_items)}
+        total = 0
+        active: List[Tuple[int, Dict[str, Any]]] = []
+        with metrics.stage("enrich"):
+            async for rm in iter_enriched_resumes(resume_items, prefer_scrape=False, oauth_token=oauth_token):
+                parsed = extract_resume_fields(rm)
+                total += 1
+                if has_active_status(parsed):
+                    active.append((positions[id(rm)], parsed))
+        active.sort(key=lambda t: t[0])
+        return resume_ids, total, [r for _pos, r in active], trimmed
+
+    async def _vacancy_side() -> Dict[str, Any]:
+        # Vacancy denominator from one count-only request with facets (no items downloaded)
+        with metrics.stage("fetch"):
+            return await fetch_vacancy_counts(vacancy_query, area=area, clusters=True)
+
+    # The branches are independent, so latency is the slower of the two rather than their sum
+    (resume_ids, total_resumes, active_list, trimmed_resumes), vacancy_counts = await asyncio.gather(_resume_side(resume_ids), _vacancy_side())
 
     active_count = len(active_list)
-    total_resumes = len(parsed_resumes)
-
-    # Fetch vacancies for denominator
-    vacancies_raw = await fetch_vacancies(query=vacancy_query, area=area, pages=pages, per_page=per_page)
-    vacancies_parsed = await parse_vacancies(vacancies_raw, with_employer_mark=False)
-    vacancy_count = len(vacancies_parsed)
+    facets = vacancy_counts.get("clusters", {})
+    vacancy_count = eligible_vacancy_count(vacancy_counts)
+    metrics.record_items("resumes", total_resumes)
+    metrics.record_items("vacancies", vacancy_count)
 
     resumes_per_vacancy = (active_count / vacancy_count) if vacancy_count > 0 else None
 
@@ -397,14 +875,103 @@ async def resume_stats(
         "vacancy_query": vacancy_query,
         "area": area,
         "total_resumes": total_resumes,
+        # Resume ids left out because their details did not fit the hh.ru budget
+        "trimmed_resume_ids": trimmed_resumes,
         "active_resumes": active_count,
         "active_share": (active_count / total_resumes) if total_resumes > 0 else None,
         "vacancy_count": vacancy_count,
+        # vacancy_count used to be the parsed first pages*per_page results
+        "vacancy_count_basis": "all matching vacancies minus 'Вахтовый метод'",
+        "vacancy_found": vacancy_counts["found"],
+        "vacancy_facets": {
+            "schedule": facets.get("schedule", []),
+            "experience": facets.get("experience", []),
+            "salary_bands": vacancy_counts.get("salary_bands", []),
+        },
         "resumes_per_vacancy": resumes_per_vacancy,
         "active_samples": active_list[:10],
     }
 
 
+@app.post("/resume-stats/bulk")
+async def resume_stats_bulk(
+    request: Request,
+    vacancy_query: Optional[str] = Query(None, description="Vacancy search text for resumes per vacancy (optional)"),
+    area: Optional[int] = Query(None),
+    oauth_token: Optional[str] = Query(None, description="Optional OAuth token for resume detail"),
+    chunk_size: int = Query(resume_service.RESUME_BULK_CHUNK, ge=10, le=1000, description="Resume ids processed per chunk"),
+):
+    """Active-resume statistics for large id lists (thousands of ids from an ATS export).
+    - Body: resume ids (or resume links) separated by newlines, commas or semicolons; NDJSON
+      and JSON lists work too. A CSV export with a header is read from its resume-id column.
+      Duplicates are dropped; ids beyond RESUME_BULK_MAX_IDS are ignored.
+    - Ids that are not stored are checked against the daily hh.ru budget first: under
+      UPSTREAM_BUDGET_POLICY=downgrade the ones that do not fit are skipped ("trimmed_ids"),
+      under reject (or when none fit) the request gets 429.
+    - The body is read in full first (tokenized as it arrives, so only the id list is kept);
+      the ids are then processed in chunks, reusing stored details and fetching only missing ones.
+    - Response: NDJSON, one running aggregate per chunk; the last line has "done": true
+      and, with `vacancy_query`, the vacancy count and resumes per vacancy (counted
+      like /resume-stats: found minus "Вахтовый метод").
+    - "upstream_calls" is the hh.ru cost so far (there is no X-Upstream-Calls header, it is
+      sent before any chunk); latency and the slow log are recorded after the last line.
+    """
+    # Only the (bounded) id list is kept while the body is read
+    ids, ignored = await resume_service.collect_resume_ids(request.stream())
+    if not ids:
+        raise HTTPException(status_code=400, detail="No resume ids found in the request body")
+    # Only ids missing from the store are fetched; check their worst-case cost against the budget
+    stored = await asyncio.to_thread(resume_service.stored_resume_ids, ids)
+    missing = [rid for rid in ids if rid not in stored]
+    keep = fit_resume_budget(len(missing))
+    trimmed = len(missing) - keep
+    if trimmed:
+        dropped = set(missing[keep:])
+        ids = [rid for rid in ids if rid not in dropped]
+    vacancy_task = asyncio.create_task(fetch_vacancy_counts(vacancy_query, area=area, clusters=True)) if vacancy_query else None
+
+    # The middleware returns once the headers are sent; the stream records its own metrics
+    timing = metrics.current_timing()
+    if timing is not None:
+        timing.deferred = True
+
+    async def _lines():
+        status = 500
+        try:
+            async for snapshot in resume_service.analyze_resume_stream(ids, oauth_token=oauth_token, chunk_size=chunk_size):
+                snapshot["ignored_ids"] = ignored
+                snapshot["trimmed_ids"] = trimmed
+                if timing is not None:
+                    snapshot["upstream_calls"] = timing.upstream_calls
+                if snapshot["done"]:
+                    metrics.record_items("resumes", snapshot["total_resumes"])
+                    if vacancy_task is not None:
+                        try:
+                            counts = await vacancy_task
+                            found, vacancy_count = counts["found"], eligible_vacancy_count(counts)
+                        except Exception as e:
+                            print(f"Error fetching vacancy count: {e}")
+                            found = vacancy_count = None
+                        snapshot.update({
+                            "vacancy_query": vacancy_query,
+                            "area": area,
+                            "vacancy_count": vacancy_count,
+                            "vacancy_found": found,
+                            "resumes_per_vacancy": (snapshot["active_resumes"] / vacancy_count) if vacancy_count else None,
+                        })
+                        if timing is not None:
+                            snapshot["upstream_calls"] = timing.upstream_calls
+                yield json.dumps(snapshot, ensure_ascii=False) + "\n"
+            status = 200
+        finally:
+            if vacancy_task is not None and not vacancy_task.done():
+                vacancy_task.cancel()
+            if timing is not None:
+                finish_request_metrics(request, timing, status)
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard():
     """Simple HTML dashboard that fetches /analyze and renders charts.
@@ -894,6 +1461,7 @@ async def dashboard():
       const data = await res.json();
       const analyzeEndTime = performance.now();
       const analyzeLoadTime = Math.round(analyzeEndTime - analyzeStartTime);
+      console.log('Analyze load time:', { ms: analyzeLoadTime, serverTiming: res.headers.get('Server-Timing') });
       const s = data.salaries || {};
       const topSkills = Array.isArray(data.skills) ? data.skills.slice(0, 12) : [];
       
@@ -1006,6 +1574,7 @@ async def dashboard():
       const fdata = await fres.json();
       const bubbleEndTime = performance.now();
       const bubbleLoadTime = Math.round(bubbleEndTime - bubbleStartTime);
+      console.log('Bubble chart load time:', { ms: bubbleLoadTime, serverTiming: fres.headers.get('Server-Timing') });
       const items = Array.isArray(fdata.items) ? fdata.items : [];
       console.log('Bubble chart data:', { itemsCount: items.length, sampleItem: items[0] });
       // Build salaries array (exclude per-shift)
@@ -3100,7 +3669,7 @@ async def dashboard():
 @app.post("/fetch_save")
 async def fetch_and_save(query: str = Query(...), area: Optional[int] = Query(None), pages: int = Query(1, ge=1, le=20), per_page: int = Query(50, ge=1, le=100)):
     """Fetch vacancies and save to data/ as JSON. Returns file path and count."""
-    items = await fetch_vacancies(query=query, area=area, pages=pages, per_page=per_page)
+    items = await fetch_vacancies(query=query, area=area, pages=pages, per_page=per_page, raw=True)
     base_dir = Path(__file__).resolve().parent.parent / "data"
     base_dir.mkdir(parents=True, exist_ok=True)
     safe_query = "".join([c if c.isalnum() or c in ("-","_") else "-" for c in query.lower().strip()])
@@ -0,0 +1,217 @@
+"""
+Memory diagnostics for the admin endpoints: tracemalloc control, snapshots and
+snapshot diffs (top allocators by module or line), plus the deep size of every
+known in-process cache and the on-disk size of the local stores.
+
+Snapshots are held in memory (newest MEMORY_SNAPSHOT_KEEP) and can be large
+themselves; stop tracing when done.
+"""
+
+import itertools
+import os
+import sys
+import time
+import tracemalloc
+import types
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+try:
+    from . import hh_parser_ver2
+    from . import vacancy_store
+    from . import profiling
+    from .loop_monitor import monitor as loop_monitor
+except Exception:
+    import hh_parser_ver2
+    import vacancy_store
+    import profiling
+    from loop_monitor import monitor as loop_monitor
+
+MEMORY_SNAPSHOT_KEEP = int(os.getenv("MEMORY_SNAPSHOT_KEEP", "5"))
+
+_snapshots: Deque[Dict[str, Any]] = deque(maxlen=MEMORY_SNAPSHOT_KEEP)
+_ids = itertools.count(1)
+
+# Filters applied to every snapshot so the tracer's own bookkeeping is not reported
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+# Objects that are shared infrastructure rather than cache contents
+_NO_DESCEND = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+# ---------------------------------------------------------------------------
+# tracemalloc
+# ---------------------------------------------------------------------------
+
+def start(frames: int = 1) -> Dict[str, Any]:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return status()
+
+
+def stop() -> Dict[str, Any]:
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return status()
+
+
+def status() -> Dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else None,
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "snapshots": [{k: s[k] for k in ("id", "taken_at", "traced_bytes")} for s in _snapshots],
+    }
+
+
+def _format_stats(stats: List[Any], limit: int) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for st in stats[:limit]:
+        frames = [f"{f.filename}:{f.lineno}" for f in st.traceback]
+        row: Dict[str, Any] = {"location": frames[0] if len(frames) == 1 else frames, "size_bytes": st.size, "count": st.count}
+        if hasattr(st, "size_diff"):
+            row["size_diff_bytes"] = st.size_diff
+            row["count_diff"] = st.count_diff
+        out.append(row)
+    return out
+
+
+def take_snapshot() -> Dict[str, Any]:
+    """Take and keep a filtered snapshot. Raises RuntimeError when not tracing."""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not tracing; start it first")
+    snap = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    entry = {
+        "id": next(_ids),
+        "taken_at": datetime.now().isoformat(timespec="seconds"),
+        "traced_bytes": tracemalloc.get_traced_memory()[0],
+        "snapshot": snap,
+    }
+    _snapshots.append(entry)
+    return entry
+
+
+def _get(snapshot_id: int) -> Dict[str, Any]:
+    for s in _snapshots:
+        if s["id"] == snapshot_id:
+            return s
+    raise KeyError(snapshot_id)
+
+
+def snapshot_top(snapshot_id: int, group_by: str = "lineno", limit: int = 25) -> Dict[str, Any]:
+    """Top allocators of one snapshot, grouped by module (filename), line or traceback."""
+    entry = _get(snapshot_id)
+    stats = entry["snapshot"].statistics(group_by)
+    return {
+        "id": entry["id"],
+        "taken_at": entry["taken_at"],
+        "group_by": group_by,
+        "total_bytes": sum(st.size for st in stats),
+        "top": _format_stats(stats, limit),
+    }
+
+
+def snapshot_diff(base_id: int, target_id: int, group_by: str = "lineno", limit: int = 25) -> Dict[str, Any]:
+    """Allocation growth from `base_id` to `target_id`, largest increase first."""
+    base, target = _get(base_id), _get(target_id)
+    stats = target["snapshot"].compare_to(base["snapshot"], group_by)
+    return {
+        "base": base_id,
+        "target": target_id,
+        "group_by": group_by,
+        "total_diff_bytes": sum(st.size_diff for st in stats),
+        "top": _format_stats(stats, limit),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Deep sizes
+# ---------------------------------------------------------------------------
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate retained size of a container and everything it references.
+    Shared objects are counted once; classes, modules and functions are not followed.
+    """
+    seen: set = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, _NO_DESCEND):
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        elif hasattr(o, "__dict__"):
+            stack.append(vars(o))
+    return size
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def cache_report(extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Entries and deep size of each known cache, plus store files and process RSS.
+    `extra` adds caches owned by the caller (e.g. main.py's response cache).
+    """
+    caches: Dict[str, Any] = {
+        "hh_parser_ver2._vacancy_desc_cache": hh_parser_ver2._vacancy_desc_cache,
+        "hh_parser_ver2._vacancy_skills_cache": hh_parser_ver2._vacancy_skills_cache,
+        "hh_parser_ver2._resume_detail_cache": hh_parser_ver2._resume_detail_cache,
+        "hh_parser_ver2._scrape_cache": hh_parser_ver2._scrape_cache,
+        "hh_parser_ver2._search_limiters": hh_parser_ver2._search_limiters,
+        "profiling._profiles": profiling._profiles,
+        "loop_monitor.stalls": loop_monitor.stalls,
+        **(extra or {}),
+    }
+    start_time = time.perf_counter()
+    sizes = {
+        name: {"entries": len(obj), "deep_bytes": deep_sizeof(obj)}
+        for name, obj in caches.items()
+    }
+    store_path = vacancy_store.STORE_PATH
+    try:
+        store = vacancy_store.store_stats()
+    except Exception as e:
+        store = {"error": str(e)}
+    store.update({
+        "db_bytes": _file_size(store_path),
+        "wal_bytes": _file_size(Path(str(store_path) + "-wal")),
+    })
+    return {
+        "rss_bytes": _rss_bytes(),
+        "caches": dict(sorted(sizes.items(), key=lambda kv: kv[1]["deep_bytes"], reverse=True)),
+        "vacancy_store": store,
+        "tracemalloc_snapshots": len(_snapshots),
+        "measure_ms": round((time.perf_counter() - start_time) * 1000, 1),
+    }
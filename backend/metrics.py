@@ -0,0 +1,381 @@
+"""
+In-process metrics with Prometheus text exposition (served by GET /metrics).
+
+Series:
+  http_request_duration_seconds{route,method,status}    histogram per API route
+  hh_upstream_requests_total{endpoint,status}            hh.ru calls by endpoint and status
+  hh_upstream_request_duration_seconds{endpoint}         hh.ru call latency
+  cache_requests_total{cache,result}                     hit / miss per cache
+  enrichment_queue_depth                                 vacancy detail fetches queued or in flight
+  stage_duration_seconds{stage}                          fetch / enrich / parse / stats
+  event_loop_lag_seconds                                 scheduling delay of the event loop
+  event_loop_stalls_total                                loop blocked longer than the stall threshold
+
+hh.ru calls are measured with httpx event hooks: pass `event_hooks=UPSTREAM_EVENT_HOOKS`
+and `transport=UpstreamTransport()` when creating an AsyncClient. The transport
+records calls that fail without a response (connect errors, timeouts) as
+status="error", since the request hook has already charged them to the budget.
+
+The same stage, cache and upstream records are also collected per request into a
+RequestTiming, which main.py turns into a `Server-Timing` response header.
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    from . import upstream_budget
+except Exception:
+    import upstream_budget
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_registry: List["_Metric"] = []
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        with _lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with _lock:
+            items = sorted(self._values.items()) or ([((), 0.0)] if not self.label_names else [])
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def get(self, **labels: str) -> float:
+        with _lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with _lock:
+            items = sorted(self._values.items()) or ([((), 0.0)] if not self.label_names else [])
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with _lock:
+            row = self._values.get(key)
+            if row is None:
+                row = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = row
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self) -> List[str]:
+        with _lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        out: List[str] = []
+        for key, row in items:
+            cumulative = 0.0
+            for upper, count in zip(self.buckets, row):
+                cumulative += count
+                out.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', _format_value(upper)))} {_format_value(cumulative)}")
+            out.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', '+Inf'))} {_format_value(row[-1])}")
+            out.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(row[-2])}")
+            out.append(f"{self.name}_count{_format_labels(self.label_names, key)} {_format_value(row[-1])}")
+        return out
+
+
+def render() -> str:
+    """All registered series in Prometheus text format."""
+    with _lock:
+        metrics = list(_registry)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Series
+# ---------------------------------------------------------------------------
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "API request latency by route.", ("route", "method", "status")
+)
+UPSTREAM_REQUESTS = Counter(
+    "hh_upstream_requests_total", "Calls made to hh.ru by endpoint and response status.", ("endpoint", "status")
+)
+UPSTREAM_DURATION = Histogram(
+    "hh_upstream_request_duration_seconds", "hh.ru call latency by endpoint.", ("endpoint",)
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result")
+)
+ENRICHMENT_QUEUE_DEPTH = Gauge(
+    "enrichment_queue_depth", "Vacancy detail fetches queued or in flight."
+)
+STAGE_DURATION = Histogram(
+    "stage_duration_seconds", "Duration of request processing stages (fetch, enrich, parse, stats).", ("stage",)
+)
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Event-loop scheduling delay measured by the lag monitor.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+LOOP_STALLS = Counter(
+    "event_loop_stalls_total", "Times the event loop was blocked longer than the stall threshold."
+)
+
+
+# ---------------------------------------------------------------------------
+# Per-request timing (Server-Timing)
+# ---------------------------------------------------------------------------
+
+# Header order of the stage entries
+SERVER_TIMING_STAGES = ("fetch", "enrich", "parse", "stats")
+
+
+class RequestTiming:
+    """Stage durations, cache results and upstream calls of one API request."""
+
+    def __init__(self, route: Optional[str] = None) -> None:
+        self.start = time.perf_counter()
+        # API path the upstream calls are charged to in the budget
+        self.route = route
+        self.stages: Dict[str, float] = {}
+        self.caches: Dict[str, List[int]] = {}
+        self.upstream_calls = 0
+        self.upstream_seconds = 0.0
+        self.upstream_endpoints: Dict[str, int] = {}
+        # Item counts reported by the endpoint (fetched, returned, ...)
+        self.items: Dict[str, int] = {}
+        # Parameters reduced to fit the upstream budget
+        self.downgraded: List[str] = []
+        # Set when the endpoint function returns; the rest until the response is serialization
+        self.handler_done: Optional[float] = None
+        # Streamed responses finish the request metrics themselves, after the last chunk
+        self.deferred = False
+
+    def server_timing(self, end: Optional[float] = None) -> str:
+        end = end if end is not None else time.perf_counter()
+        entries: List[str] = []
+        for name in SERVER_TIMING_STAGES + tuple(n for n in self.stages if n not in SERVER_TIMING_STAGES):
+            if name in self.stages:
+                entries.append(f"{name};dur={self.stages[name] * 1000:.1f}")
+        if self.upstream_calls:
+            # Summed over concurrent calls, so it can exceed the fetch stage
+            calls = f"{self.upstream_calls} call" + ("s" if self.upstream_calls != 1 else "")
+            entries.append(f'upstream;dur={self.upstream_seconds * 1000:.1f};desc="{calls}"')
+        if self.handler_done is not None:
+            entries.append(f"serialize;dur={(end - self.handler_done) * 1000:.1f}")
+        for cache, (hits, misses) in sorted(self.caches.items()):
+            if hits and misses:
+                desc = f"{hits} hit, {misses} miss"
+            else:
+                desc = "hit" if hits else "miss"
+            entries.append(f'cache-{cache};desc="{desc}"')
+        entries.append(f"total;dur={(end - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_request_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def begin_request_timing(route: Optional[str] = None) -> Tuple[RequestTiming, Token]:
+    timing = RequestTiming(route)
+    return timing, _request_timing.set(timing)
+
+
+def end_request_timing(token: Token) -> None:
+    _request_timing.reset(token)
+
+
+def server_timed(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Mark an async endpoint as emitting Server-Timing (records when it returns)."""
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            timing = _request_timing.get()
+            if timing is not None:
+                timing.handler_done = time.perf_counter()
+
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0) -> None:
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache=cache, result="hit")
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache=cache, result="miss")
+    timing = _request_timing.get()
+    if timing is not None and (hits or misses):
+        counts = timing.caches.setdefault(cache, [0, 0])
+        counts[0] += hits
+        counts[1] += misses
+
+
+def record_items(name: str, count: int) -> None:
+    """Report an item count of the current request (shown in the slow-request log)."""
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.items[name] = timing.items.get(name, 0) + count
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as one processing stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=name)
+        timing = _request_timing.get()
+        if timing is not None:
+            timing.stages[name] = timing.stages.get(name, 0.0) + elapsed
+
+
+# Path segments followed by an id on hh.ru (API and site)
+_ID_PARENTS = {"vacancies", "vacancy", "employers", "employer", "resumes", "resume", "areas"}
+
+
+def upstream_endpoint(url: str) -> str:
+    """Normalize an hh.ru URL to a low-cardinality endpoint label, e.g. /vacancies/{id}."""
+    parts = [p for p in urlsplit(url).path.split("/") if p]
+    out: List[str] = []
+    for i, part in enumerate(parts):
+        out.append("{id}" if i > 0 and parts[i - 1] in _ID_PARENTS else part)
+    return "/" + "/".join(out)
+
+
+def current_timing() -> Optional[RequestTiming]:
+    return _request_timing.get()
+
+
+async def _on_upstream_request(request: httpx.Request) -> None:
+    request.extensions["metrics_start"] = time.perf_counter()
+    timing = _request_timing.get()
+    upstream_budget.consume(timing.route if timing is not None else None)
+
+
+def _record_upstream(request: httpx.Request, status: str) -> None:
+    endpoint = upstream_endpoint(str(request.url))
+    UPSTREAM_REQUESTS.inc(endpoint=endpoint, status=status)
+    start = request.extensions.get("metrics_start")
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_DURATION.observe(elapsed, endpoint=endpoint)
+        timing = _request_timing.get()
+        if timing is not None:
+            timing.upstream_calls += 1
+            timing.upstream_seconds += elapsed
+            timing.upstream_endpoints[endpoint] = timing.upstream_endpoints.get(endpoint, 0) + 1
+
+
+async def _on_upstream_response(response: httpx.Response) -> None:
+    _record_upstream(response.request, str(response.status_code))
+
+
+class UpstreamTransport(httpx.AsyncBaseTransport):
+    """Default httpx transport that records hh.ru calls failing before a response.
+    Keyword arguments (e.g. `limits`) go to httpx.AsyncHTTPTransport."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        self._inner = httpx.AsyncHTTPTransport(**kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            return await self._inner.handle_async_request(request)
+        except Exception:
+            _record_upstream(request, "error")
+            raise
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+UPSTREAM_EVENT_HOOKS = {"request": [_on_upstream_request], "response": [_on_upstream_response]}
@@ -4,41 +4,24 @@ Monitor script to check when HH API starts returning results for driver searches
 """
 
 import asyncio
-import httpx
 import time
 from datetime import datetime
 
+from hh_parser_ver2 import fetch_vacancy_counts
+
 async def check_hh_api(query: str, area: int = 2):
-    """Check if HH API returns results for the given query."""
-    headers = {"User-Agent": "job-analytics-bot/1.0"}
-    params = {
-        "text": query,
-        "area": area,
-        "per_page": 100,
-        "page": 0
-    }
-    
+    """Check if HH API returns results for the given query (count-only request, no items)."""
     try:
-        async with httpx.AsyncClient(timeout=10.0, headers=headers) as client:
-            resp = await client.get("https://api.hh.ru/vacancies", params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            found = data.get("found", 0)
-            pages = data.get("pages", 0)
-            items_count = len(data.get("items", []))
-            
-            return {
-                "found": found,
-                "pages": pages,
-                "items_count": items_count,
-                "success": True
-            }
+        counts = await fetch_vacancy_counts(query, area=area)
+        return {
+            "found": counts["found"],
+            "pages": counts["pages"],
+            "success": True
+        }
     except Exception as e:
         return {
             "found": 0,
             "pages": 0,
-            "items_count": 0,
             "success": False,
             "error": str(e)
         }
@@ -0,0 +1,247 @@
+"""
+Streaming vacancy pipeline built from composable async-generator stages:
+
+    search_pages -> page_items -> enrich_stage -> parse_stage -> aggregate
+
+Every concurrent stage pulls from its upstream through a bounded queue, so a
+slow consumer applies backpressure all the way to hh.ru paging, enrichment
+overlaps with paging, and only the items in flight are held in memory.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+try:
+    from .hh_parser_ver2 import (
+        HH_SEARCH_DEPTH,
+        iter_partitioned_pages,
+        _search_page,
+        description_priority,
+        enrich_one_description,
+        extract_vacancy_fields,
+        slim_vacancy,
+    )
+    from .analytics import salary_stats, hourly_rate_stats, top_skills
+    from .metrics import ENRICHMENT_QUEUE_DEPTH, UPSTREAM_EVENT_HOOKS, UpstreamTransport, stage
+except Exception:
+    from hh_parser_ver2 import (
+        HH_SEARCH_DEPTH,
+        iter_partitioned_pages,
+        _search_page,
+        description_priority,
+        enrich_one_description,
+        extract_vacancy_fields,
+        slim_vacancy,
+    )
+    from analytics import salary_stats, hourly_rate_stats, top_skills
+    from metrics import ENRICHMENT_QUEUE_DEPTH, UPSTREAM_EVENT_HOOKS, UpstreamTransport, stage
+
+_DONE = object()
+_FAILED = object()
+
+
+async def map_stage(
+    source: AsyncIterator[Any],
+    fn: Callable[[Any], Awaitable[Any]],
+    concurrency: int = 4,
+    maxsize: int = 100,
+) -> AsyncIterator[Any]:
+    """Apply `fn` to every element of `source` with `concurrency` workers.
+    Input and output queues are bounded by `maxsize`; results are yielded as
+    they complete (order is not preserved). The first exception from `fn` or
+    `source` cancels the feeder and the other workers and is re-raised at once,
+    so no further upstream calls are started after a failure (e.g. a 429).
+    """
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    errors: List[BaseException] = []
+    tasks: List[asyncio.Task] = []
+
+    async def _fail(exc: BaseException) -> None:
+        if not errors:
+            errors.append(exc)
+        me = asyncio.current_task()
+        for t in tasks:
+            if t is not me:
+                t.cancel()
+        # Wake the consumer; it checks `errors` before yielding anything else
+        await outbox.put(_FAILED)
+
+    async def _feed() -> None:
+        try:
+            async for elem in source:
+                await inbox.put(elem)
+        except Exception as e:
+            await _fail(e)
+            return
+        finally:
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        for _ in range(concurrency):
+            await inbox.put(_DONE)
+
+    async def _work() -> None:
+        try:
+            while True:
+                elem = await inbox.get()
+                if elem is _DONE:
+                    break
+                await outbox.put(await fn(elem))
+        except Exception as e:
+            await _fail(e)
+            return
+        await outbox.put(_DONE)
+
+    tasks.append(asyncio.create_task(_feed()))
+    tasks.extend(asyncio.create_task(_work()) for _ in range(concurrency))
+    try:
+        finished = 0
+        while finished < concurrency:
+            res = await outbox.get()
+            if errors:
+                raise errors[0]
+            if res is _DONE:
+                finished += 1
+                continue
+            yield res
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _iterate(values: List[Any]) -> AsyncIterator[Any]:
+    for v in values:
+        yield v
+
+
+async def search_pages(
+    query: str,
+    area: Optional[int] = None,
+    pages: Optional[int] = None,
+    per_page: int = 100,
+    concurrency: int = 4,
+    meta: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield raw hh.ru search pages (lists of items) as they arrive.
+    Searches over HH_SEARCH_DEPTH with pages=None fall back to the partitioned
+    crawl, whose windows are yielded page by page as well.
+    """
+    headers = {"User-Agent": "job-analytics-bot/1.0", "Accept": "application/json"}
+    params: Dict[str, Any] = {"per_page": per_page}
+    if isinstance(query, str) and query.strip():
+        params["text"] = query
+    if area is not None:
+        params["area"] = area
+    async with httpx.AsyncClient(timeout=20.0, headers=headers, transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS) as client:
+        first = await _search_page(client, params, 0)
+        found = int(first.get("found", 0))
+        total_pages = int(first.get("pages", 0))
+        if meta is not None:
+            meta["found"] = found
+            meta["pages"] = total_pages
+        if pages is None and found > HH_SEARCH_DEPTH:
+            crawl_meta: Dict[str, Any] = {}
+            async for page in iter_partitioned_pages(client, params, None, crawl_meta):
+                yield page
+            if meta is not None:
+                meta["partitioned"] = True
+                meta["truncated"] = bool(crawl_meta.get("truncated"))
+            return
+        yield first.get("items", [])
+        last = total_pages if pages is None else min(pages, total_pages)
+
+        async def _page(p: int) -> List[Dict[str, Any]]:
+            data = await _search_page(client, params, p)
+            return data.get("items", [])
+
+        async for page_items in map_stage(_iterate(list(range(1, last))), _page, concurrency=concurrency, maxsize=concurrency):
+            yield page_items
+
+
+async def page_items(pages_iter: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+    """Flatten pages into slimmed vacancy items."""
+    async for page in pages_iter:
+        for v in page:
+            yield slim_vacancy(v)
+
+
+async def enrich_stage(
+    items: AsyncIterator[Dict[str, Any]],
+    concurrency: int = 8,
+    maxsize: int = 100,
+    prefer_scrape: bool = False,
+    selective: bool = True,
+    need_skills: bool = False,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Attach 'description_text' to items with bounded concurrency.
+    With `selective`, items whose result cannot change (see description_priority)
+    pass through without a detail call; `need_skills` also fetches items lacking key_skills.
+    """
+    async def _enrich(v: Dict[str, Any]) -> Dict[str, Any]:
+        if selective and description_priority(v, need_skills=need_skills) is None:
+            return v
+        ENRICHMENT_QUEUE_DEPTH.inc()
+        try:
+            await enrich_one_description(v, prefer_scrape=prefer_scrape)
+        finally:
+            ENRICHMENT_QUEUE_DEPTH.dec()
+        return v
+
+    async for v in map_stage(items, _enrich, concurrency=concurrency, maxsize=maxsize):
+        yield v
+
+
+async def parse_stage(items: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """Yield `extract_vacancy_fields` output, skipping "Вахтовый метод" like parse_vacancies.
+    key_skills are carried over so skills can be counted downstream.
+    """
+    async for v in items:
+        parsed = extract_vacancy_fields(v)
+        if parsed.get("schedule") == "Вахтовый метод":
+            continue
+        if v.get("key_skills"):
+            parsed["key_skills"] = v["key_skills"]
+        yield parsed
+
+
+_STATS_KEYS = ("salary", "salary_avg", "salary_per_shift", "salary_estimated_monthly", "schedule", "key_skills")
+
+
+async def aggregate(parsed: AsyncIterator[Dict[str, Any]], top_n: int = 20) -> Dict[str, Any]:
+    """Consume parsed items into the /analyze aggregates.
+    Only the handful of fields the stats need are kept per item.
+    """
+    rows: List[Dict[str, Any]] = []
+    async for p in parsed:
+        rows.append({k: p.get(k) for k in _STATS_KEYS})
+    with stage("stats"):
+        return {
+            "count": len(rows),
+            "salaries": salary_stats(rows),
+            "hourly_rates": hourly_rate_stats(rows),
+            "skills": top_skills(rows, top_n=top_n),
+        }
+
+
+async def analyze_stream(
+    query: str,
+    area: Optional[int] = None,
+    pages: Optional[int] = None,
+    per_page: int = 100,
+    include_description: bool = False,
+    page_concurrency: int = 4,
+    enrich_concurrency: int = 8,
+    queue_size: int = 100,
+) -> Dict[str, Any]:
+    """Run the full pipeline and return /analyze-style aggregates."""
+    stream: AsyncIterator[Dict[str, Any]] = page_items(
+        search_pages(query, area=area, pages=pages, per_page=per_page, concurrency=page_concurrency)
+    )
+    if include_description:
+        # Skills are aggregated below, so items still missing key_skills need their detail
+        stream = enrich_stage(stream, concurrency=enrich_concurrency, maxsize=queue_size, need_skills=True)
+    return await aggregate(parse_stage(stream))
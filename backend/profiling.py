@@ -0,0 +1,219 @@
+"""
+On-demand sampling profiler for single API requests.
+
+While a profiled request runs, a background thread samples the event-loop
+thread's Python stack every PROFILE_INTERVAL_MS:
+  - when the loop is executing Python code the sample is CPU work
+    (e.g. parse_vacancies, estimate_monthly_salary_from_text)
+  - when the loop is idle in the selector the sample is an async wait; it is
+    attributed to the profiled request's await chain (e.g. fetch_vacancies ->
+    _search_page -> AsyncClient.get), prefixed with "[await]"
+
+Stacks are kept in the folded format ("frame;frame;frame count") understood by
+flamegraph.pl and speedscope. Finished profiles are kept in memory (newest
+PROFILE_KEEP) and served by the admin endpoints in main.py.
+
+Samples are taken from the whole event-loop thread, so CPU work of other
+requests running at the same time shows up as well.
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+# Deeper stacks are cut from the root side
+MAX_STACK_DEPTH = 120
+
+# Leaf frames meaning "the event loop is waiting for I/O or timers"
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("base_events.py", "_run_once"),
+    ("base_events.py", "run_forever"),
+    ("base_events.py", "run_until_complete"),
+    ("runners.py", "run"),
+}
+
+_ids = itertools.count(1)
+_profiles: Deque[Dict[str, Any]] = deque(maxlen=PROFILE_KEEP)
+_active: ContextVar[Optional["RequestProfiler"]] = ContextVar("active_profile", default=None)
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _thread_stack(frame: Any) -> List[Any]:
+    """Frames from root to leaf."""
+    frames: List[Any] = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames[-MAX_STACK_DEPTH:]
+
+
+def _is_idle(leaf: Any) -> bool:
+    code = leaf.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+def _await_chain(task: "asyncio.Task") -> List[str]:
+    """Suspended coroutine chain of a task, root to the awaited future.
+    When the innermost await is an asyncio.gather, the chain continues into
+    its first pending child task.
+    """
+    labels: List[str] = []
+    obj: Any = task.get_coro()
+    current = task
+    for _ in range(MAX_STACK_DEPTH):
+        frame = getattr(obj, "cr_frame", None) or getattr(obj, "gi_frame", None) or getattr(obj, "ag_frame", None)
+        if frame is not None:
+            labels.append(_frame_label(frame))
+            obj = getattr(obj, "cr_await", None) or getattr(obj, "gi_yieldfrom", None) or getattr(obj, "ag_await", None)
+            if obj is not None:
+                continue
+        # End of this task's coroutines: look at the future the task is blocked on
+        waiter = getattr(current, "_fut_waiter", None)
+        children = getattr(waiter, "_children", None)
+        pending = [c for c in children or [] if not c.done()]
+        if pending and isinstance(pending[0], asyncio.Task):
+            labels.append(f"gather ({len(pending)} pending)")
+            current = pending[0]
+            obj = current.get_coro()
+            continue
+        if waiter is not None:
+            labels.append(type(waiter).__name__)
+        break
+    return labels
+
+
+class RequestProfiler:
+    """Samples the event-loop thread in a background thread while a request runs."""
+
+    def __init__(self, method: str, path: str, query: str, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.id = next(_ids)
+        self.method = method
+        self.path = path
+        self.query = query
+        self.interval = max(interval_ms, 0.5) / 1000.0
+        self.loop_thread = threading.get_ident()
+        self.task: Optional[asyncio.Task] = None
+        self.stacks: Counter = Counter()
+        self.cpu_samples = 0
+        self.wait_samples = 0
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._start = 0.0
+        self._elapsed = 0.0
+        self._halt = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._halt.set()
+        self._thread.join()
+        self._elapsed = time.perf_counter() - self._start
+
+    def _run(self) -> None:
+        while not self._halt.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self.loop_thread)
+        if frame is None:
+            return
+        stack = _thread_stack(frame)
+        if _is_idle(stack[-1]):
+            self.wait_samples += 1
+            chain = _await_chain(self.task) if self.task is not None and not self.task.done() else []
+            key = ";".join(["[await]"] + chain) if chain else "[idle]"
+        else:
+            self.cpu_samples += 1
+            key = ";".join(_frame_label(f) for f in stack)
+        self.stacks[key] += 1
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self, top: int = 30) -> Dict[str, Any]:
+        inclusive: Counter = Counter()
+        self_samples: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            for label in set(frames):
+                inclusive[label] += count
+            self_samples[frames[-1]] += count
+        total = self.cpu_samples + self.wait_samples
+        interval_ms = self.interval * 1000
+
+        def _named(name: str) -> Dict[str, Any]:
+            n = sum(c for label, c in inclusive.items() if label.startswith(name + " ("))
+            return {"samples": n, "approx_ms": round(n * interval_ms, 1)}
+
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "started_at": self.started_at,
+            "duration_ms": round(self._elapsed * 1000, 1),
+            "interval_ms": interval_ms,
+            "samples": total,
+            "cpu_samples": self.cpu_samples,
+            "wait_samples": self.wait_samples,
+            "cpu_share": round(self.cpu_samples / total, 3) if total else None,
+            "focus": {
+                name: _named(name)
+                for name in ("parse_vacancies", "extract_vacancy_fields", "estimate_monthly_salary_from_text", "fetch_vacancies", "enrich_one_description")
+            },
+            "top_inclusive": [{"frame": f, "samples": c} for f, c in inclusive.most_common(top)],
+            "top_self": [{"frame": f, "samples": c} for f, c in self_samples.most_common(top)],
+        }
+
+
+def begin(method: str, path: str, query: str):
+    """Start profiling the current request. Returns (profiler, context token)."""
+    profiler = RequestProfiler(method, path, query)
+    token = _active.set(profiler)
+    profiler.start()
+    return profiler, token
+
+
+def finish(profiler: RequestProfiler, token: Any) -> None:
+    profiler.stop()
+    _active.reset(token)
+    _profiles.append({"summary": profiler.summary(), "folded": profiler.folded()})
+
+
+async def attach_request_task() -> None:
+    """App-wide dependency: runs inside the task that executes the endpoint,
+    so the profiler can follow that task's await chain during waits."""
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.task = asyncio.current_task()
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    return [
+        {k: p["summary"][k] for k in ("id", "method", "path", "query", "started_at", "duration_ms", "samples", "cpu_share")}
+        for p in reversed(_profiles)
+    ]
+
+
+def get_profile(profile_id: int) -> Optional[Dict[str, Any]]:
+    for p in _profiles:
+        if p["summary"]["id"] == profile_id:
+            return p
+    return None
@@ -0,0 +1,162 @@
+"""
+Cost planner for vacancy searches (GET /plan and `dry_run=true` on /fetch and /analyze).
+
+For a search that would go to hh.ru, one count-only request reads `found`; from it
+the planner estimates the search pages (including partitioned crawling past
+HH_SEARCH_DEPTH), the detail calls of description enrichment and the expected
+latency at the current concurrency limits, using the probe's own round trip as
+the per-call latency. Searches answered by the local store cost nothing and are
+not probed.
+"""
+
+import asyncio
+import math
+import time
+from typing import Any, Dict, Optional
+
+try:
+    from .hh_parser_ver2 import HH_SEARCH_CONCURRENCY, HH_SEARCH_DEPTH, fetch_vacancy_counts
+    from . import vacancy_store
+    from . import upstream_budget
+    from .sampling import APPROX_MIN_PAGES
+except Exception:
+    from hh_parser_ver2 import HH_SEARCH_CONCURRENCY, HH_SEARCH_DEPTH, fetch_vacancy_counts
+    import vacancy_store
+    import upstream_budget
+    from sampling import APPROX_MIN_PAGES
+
+# Concurrent detail requests in enrich_with_descriptions
+DETAIL_CONCURRENCY = 8
+
+
+def _search_calls(found: int, pages: Optional[int], per_page: int) -> Dict[str, Any]:
+    """Search requests needed to list `found` items (the probe not included)."""
+    if pages is not None or found <= HH_SEARCH_DEPTH:
+        reachable = min(found, HH_SEARCH_DEPTH)
+        n_pages = max(1, math.ceil(reachable / per_page)) if reachable else 1
+        if pages is not None:
+            n_pages = min(n_pages, pages)
+        return {"calls": n_pages, "items": min(reachable, n_pages * per_page), "partitioned": False, "windows": 1, "sequential": 1}
+    # Published-date bisection (_crawl_window): assuming evenly spread dates, the
+    # tree has `leaves` windows under the cap; every node costs its page-0 request.
+    # Windows are crawled one after another, so those requests are sequential.
+    depth = math.ceil(math.log2(found / HH_SEARCH_DEPTH))
+    leaves = 2 ** depth
+    inner = leaves - 1
+    leaf_pages = math.ceil(found / per_page) + leaves
+    tail = 1  # search for anything older than the lookback window
+    return {"calls": inner + leaf_pages + tail, "items": found, "partitioned": True, "windows": leaves, "sequential": inner + leaves + tail}
+
+
+def _sample_calls(found: int, per_page: int, sample_fraction: float, min_pages: int = APPROX_MIN_PAGES) -> Dict[str, Any]:
+    """Requests of sampling.analyze_sampled: its count probes plus the sampled pages."""
+    if found <= HH_SEARCH_DEPTH:
+        population = max(1, math.ceil(found / per_page))
+        pages = min(population, max(min_pages, math.ceil(sample_fraction * population)))
+        return {"calls": 1 + pages, "probes": 1, "pages": pages, "items": min(found, pages * per_page)}
+    # Date windows plus the tail; only the drawn ones are probed (once, evenly spread
+    # windows need no bisection) and read in full
+    windows = 2 * math.ceil(found / HH_SEARCH_DEPTH)
+    units = windows + 1
+    drawn = min(units, max(2, math.ceil(sample_fraction * units)))
+    per_window = found / windows
+    pages = min(drawn, windows) * math.ceil(per_window / per_page)
+    probes = 1 + drawn
+    return {"calls": probes + pages, "probes": probes, "pages": pages, "items": min(found, round(min(drawn, windows) * per_window))}
+
+
+async def plan_search(
+    query: str,
+    area: Optional[int] = None,
+    pages: Optional[int] = None,
+    per_page: int = 100,
+    include_description: bool = False,
+    enrich: str = "all",
+    source: str = "auto",
+    incremental: bool = False,
+    raw: bool = False,
+    sample_fraction: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Estimate where a search would be answered from and its hh.ru cost. `pages=None` = fetch all.
+    With `sample_fraction`, a fetch-all that goes to hh.ru is costed as approximate=true
+    sampling (count probes plus the sampled pages) instead of a full listing."""
+    key = vacancy_store.run_key(query, area)
+    run = await asyncio.to_thread(vacancy_store.get_run, key)
+    if raw:
+        served_from = "hh"
+    elif source in ("store", "index"):
+        served_from = source
+    elif source == "auto" and await asyncio.to_thread(vacancy_store.is_fresh, key, pages is None, depth=pages * per_page if pages is not None else None):
+        served_from = "store"
+    elif incremental and pages is None and run and run.get("complete"):
+        served_from = "hh_incremental"
+    else:
+        served_from = "hh"
+
+    plan: Dict[str, Any] = {
+        "query": query,
+        "area": area,
+        "served_from": served_from,
+        "stored_run": {"items": run.get("item_count"), "complete": bool(run.get("complete")), "fetched_at": run.get("fetched_at")} if run else None,
+        "found": None,
+        "partitioned": False,
+        "upstream_calls": {"probe": 0, "search_pages": 0, "details": 0, "total": 0},
+        "expected_items": None,
+        "expected_seconds": 0.0,
+    }
+
+    probe_calls, found, latency = 0, None, None
+    if served_from.startswith("hh"):
+        # One count-only request, as in sync_vacancies, to read the live total
+        date_from = await asyncio.to_thread(vacancy_store.get_watermark, key) if served_from == "hh_incremental" else None
+        started = time.perf_counter()
+        counts = await fetch_vacancy_counts(query=query, area=area, date_from=date_from)
+        latency = time.perf_counter() - started
+        probe_calls, found = 1, counts["found"]
+        plan["found"] = found
+
+    if found is not None and sample_fraction is not None and pages is None and served_from == "hh":
+        sample = _sample_calls(found, per_page, sample_fraction)
+        # The sampler repeats the total probe, so it is counted in its calls
+        search = {"calls": sample["calls"], "items": sample["items"], "sequential": 2 if sample["probes"] > 1 else 1}
+        items = sample["items"]
+        search_calls = sample["calls"]
+        plan["approximate"] = {"sampled_pages": sample["pages"], "probes": sample["probes"], "sample_fraction": sample_fraction}
+    elif found is not None:
+        search = _search_calls(found, pages, per_page)
+        items = search["items"]
+        search_calls = search["calls"]
+        plan["partitioned"] = search["partitioned"]
+        if search["partitioned"]:
+            plan["windows"] = search["windows"]
+        if served_from == "hh_incremental":
+            # Plus the live-total check done after merging
+            search_calls += 1
+    else:
+        search = {"sequential": 0}
+        items = plan["stored_run"]["items"] if run else None
+        search_calls = 0
+    plan["expected_items"] = items
+
+    details = 0
+    if include_description and items:
+        # Upper bound: stored descriptions and enrich=need skip part of these
+        details = items
+        plan["details_note"] = "upper bound" if enrich == "need" or served_from != "hh" else "all items"
+    total = probe_calls + search_calls + details
+    plan["upstream_calls"] = {"probe": probe_calls, "search_pages": search_calls, "details": details, "total": total}
+
+    if latency is not None:
+        # Page 0 of every window is sequential; the rest runs under the limiters
+        rounds = search["sequential"] + math.ceil(max(0, search_calls - search["sequential"]) / HH_SEARCH_CONCURRENCY)
+        rounds += math.ceil(details / DETAIL_CONCURRENCY)
+        plan["probe_latency_ms"] = round(latency * 1000, 1)
+        plan["expected_seconds"] = round(rounds * latency, 2)
+
+    left = upstream_budget.remaining()
+    plan["budget"] = {
+        "remaining": left,
+        "fits": left is None or total - probe_calls <= left,
+    }
+    return plan
+
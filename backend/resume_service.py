@@ -0,0 +1,275 @@
+"""
+Bulk resume analytics for large id lists (ATS exports), behind POST /resume-stats/bulk.
+
+Ids are tokenized from the request body as it arrives (deduplicated, capped at
+RESUME_BULK_MAX_IDS; a CSV export is read from its resume-id column). Once the
+whole body has been read, they are processed in chunks of RESUME_BULK_CHUNK:
+enriched resumes live in the local store database (RESUME_TTL_SECONDS), so only
+missing or stale ids are fetched, over pooled clients with bounded concurrency.
+Active status is matched with the precompiled matcher from analytics, and an
+aggregate snapshot is emitted after every chunk.
+"""
+
+import asyncio
+import codecs
+import csv
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .hh_parser_ver2 import HH_RESUME_PUBLIC_URL, HH_RESUME_CONCURRENCY, extract_resume_fields, iter_enriched_resumes
+    from .analytics import has_active_status
+    from . import vacancy_store
+    from .metrics import record_cache, stage
+except Exception:
+    from hh_parser_ver2 import HH_RESUME_PUBLIC_URL, HH_RESUME_CONCURRENCY, extract_resume_fields, iter_enriched_resumes
+    from analytics import has_active_status
+    import vacancy_store
+    from metrics import record_cache, stage
+
+RESUME_TTL_SECONDS = int(os.getenv("RESUME_TTL_SECONDS", str(7 * 24 * 3600)))
+RESUME_BULK_CHUNK = int(os.getenv("RESUME_BULK_CHUNK", "200"))
+RESUME_BULK_MAX_IDS = int(os.getenv("RESUME_BULK_MAX_IDS", "50000"))
+# Active samples kept in the aggregate
+SAMPLE_SIZE = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resumes (
+    id TEXT PRIMARY KEY,
+    item_json TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+# hh.ru resume ids are 38-character hex strings. Requiring 32+ hex characters keeps
+# out phone numbers, dates and other numeric CSV cells; purely numeric tokens are
+# rejected as well. Resume links (.../resume/<id>) are accepted too.
+_ID_RE = re.compile(r"^[0-9a-fA-F]{32,64}$")
+_URL_ID_RE = re.compile(r"/resume/([0-9a-fA-F]{32,64})")
+_SEPARATORS_RE = re.compile(r"[\s,;]+")
+# CSV header cells naming the resume-id column; a bare "id" is used only when nothing else matches
+_ID_HEADER_RE = re.compile(r"resume|резюме", re.I)
+
+_initialized: set = set()
+
+
+def _connect(path: Optional[Path] = None):
+    conn = vacancy_store.connect(path)
+    key = str(path or vacancy_store.STORE_PATH)
+    if key not in _initialized:
+        conn.executescript(_SCHEMA)
+        _initialized.add(key)
+    return conn
+
+
+def load_resumes(ids: Iterable[str], max_age: int = RESUME_TTL_SECONDS, path: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    """Stored enriched resume items younger than `max_age` seconds."""
+    id_list = [str(i) for i in ids if i]
+    out: Dict[str, Dict[str, Any]] = {}
+    cutoff = time.time() - max_age
+    conn = _connect(path)
+    try:
+        for start in range(0, len(id_list), 500):
+            chunk = id_list[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT id, item_json FROM resumes WHERE fetched_at >= ? AND id IN ({placeholders})", [cutoff, *chunk])
+            for row in rows:
+                out[row["id"]] = json.loads(row["item_json"])
+    finally:
+        conn.close()
+    return out
+
+
+def stored_resume_ids(ids: Iterable[str], max_age: int = RESUME_TTL_SECONDS, path: Optional[Path] = None) -> Set[str]:
+    """Ids among `ids` with a stored item younger than `max_age` (items are not loaded)."""
+    id_list = [str(i) for i in ids if i]
+    out: Set[str] = set()
+    cutoff = time.time() - max_age
+    conn = _connect(path)
+    try:
+        for start in range(0, len(id_list), 500):
+            chunk = id_list[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT id FROM resumes WHERE fetched_at >= ? AND id IN ({placeholders})", [cutoff, *chunk])
+            out.update(row["id"] for row in rows)
+    finally:
+        conn.close()
+    return out
+
+
+def save_resumes(items: List[Dict[str, Any]], path: Optional[Path] = None) -> None:
+    now = time.time()
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO resumes (id, item_json, fetched_at) VALUES (?, ?, ?)",
+                [(str(it["id"]), json.dumps(it, ensure_ascii=False), now) for it in items if it.get("id")],
+            )
+    finally:
+        conn.close()
+
+
+def resume_id_from(token: str) -> Optional[str]:
+    """The resume id in a token (a bare id or a resume link), or None."""
+    tok = token.strip(' \t"\'[]{}')
+    if _ID_RE.match(tok) and not tok.isdigit():
+        return tok
+    m = _URL_ID_RE.search(tok)
+    return m.group(1) if m else None
+
+
+def _id_column(header: str) -> Optional[Tuple[str, int]]:
+    """(delimiter, column index) of the resume-id column when `header` is a CSV header row."""
+    delimiter = max((",", ";", "\t"), key=header.count)
+    if not header.count(delimiter):
+        return None
+    cells = [c.strip().lower() for c in next(csv.reader([header], delimiter=delimiter))]
+    if any(resume_id_from(c) for c in cells):
+        # A data row, not a header
+        return None
+    for i, cell in enumerate(cells):
+        if _ID_HEADER_RE.search(cell):
+            return delimiter, i
+    if "id" in cells:
+        return delimiter, cells.index("id")
+    return None
+
+
+async def iter_resume_ids(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Yield resume ids from a byte stream, line by line as the bytes arrive.
+    A CSV export whose header names a resume-id column is read from that column only;
+    anything else (plain lists, NDJSON of strings, JSON lists) is split on
+    newlines/commas/semicolons and every token that looks like a resume id is kept."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    column: Optional[Tuple[str, int]] = None
+    first = True
+    tail = ""
+
+    def _ids(line: str) -> List[str]:
+        nonlocal column, first
+        if first and line.strip():
+            first = False
+            column = _id_column(line.lstrip("\ufeff"))
+            if column is not None:
+                return []
+        if column is not None:
+            delimiter, idx = column
+            cells = next(csv.reader([line], delimiter=delimiter), [])
+            rid = resume_id_from(cells[idx]) if idx < len(cells) else None
+            return [rid] if rid else []
+        return [rid for rid in (resume_id_from(tok) for tok in _SEPARATORS_RE.split(line)) if rid]
+
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        # The last line may continue in the next chunk
+        tail = lines.pop()
+        for line in lines:
+            for rid in _ids(line):
+                yield rid
+    for rid in _ids(tail + decoder.decode(b"", final=True)):
+        yield rid
+
+
+class ResumeAggregate:
+    """Running totals over classified resumes."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.active = 0
+        self.with_text = 0
+        self.from_store = 0
+        self.fetched = 0
+        self.statuses: Counter = Counter()
+        self.samples: List[Dict[str, Any]] = []
+
+    def add(self, parsed: Dict[str, Any]) -> None:
+        self.total += 1
+        if parsed.get("resume_text"):
+            self.with_text += 1
+        status = parsed.get("job_search_status")
+        self.statuses[status or "unknown"] += 1
+        if has_active_status(parsed):
+            self.active += 1
+            if len(self.samples) < SAMPLE_SIZE:
+                self.samples.append(parsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "total_resumes": self.total,
+            "active_resumes": self.active,
+            "active_share": (self.active / self.total) if self.total else None,
+            "with_text": self.with_text,
+            "from_store": self.from_store,
+            "fetched": self.fetched,
+            "statuses": dict(self.statuses.most_common()),
+            "active_samples": self.samples,
+        }
+
+
+async def _process_chunk(ids: List[str], agg: ResumeAggregate, oauth_token: Optional[str], concurrency: int) -> None:
+    stored = await asyncio.to_thread(load_resumes, ids)
+    missing = [rid for rid in ids if rid not in stored]
+    record_cache("resume_store", hits=len(stored), misses=len(missing))
+    agg.from_store += len(stored)
+    for item in stored.values():
+        agg.add(extract_resume_fields(item))
+    if not missing:
+        return
+    items = [{"id": rid, "public_url": HH_RESUME_PUBLIC_URL.format(resume_id=rid)} for rid in missing]
+    fetched: List[Dict[str, Any]] = []
+    with stage("enrich"):
+        async for rm in iter_enriched_resumes(items, oauth_token=oauth_token, concurrency=concurrency, remember=False):
+            fetched.append(rm)
+            agg.add(extract_resume_fields(rm))
+    agg.fetched += len(fetched)
+    # Only resumes that produced something are cached; failures are retried next time
+    await asyncio.to_thread(save_resumes, [rm for rm in fetched if rm.get("resume_text") or rm.get("_resume_detail")])
+
+
+async def collect_resume_ids(chunks: AsyncIterator[bytes], max_ids: int = RESUME_BULK_MAX_IDS) -> Tuple[List[str], int]:
+    """Unique ids from a request body stream, in order, capped at `max_ids`.
+    Returns (ids, number of ids ignored over the cap)."""
+    seen: set = set()
+    ids: List[str] = []
+    ignored = 0
+    async for rid in iter_resume_ids(chunks):
+        if rid in seen:
+            continue
+        if len(ids) >= max_ids:
+            ignored += 1
+            continue
+        seen.add(rid)
+        ids.append(rid)
+    return ids, ignored
+
+
+async def analyze_resume_stream(
+    ids: List[str],
+    oauth_token: Optional[str] = None,
+    chunk_size: int = RESUME_BULK_CHUNK,
+    concurrency: int = HH_RESUME_CONCURRENCY,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Process ids in chunks and yield the running aggregate after each chunk.
+    The last snapshot has "done": True.
+    """
+    agg = ResumeAggregate()
+    started = time.perf_counter()
+    n_chunks = max(1, math.ceil(len(ids) / chunk_size))
+    for n, start in enumerate(range(0, len(ids), chunk_size), 1):
+        await _process_chunk(ids[start:start + chunk_size], agg, oauth_token, concurrency)
+        yield {
+            **agg.snapshot(),
+            "chunks": n,
+            "total_chunks": n_chunks,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "done": n == n_chunks,
+        }
+    if not ids:
+        yield {**agg.snapshot(), "chunks": 0, "total_chunks": 0, "elapsed_ms": 0.0, "done": True}
@@ -0,0 +1,277 @@
+"""
+Approximate /analyze by sampling search pages (`approximate=true`).
+
+Instead of paging through every result, a random subset of search pages is
+fetched in parallel and the aggregates are computed on it:
+
+  - searches within HH_SEARCH_DEPTH: pages are drawn uniformly from the result list
+  - larger searches: the lookback period is cut into equal published-date windows
+    (plus a tail unit for older vacancies) and a random share of these units is
+    drawn *before* anything is probed. Only the drawn units are sized with
+    count-only requests (bisected while over the cap; the open-ended tail steps
+    further back) and read in full, so the probing cost scales with the sample
+    rather than with the whole search
+
+Every vacancy thus has the same chance of being sampled (that of its page or
+unit). Confidence intervals come from a cluster bootstrap: the sampled pages (or
+units) are resampled with replacement and the stats recomputed. Salary/hourly-rate
+counts are scaled up to the population; min/max are the sample's and not scaled.
+"""
+
+import asyncio
+import math
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+try:
+    from .hh_parser_ver2 import (
+        HH_SEARCH_DEPTH,
+        PARTITION_LOOKBACK_DAYS,
+        PARTITION_MIN_WINDOW_SECONDS,
+        _count_page,
+        _iso,
+        _search_page,
+        extract_vacancy_fields,
+        slim_vacancy,
+    )
+    from .analytics import salary_stats, hourly_rate_stats, top_skills
+    from .metrics import UPSTREAM_EVENT_HOOKS, UpstreamTransport, stage
+except Exception:
+    from hh_parser_ver2 import (
+        HH_SEARCH_DEPTH,
+        PARTITION_LOOKBACK_DAYS,
+        PARTITION_MIN_WINDOW_SECONDS,
+        _count_page,
+        _iso,
+        _search_page,
+        extract_vacancy_fields,
+        slim_vacancy,
+    )
+    from analytics import salary_stats, hourly_rate_stats, top_skills
+    from metrics import UPSTREAM_EVENT_HOOKS, UpstreamTransport, stage
+
+APPROX_MIN_PAGES = int(os.getenv("APPROX_MIN_PAGES", "5"))
+APPROX_BOOTSTRAP_SAMPLES = int(os.getenv("APPROX_BOOTSTRAP_SAMPLES", "200"))
+CONFIDENCE = 0.95
+
+_STATS_KEYS = ("salary", "salary_avg", "salary_per_shift", "salary_estimated_monthly", "schedule", "key_skills")
+# Point estimates that get a bootstrap interval
+_CI_KEYS = ("avg", "median")
+
+Page = Tuple[Dict[str, Any], int]  # (search params of the window, page number)
+
+
+class _Probes:
+    """Count-only requests made while sizing the windows."""
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self.client = client
+        self.calls = 0
+
+    async def found(self, params: Dict[str, Any]) -> int:
+        self.calls += 1
+        return int((await _count_page(self.client, params)).get("found", 0))
+
+
+def _window_params(params: Dict[str, Any], lo: Optional[datetime], hi: datetime) -> Dict[str, Any]:
+    w = {**params, "date_to": _iso(hi)}
+    if lo is not None:
+        w["date_from"] = _iso(lo)
+    return w
+
+
+async def _split(probes: _Probes, params: Dict[str, Any], lo: datetime, hi: datetime, found: int) -> List[Tuple[Dict[str, Any], int]]:
+    """Bisect a window until every part is under the cap (or a minute long)."""
+    if found <= HH_SEARCH_DEPTH or (hi - lo).total_seconds() <= PARTITION_MIN_WINDOW_SECONDS:
+        return [(_window_params(params, lo, hi), found)]
+    mid = lo + (hi - lo) / 2
+    left, right = await asyncio.gather(probes.found(_window_params(params, lo, mid)), probes.found(_window_params(params, mid, hi)))
+    parts = await asyncio.gather(_split(probes, params, lo, mid, left), _split(probes, params, mid, hi, right))
+    return parts[0] + parts[1]
+
+
+async def _tail(probes: _Probes, params: Dict[str, Any], hi: datetime, span: timedelta) -> List[Tuple[Dict[str, Any], int]]:
+    """Everything published before `hi`; while over the cap the recent `span` is split
+    off as a bounded window and the rest is probed with a doubled span."""
+    found = await probes.found(_window_params(params, None, hi))
+    if found <= HH_SEARCH_DEPTH:
+        return [(_window_params(params, None, hi), found)]
+    lo = hi - span
+    recent_found = await probes.found(_window_params(params, lo, hi))
+    recent, older = await asyncio.gather(_split(probes, params, lo, hi, recent_found), _tail(probes, params, lo, span * 2))
+    return recent + older
+
+
+def _units(found: int) -> List[Tuple[Optional[datetime], datetime]]:
+    """Equal published-date windows over the lookback period, newest last, plus the
+    open-ended tail (lo=None) for anything older."""
+    now = datetime.now(timezone.utc) + timedelta(minutes=1)
+    start = now - timedelta(days=PARTITION_LOOKBACK_DAYS)
+    # Twice the minimum count so uneven publishing rarely pushes a window over the cap
+    n = 2 * math.ceil(found / HH_SEARCH_DEPTH)
+    step = (now - start) / n
+    return [(None, start)] + [(start + step * i, start + step * (i + 1)) for i in range(n)]
+
+
+async def _unit_windows(probes: _Probes, params: Dict[str, Any], unit: Tuple[Optional[datetime], datetime]) -> List[Tuple[Dict[str, Any], int]]:
+    """Size one drawn unit: its windows under the cap with their `found`."""
+    lo, hi = unit
+    if lo is None:
+        return await _tail(probes, params, hi, timedelta(days=PARTITION_LOOKBACK_DAYS))
+    found = await probes.found(_window_params(params, lo, hi))
+    return await _split(probes, params, lo, hi, found)
+
+
+def _rows(page: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Parsed stats rows of one raw page, skipping "Вахтовый метод" like parse_vacancies."""
+    rows: List[Dict[str, Any]] = []
+    for v in page:
+        slim = slim_vacancy(v)
+        parsed = extract_vacancy_fields(slim)
+        if parsed.get("schedule") == "Вахтовый метод":
+            continue
+        if slim.get("key_skills"):
+            parsed["key_skills"] = slim["key_skills"]
+        rows.append({k: parsed.get(k) for k in _STATS_KEYS})
+    return rows
+
+
+def _percentile(sorted_vals: List[float], p: float) -> float:
+    idx = (len(sorted_vals) - 1) * p
+    lo, hi = math.floor(idx), math.ceil(idx)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (idx - lo)
+
+
+def _with_intervals(point: Dict[str, Any], replicates: List[Dict[str, Any]], scale: float) -> Dict[str, Any]:
+    out = dict(point)
+    if out.get("count"):
+        out["sample_count"] = out["count"]
+        out["count"] = round(out["count"] * scale)
+    alpha = (1 - CONFIDENCE) / 2
+    ci: Dict[str, Any] = {}
+    for key in _CI_KEYS:
+        vals = sorted(r[key] for r in replicates if r.get(key) is not None)
+        if vals:
+            ci[key] = [round(_percentile(vals, alpha), 2), round(_percentile(vals, 1 - alpha), 2)]
+    out["ci"] = ci
+    return out
+
+
+def _bootstrap(units: List[List[Dict[str, Any]]], samples: int, seed: Optional[int]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Salary and hourly-rate stats over `samples` resamples of the sampled units (pages or windows)."""
+    rng = random.Random(seed)
+    salaries: List[Dict[str, Any]] = []
+    hourly: List[Dict[str, Any]] = []
+    for _ in range(samples):
+        rows = [r for unit in rng.choices(units, k=len(units)) for r in unit]
+        salaries.append(salary_stats(rows))
+        hourly.append(hourly_rate_stats(rows))
+    return salaries, hourly
+
+
+async def analyze_sampled(
+    query: str,
+    area: Optional[int] = None,
+    per_page: int = 100,
+    sample_fraction: float = 0.1,
+    min_pages: int = APPROX_MIN_PAGES,
+    bootstrap_samples: int = APPROX_BOOTSTRAP_SAMPLES,
+    seed: Optional[int] = None,
+    top_n: int = 20,
+) -> Dict[str, Any]:
+    """Return /analyze-style aggregates estimated from a random sample of search pages."""
+    headers = {"User-Agent": "job-analytics-bot/1.0", "Accept": "application/json"}
+    params: Dict[str, Any] = {"per_page": per_page}
+    if isinstance(query, str) and query.strip():
+        params["text"] = query
+    if area is not None:
+        params["area"] = area
+    rng = random.Random(seed)
+
+    async with httpx.AsyncClient(timeout=20.0, headers=headers, transport=UpstreamTransport(), event_hooks=UPSTREAM_EVENT_HOOKS) as client:
+        with stage("fetch"):
+            probes = _Probes(client)
+            found = await probes.found(params)
+            if found <= HH_SEARCH_DEPTH:
+                # Every page is a sampling unit
+                windows = [(params, found)]
+                population: List[List[Page]] = [[(params, p)] for p in range(math.ceil(found / per_page))]
+                n_units = len(population)
+                m = min(n_units, max(min_pages, math.ceil(sample_fraction * n_units)))
+                chosen = rng.sample(population, m)
+            else:
+                # Every date window (and the tail) is a unit; only drawn ones are probed
+                units = _units(found)
+                n_units = len(units)
+                m = min(n_units, max(2, math.ceil(sample_fraction * n_units)))
+                sized = await asyncio.gather(*[_unit_windows(probes, params, u) for u in rng.sample(units, m)])
+                windows = [w for part in sized for w in part]
+                chosen = [
+                    [(w_params, p) for w_params, w_found in part for p in range(math.ceil(min(w_found, HH_SEARCH_DEPTH) / per_page))]
+                    for part in sized
+                ]
+
+            async def _page(page: Page) -> List[Dict[str, Any]]:
+                # Concurrency is bounded by the shared search limiter
+                data = await _search_page(client, page[0], page[1])
+                return data.get("items", [])
+
+            async def _unit(pages: List[Page]) -> List[List[Dict[str, Any]]]:
+                return await asyncio.gather(*[_page(p) for p in pages])
+
+            raw_units = await asyncio.gather(*[_unit(u) for u in chosen])
+
+    k = sum(len(u) for u in chosen)
+    exact = m == n_units
+    if found <= HH_SEARCH_DEPTH:
+        reachable_items = found
+    else:
+        # Every unit was drawn with probability m / n_units
+        reachable_items = round(sum(min(f, HH_SEARCH_DEPTH) for _w, f in windows) * n_units / m)
+    with stage("parse"):
+        unit_rows = [[r for page in u for r in _rows(page)] for u in raw_units]
+    sampled_raw = sum(len(page) for u in raw_units for page in u)
+    sampled_rows = sum(len(u) for u in unit_rows)
+    # Sample -> population factor for counts (after the same schedule filter)
+    scale = reachable_items / sampled_raw if sampled_raw else 0.0
+
+    with stage("stats"):
+        rows = [r for u in unit_rows for r in u]
+        salaries = salary_stats(rows)
+        hourly_rates = hourly_rate_stats(rows)
+        skills = top_skills(rows, top_n=top_n)
+        if unit_rows and not exact:
+            # CPU-bound; keep the event loop responsive
+            boot_sal, boot_hourly = await asyncio.to_thread(_bootstrap, unit_rows, bootstrap_samples, seed)
+        else:
+            boot_sal, boot_hourly = [], []
+
+    return {
+        "query": query,
+        "area": area,
+        "count": round(sampled_rows * scale),
+        "salaries": _with_intervals(salaries, boot_sal, scale),
+        "hourly_rates": _with_intervals(hourly_rates, boot_hourly, scale),
+        "skills": skills,
+        "approximate": {
+            "found": found,
+            "reachable_items": reachable_items,
+            "windows": len(windows),
+            "total_units": n_units,
+            "sampled_units": m,
+            # Windows still over the cap at one minute: their overflow cannot be sampled
+            "truncated": any(f > HH_SEARCH_DEPTH for _w, f in windows),
+            "total_pages": math.ceil(reachable_items / per_page),
+            "sampled_pages": k,
+            "sample_fraction": round(m / n_units, 4) if n_units else 1.0,
+            "sampled_items": sampled_raw,
+            "exact": exact,
+            "confidence": CONFIDENCE,
+            "bootstrap_samples": len(boot_sal),
+            "upstream_calls": probes.calls + k,
+        },
+    }
@@ -0,0 +1,129 @@
+"""
+In-process slow-request log.
+
+Requests slower than SLOW_REQUEST_MS are recorded with their normalized
+parameters, the hh.ru calls they triggered (search pages vs. detail lookups),
+item counts and per-stage timings. The newest SLOW_LOG_KEEP entries are kept
+in a ring buffer for GET /admin/slow-requests; when SLOW_LOG_FILE is set each
+entry is also appended there as one JSON line (rotated at SLOW_LOG_MAX_BYTES).
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Any, Deque, Dict, List, Mapping, Optional
+
+try:
+    from .metrics import RequestTiming
+except Exception:
+    from metrics import RequestTiming
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "2000"))
+SLOW_LOG_KEEP = int(os.getenv("SLOW_LOG_KEEP", "200"))
+SLOW_LOG_FILE = os.getenv("SLOW_LOG_FILE", "")
+SLOW_LOG_MAX_BYTES = int(os.getenv("SLOW_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+SLOW_LOG_BACKUPS = int(os.getenv("SLOW_LOG_BACKUPS", "3"))
+
+# Parameters worth recording; anything else (tokens, profile flags) is dropped
+LOGGED_PARAMS = ("query", "vacancy_query", "area", "pages", "per_page", "fetch_all", "include_description", "source", "streaming")
+# Diagnostics routes are not interesting when slow (profiling, memory snapshots)
+_SKIP_ROUTE_PREFIXES = ("/admin", "/metrics")
+_BOOL_PARAMS = {"fetch_all", "include_description", "streaming"}
+_INT_PARAMS = {"area", "pages", "per_page"}
+
+_entries: Deque[Dict[str, Any]] = deque(maxlen=SLOW_LOG_KEEP)
+_lock = threading.Lock()
+_file_logger: Optional[logging.Logger] = None
+
+
+def _get_file_logger() -> Optional[logging.Logger]:
+    global _file_logger
+    if not SLOW_LOG_FILE:
+        return None
+    if _file_logger is None:
+        logger = logging.getLogger("hr_app.slow_requests")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = RotatingFileHandler(SLOW_LOG_FILE, maxBytes=SLOW_LOG_MAX_BYTES, backupCount=SLOW_LOG_BACKUPS, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        _file_logger = logger
+    return _file_logger
+
+
+def normalize_params(params: Mapping[str, str]) -> Dict[str, Any]:
+    """Keep the known search parameters, with queries trimmed and lowercased
+    and numeric/boolean flags parsed, so equal searches compare equal."""
+    out: Dict[str, Any] = {}
+    for name in LOGGED_PARAMS:
+        value = params.get(name)
+        if value is None:
+            continue
+        if name in ("query", "vacancy_query"):
+            out[name] = " ".join(value.split()).casefold()
+        elif name in _BOOL_PARAMS:
+            out[name] = value.strip().lower() in ("1", "true", "yes", "on")
+        elif name in _INT_PARAMS:
+            try:
+                out[name] = int(value)
+            except ValueError:
+                out[name] = value
+        else:
+            out[name] = value
+    return out
+
+
+def maybe_record(method: str, route: str, params: Mapping[str, str], status: int, duration: float, timing: RequestTiming) -> Optional[Dict[str, Any]]:
+    """Record the request when `duration` (seconds) exceeds SLOW_REQUEST_MS."""
+    duration_ms = duration * 1000
+    if duration_ms < SLOW_REQUEST_MS or route.startswith(_SKIP_ROUTE_PREFIXES):
+        return None
+    # Endpoint labels carry "{id}" for detail lookups; the rest are search/list pages
+    details = sum(n for ep, n in timing.upstream_endpoints.items() if "{id}" in ep)
+    entry = {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "method": method,
+        "route": route,
+        "status": status,
+        "duration_ms": round(duration_ms, 1),
+        "params": normalize_params(params),
+        "upstream": {
+            "pages": timing.upstream_calls - details,
+            "details": details,
+            "seconds": round(timing.upstream_seconds, 3),
+            "by_endpoint": dict(timing.upstream_endpoints),
+        },
+        "items": dict(timing.items),
+        "stages_ms": {name: round(sec * 1000, 1) for name, sec in timing.stages.items()},
+        "caches": {name: {"hits": hits, "misses": misses} for name, (hits, misses) in timing.caches.items()},
+    }
+    with _lock:
+        _entries.append(entry)
+    print(f"🐢 Slow request {method} {route} {entry['duration_ms']} ms params={entry['params']} upstream={entry['upstream']['pages']}p/{details}d")
+    logger = _get_file_logger()
+    if logger is not None:
+        try:
+            logger.info(json.dumps(entry, ensure_ascii=False))
+        except Exception as e:
+            print(f"Error writing slow log file: {e}")
+    return entry
+
+
+def recent(limit: int = 50, route: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Newest first."""
+    with _lock:
+        entries = list(reversed(_entries))
+    if route:
+        entries = [e for e in entries if e["route"] == route]
+    return entries[:limit]
+
+
+def clear() -> int:
+    with _lock:
+        n = len(_entries)
+        _entries.clear()
+    return n
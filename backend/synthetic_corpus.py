@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Deterministic generator of realistic hh.ru-shaped vacancy items at any volume.
+
+Items mirror the search API shape (area, salary, employer with logos, address,
+snippet, schedule, professional roles, ...) plus the detail-only `description`
+HTML and `key_skills`. The mix covers what the parsers care about:
+  - salary objects with from/to/gross/currency combinations, or no salary at all
+  - schedules including "Вахтовый метод"
+  - many Russian per-shift phrasings in snippets and descriptions
+  - employers with Zipf-skewed vacancy counts
+
+The same seed and reference time always produce the same items.
+
+Usage:
+  python synthetic_corpus.py --count 100000 --seed 7 --output corpus.ndjson.gz
+  python fake_hh.py --corpus corpus.ndjson.gz        # serve it from the stand-in
+"""
+
+import argparse
+import gzip
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+# Fixed default so output does not depend on when it is generated
+DEFAULT_REFERENCE_TIME = datetime(2026, 1, 15, 12, 0, 0, tzinfo=timezone(timedelta(hours=3)))
+
+AREAS = [("2", "Санкт-Петербург", 0.55), ("1", "Москва", 0.35), ("3", "Екатеринбург", 0.05), ("4", "Новосибирск", 0.05)]
+
+TITLES = [
+    ("Водитель автобуса", "21", "Водитель"),
+    ("Водитель категории D", "21", "Водитель"),
+    ("Инспектор по досмотру", "90", "Охранник"),
+    ("Контролер КПП", "90", "Охранник"),
+    ("Охранник ГБР", "90", "Охранник"),
+    ("Кассир", "97", "Кассир-операционист"),
+    ("Повар", "87", "Повар, пекарь, кондитер"),
+    ("Python разработчик", "96", "Программист, разработчик"),
+    ("Врач терапевт", "40", "Врач"),
+    ("Специалист перронного обслуживания", "131", "Другое"),
+]
+
+SCHEDULES = [
+    (("fullDay", "Полный день"), 0.45),
+    (("shift", "Сменный график"), 0.30),
+    (("flexible", "Гибкий график"), 0.08),
+    (("remote", "Удаленная работа"), 0.05),
+    (("flyInFlyOut", "Вахтовый метод"), 0.12),
+]
+
+EXPERIENCE = [("noExperience", "Нет опыта"), ("between1And3", "От 1 года до 3 лет"), ("between3And6", "От 3 до 6 лет"), ("moreThan6", "Более 6 лет")]
+
+CURRENCIES = [("RUR", 0.93), ("USD", 0.03), ("EUR", 0.02), ("KZT", 0.02)]
+
+SKILLS = [
+    "Ответственность", "Работа в команде", "Водительское удостоверение категории D", "Пунктуальность",
+    "Python", "SQL", "Django", "Работа с кассой", "Охрана объектов", "Пропускной режим",
+    "Досмотр", "Кулинария", "Коммуникабельность", "Внимательность", "Английский язык",
+]
+
+# Per-shift phrasings understood (or deliberately not understood) by estimate_monthly_salary_from_text
+PER_SHIFT_TEMPLATES = [
+    "Оплата {n} руб за смену.",
+    "{n} ₽/смена, график 2/2.",
+    "За смену {g} рублей.",
+    "Ставка за выход {n} руб.",
+    "Сутки через двое, {n} р за сутки.",
+    "{k} тыс/см., 15 смен в месяц.",
+    "Посменная оплата: {n}.",
+    "Оплата {lo}–{hi} руб/смена.",
+    "Сменный график: {n} руб.",
+    "{n} в смену, 3 смены в неделю.",
+]
+
+SNIPPET_GENERIC = [
+    "Выполнение обязанностей согласно должностной инструкции.",
+    "Обслуживание клиентов, работа в дружном коллективе.",
+    "Соблюдение стандартов компании и техники безопасности.",
+]
+
+REQUIREMENTS = [
+    "Опыт работы от 1 года.",
+    "Наличие <highlighttext>прав</highlighttext> категории D.",
+    "Среднее профессиональное образование.",
+    "Готовность к сменному графику.",
+]
+
+
+def _weighted(rnd: random.Random, options):
+    values = [o[0] for o in options]
+    weights = [o[-1] for o in options]
+    return rnd.choices(values, weights=weights, k=1)[0]
+
+
+def _grouped(n: int) -> str:
+    return f"{n:,}".replace(",", " ")
+
+
+def _per_shift_phrase(rnd: random.Random) -> str:
+    n = rnd.randrange(25, 80) * 100
+    return rnd.choice(PER_SHIFT_TEMPLATES).format(
+        n=n,
+        g=_grouped(n),
+        k=str(round(n / 1000, 1)).replace(".", ","),
+        lo=n,
+        hi=n + rnd.randrange(5, 20) * 100,
+    )
+
+
+def _salary(rnd: random.Random) -> Optional[Dict[str, Any]]:
+    if rnd.random() < 0.35:
+        return None
+    currency = _weighted(rnd, CURRENCIES)
+    scale = {"RUR": 1000, "USD": 10, "EUR": 10, "KZT": 5000}[currency]
+    base = rnd.randrange(30, 250) * scale
+    shape = rnd.random()
+    if shape < 0.4:
+        lo, hi = base, None
+    elif shape < 0.6:
+        lo, hi = None, base
+    else:
+        lo, hi = base, base + rnd.randrange(5, 80) * scale
+    return {"from": lo, "to": hi, "currency": currency, "gross": rnd.random() < 0.5}
+
+
+def _employer(employer_rank: int) -> Dict[str, Any]:
+    eid = str(10000 + employer_rank)
+    er = random.Random(employer_rank)
+    return {
+        "id": eid,
+        "name": f"ООО «Компания {employer_rank}»",
+        "url": f"https://api.hh.ru/employers/{eid}",
+        "alternate_url": f"https://hh.ru/employer/{eid}",
+        "logo_urls": {
+            "90": f"https://img.hhcdn.ru/employer-logo/{eid}_90.png",
+            "240": f"https://img.hhcdn.ru/employer-logo/{eid}_240.png",
+            "original": f"https://img.hhcdn.ru/employer-logo-original/{eid}.png",
+        },
+        "vacancies_url": f"https://api.hh.ru/vacancies?employer_id={eid}",
+        "accredited_it_employer": False,
+        "trusted": er.random() < 0.8,
+    }
+
+
+def _zipf_rank(rnd: random.Random, employers: int, s: float = 1.1) -> int:
+    """Draw an employer rank with Zipf-like skew (few employers own many vacancies)."""
+    rank = int(rnd.paretovariate(s))
+    return (rank - 1) % employers + 1
+
+
+def generate_vacancies(
+    count: int,
+    seed: int = 42,
+    employers: int = 2000,
+    reference_time: datetime = DEFAULT_REFERENCE_TIME,
+    site_base: str = "https://hh.ru",
+    api_base: str = "https://api.hh.ru",
+) -> Iterator[Dict[str, Any]]:
+    """Yield `count` hh.ru-shaped vacancy items, newest first."""
+    rnd = random.Random(seed)
+    step = (30 * 24 * 3600) / max(count, 1)
+    for i in range(count):
+        vid = str(100000000 + seed % 1000 * 1000000 + i)
+        title, role_id, role_name = rnd.choice(TITLES)
+        area_id, area_name = rnd.choices([(a[0], a[1]) for a in AREAS], weights=[a[2] for a in AREAS], k=1)[0]
+        schedule_id, schedule_name = _weighted(rnd, SCHEDULES)
+        exp_id, exp_name = rnd.choice(EXPERIENCE)
+        salary = _salary(rnd)
+        per_shift = salary is None and rnd.random() < 0.45
+        responsibility = _per_shift_phrase(rnd) if per_shift and rnd.random() < 0.5 else rnd.choice(SNIPPET_GENERIC)
+        description_parts = [f"<p><strong>{title}</strong></p>", f"<p>{rnd.choice(SNIPPET_GENERIC)}</p>"]
+        if per_shift:
+            description_parts.append(f"<p>{_per_shift_phrase(rnd)}</p>")
+        description_parts.append("<ul>" + "".join(f"<li>{x}</li>" for x in rnd.sample(REQUIREMENTS, 2)) + "</ul>")
+        employer = _employer(_zipf_rank(rnd, employers))
+        employer["url"] = f"{api_base}/employers/{employer['id']}"
+        employer["alternate_url"] = f"{site_base}/employer/{employer['id']}"
+        published = reference_time - timedelta(seconds=int(i * step + rnd.random() * step))
+        yield {
+            "id": vid,
+            "premium": False,
+            "name": title,
+            "department": None,
+            "has_test": False,
+            "area": {"id": area_id, "name": area_name, "url": f"{api_base}/areas/{area_id}"},
+            "salary": salary,
+            "type": {"id": "open", "name": "Открытая"},
+            "address": {
+                "city": area_name, "street": "Московский проспект", "building": str(rnd.randrange(1, 300)),
+                "lat": 59.85, "lng": 30.32, "raw": f"{area_name}, Московский проспект",
+                "metro": None, "metro_stations": [],
+            } if rnd.random() < 0.6 else None,
+            "published_at": published.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "created_at": published.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "archived": False,
+            "url": f"{api_base}/vacancies/{vid}?host=hh.ru",
+            "alternate_url": f"{site_base}/vacancy/{vid}",
+            "apply_alternate_url": f"{site_base}/applicant/vacancy_response?vacancyId={vid}",
+            "employer": employer,
+            "snippet": {"requirement": rnd.choice(REQUIREMENTS), "responsibility": responsibility},
+            "contacts": None,
+            "schedule": {"id": schedule_id, "name": schedule_name},
+            "working_days": [],
+            "professional_roles": [{"id": role_id, "name": role_name}],
+            "experience": {"id": exp_id, "name": exp_name},
+            "employment": {"id": "full", "name": "Полная занятость"},
+            "description": "".join(description_parts),
+            "key_skills": [{"name": s} for s in rnd.sample(SKILLS, rnd.randrange(0, 5))],
+        }
+
+
+def write_ndjson(items: Iterator[Dict[str, Any]], path: str) -> int:
+    """Write items as NDJSON (gzip when the path ends with .gz). Returns the count."""
+    opener = gzip.open if path.endswith(".gz") else open
+    n = 0
+    with opener(path, "wt", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def read_ndjson(path: str) -> List[Dict[str, Any]]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Synthetic hh.ru vacancy corpus generator")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--employers", type=int, default=2000)
+    parser.add_argument("--now", action="store_true", help="date items relative to the current time instead of the fixed reference")
+    parser.add_argument("--output", required=True, help="NDJSON path (.gz to compress)")
+    args = parser.parse_args()
+
+    ref = datetime.now(timezone.utc).replace(microsecond=0) if args.now else DEFAULT_REFERENCE_TIME
+    n = write_ndjson(generate_vacancies(args.count, seed=args.seed, employers=args.employers, reference_time=ref), args.output)
+    print(f"✅ Wrote {n} vacancies to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Shared fixtures.
+
+The backend modules read HH_API_BASE / VACANCY_STORE_PATH at import time, so the
+environment is set here before any test imports them: hh.ru calls go to an
+in-process fake_hh server on a free port, and every test gets its own store file.
+
+Run from the repository root or backend/:  python -m pytest backend/tests -q
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+FAKE_PORT = _free_port()
+FAKE_BASE = f"http://127.0.0.1:{FAKE_PORT}"
+os.environ["HH_API_BASE"] = FAKE_BASE
+os.environ["HH_SITE_BASE"] = FAKE_BASE
+os.environ["VACANCY_STORE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="hr-app-tests-"), "vacancies.sqlite3")
+os.environ["EMPLOYER_REFRESH_SECONDS"] = "0"
+os.environ["LOOP_MONITOR_ENABLED"] = "0"
+os.environ["HH_DAILY_QUOTA"] = "0"
+
+import fake_hh as fake_hh_module  # noqa: E402
+import hh_parser_ver2  # noqa: E402
+import vacancy_store  # noqa: E402
+
+
+class _SwitchableApp:
+    """ASGI app forwarding to whichever fake_hh app the current test installed."""
+
+    def __init__(self) -> None:
+        self.app: Any = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            message = await receive()
+            while message["type"] != "lifespan.shutdown":
+                await send({"type": message["type"] + ".complete"})
+                message = await receive()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+        await self.app(scope, receive, send)
+
+
+@pytest.fixture(scope="session")
+def _fake_server():
+    import uvicorn
+
+    switch = _SwitchableApp()
+    server = uvicorn.Server(uvicorn.Config(switch, host="127.0.0.1", port=FAKE_PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 15
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("fake_hh did not start")
+        time.sleep(0.05)
+    yield switch
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def fake_hh(_fake_server):
+    """Install a stand-in: fake_hh(vacancies=50) or fake_hh(corpus=[...], rate_429=1.0).
+    Returns the fake_hh app; `app.state.stats["requests"]` counts upstream calls."""
+
+    def _install(corpus: Optional[List[Dict[str, Any]]] = None, **config: Any):
+        cfg = fake_hh_module.FakeHHConfig(public_base=FAKE_BASE, **config)
+        app = fake_hh_module.create_app(cfg, corpus=corpus)
+        _fake_server.app = app
+        return app
+
+    return _install
+
+
+@pytest.fixture(autouse=True)
+def store_path(tmp_path, monkeypatch):
+    """A fresh vacancy store per test, with the parser's in-memory caches cleared."""
+    path = tmp_path / "vacancies.sqlite3"
+    monkeypatch.setattr(vacancy_store, "STORE_PATH", path)
+    for cache in (hh_parser_ver2._vacancy_desc_cache, hh_parser_ver2._vacancy_skills_cache, hh_parser_ver2._resume_detail_cache, hh_parser_ver2._scrape_cache):
+        cache.clear()
+    return path
+
+
+def run(coro):
+    """Run a coroutine to completion (tests stay synchronous, no plugin needed)."""
+    return asyncio.run(coro)
@@ -0,0 +1,89 @@
+from fastapi.testclient import TestClient
+
+import main
+import query_planner
+import upstream_budget
+
+
+def test_search_calls_within_the_cap():
+    assert query_planner._search_calls(0, None, 100)["calls"] == 1
+    assert query_planner._search_calls(450, None, 100) == {"calls": 5, "items": 450, "partitioned": False, "windows": 1, "sequential": 1}
+    assert query_planner._search_calls(5000, 3, 100)["calls"] == 3
+
+
+def test_search_calls_partitioned():
+    search = query_planner._search_calls(10000, None, 100)
+    assert search["partitioned"] is True
+    assert search["items"] == 10000
+    # 8 leaf windows: 7 inner probes, 100 item pages plus one page-0 per leaf, one tail search
+    assert search["calls"] == 7 + 108 + 1
+
+
+def test_sample_calls():
+    small = query_planner._sample_calls(1000, 100, 0.1)
+    assert small == {"calls": 1 + 5, "probes": 1, "pages": 5, "items": 500}
+    large = query_planner._sample_calls(10000, 100, 0.5)
+    # 10 windows plus the tail, 6 drawn; only those are probed and read (10 pages each)
+    assert large["probes"] == 1 + 6
+    assert large["pages"] == 60
+
+
+def test_estimate_uses_partitioned_search_size():
+    search = query_planner._search_calls(10000, None, 100)
+    estimate = upstream_budget.estimate_fetch_cost(None, 100, True, search=search)
+    assert estimate == {"pages": 116, "details": 10000, "total": 10116}
+    # Without the live total the estimate stops at the cap
+    assert upstream_budget.estimate_fetch_cost(None, 100, False)["total"] == 20
+
+
+def test_plan_fetch_downgrades_partitioned_fetch_all(monkeypatch):
+    monkeypatch.setattr(upstream_budget, "remaining", lambda: 50)
+    search = query_planner._search_calls(10000, None, 100)
+
+    plan = upstream_budget.plan_fetch(None, 100, False, search=search)
+
+    assert plan["downgraded"] == ["pages=20"]
+    assert plan["estimate"]["total"] == 20
+
+
+def test_approximate_analyze_checks_the_budget(fake_hh, monkeypatch):
+    app = fake_hh(vacancies=3000)
+    monkeypatch.setattr(upstream_budget, "remaining", lambda: 3)
+    client = TestClient(main.app)
+
+    response = client.get("/analyze", params={"query": "", "approximate": "true", "source": "hh", "sample_fraction": 0.5})
+
+    assert response.status_code == 429
+    # Only the count probe that sized the sample went upstream
+    assert app.state.stats["requests"] == 1
+
+
+def test_approximate_dry_run_costs_the_sample(fake_hh):
+    fake_hh(vacancies=1000)
+    client = TestClient(main.app)
+
+    full = client.get("/analyze", params={"query": "", "source": "hh", "dry_run": "true"}).json()
+    sampled = client.get("/analyze", params={"query": "", "source": "hh", "dry_run": "true", "approximate": "true", "sample_fraction": 0.1}).json()
+
+    assert full["upstream_calls"]["search_pages"] == 10
+    assert sampled["approximate"]["sampled_pages"] == 5
+    # The sampler's own total probe plus five pages
+    assert sampled["upstream_calls"]["search_pages"] == 6
+
+
+def test_resume_stats_trims_resume_details_to_the_budget(fake_hh, monkeypatch):
+    fake_hh(vacancies=10)
+    ids = ["6ebdba36ff02f7ec5b0039ed1f764b75707a65", "0a1b2c3d4e5f60718293a4b5c6d7e8f9aabbcc"]
+    monkeypatch.setattr(upstream_budget, "remaining", lambda: 2)
+    client = TestClient(main.app)
+    params = {"resume_ids": ids, "vacancy_query": "", "auto_collect": "false"}
+
+    body = client.get("/resume-stats", params=params).json()
+
+    assert body["trimmed_resume_ids"] == 1
+    assert body["total_resumes"] == 1
+
+    # The kept resume is cached now; two uncached ones would be trimmed, reject refuses instead
+    monkeypatch.setattr(upstream_budget, "UPSTREAM_BUDGET_POLICY", "reject")
+    params["resume_ids"] = ids + ["f" * 38]
+    assert client.get("/resume-stats", params=params).status_code == 429
@@ -0,0 +1,50 @@
+import employer_service
+from conftest import FAKE_BASE, run
+
+
+def test_throttled_lookups_are_not_cached(fake_hh):
+    fake_hh(rate_429=1.0)
+    assert run(employer_service.get_employers(["101", "102"])) == {}
+    assert employer_service.load_employers(["101", "102"]) == {}
+
+    app = fake_hh()
+    entries = run(employer_service.get_employers(["101", "102"]))
+
+    assert set(entries) == {"101", "102"}
+    assert entries["101"]["name"] == "Компания 101"
+    assert app.state.stats["requests"] == 2
+
+
+def test_failed_refetch_keeps_stale_entry(fake_hh):
+    fake_hh()
+    run(employer_service.get_employers(["101"]))
+
+    fake_hh(error_rate=1.0)
+    entries = run(employer_service.get_employers(["101"], max_age=-1))
+
+    assert entries["101"]["name"] == "Компания 101"
+
+
+def test_not_found_is_cached(fake_hh, monkeypatch):
+    monkeypatch.setattr(employer_service, "HH_EMPLOYER_URL", FAKE_BASE + "/no-such-employers/{employer_id}")
+    app = fake_hh()
+    run(employer_service.get_employers(["404"]))
+
+    entries = run(employer_service.get_employers(["404"]))
+
+    assert entries["404"]["name"] is None
+    assert app.state.stats["requests"] == 1
+
+
+def test_refresh_task_is_cancelled_on_shutdown(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(employer_service, "EMPLOYER_REFRESH_SECONDS", 3600)
+    with TestClient(main.app):
+        task = main.app.state.employer_refresh_task
+        assert not task.done()
+
+    assert task.cancelled()
+    assert main.app.state.employer_refresh_task is None
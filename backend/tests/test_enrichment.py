@@ -0,0 +1,48 @@
+import hh_parser_ver2
+from conftest import FAKE_BASE, run
+import fake_hh as fake_hh_module
+
+
+def _item(name="Кассир", responsibility="", salary=None, schedule=None):
+    item = {"id": "1", "name": name, "snippet": {"responsibility": responsibility, "requirement": ""}, "salary": salary}
+    if schedule:
+        item["schedule"] = {"id": "shift", "name": schedule}
+    return item
+
+
+def test_description_priority_without_salary():
+    assert hh_parser_ver2.description_priority(_item(responsibility="Оплата за смену")) == hh_parser_ver2.ENRICH_PRIORITY_SHIFT_PAY
+    assert hh_parser_ver2.description_priority(_item(responsibility="Доход до 80 000 руб")) == hh_parser_ver2.ENRICH_PRIORITY_MONEY_HINT
+    assert hh_parser_ver2.description_priority(_item(responsibility="Работа с клиентами")) is None
+
+
+def test_description_priority_with_structured_salary():
+    salary = {"from": 60000, "to": None, "currency": "RUR", "gross": False}
+    assert hh_parser_ver2.description_priority(_item(salary=salary)) is None
+    # A per-shift amount in the description overrides the structured salary, so hints still count
+    assert hh_parser_ver2.description_priority(_item(salary=salary, schedule="Сменный график")) == hh_parser_ver2.ENRICH_PRIORITY_SALARY_HINT
+    assert hh_parser_ver2.description_priority(_item(salary=salary, responsibility="300 руб/час")) == hh_parser_ver2.ENRICH_PRIORITY_SALARY_HINT
+
+
+def test_description_priority_skills_and_known_description():
+    assert hh_parser_ver2.description_priority(_item(), need_skills=True) == hh_parser_ver2.ENRICH_PRIORITY_SKILLS
+    assert hh_parser_ver2.description_priority({**_item(), "key_skills": [{"name": "1С"}]}, need_skills=True) is None
+    assert hh_parser_ver2.description_priority({**_item(responsibility="за смену"), "description_text": "..."}) is None
+
+
+def test_selective_enrichment_matches_full_enrichment_for_shift_pay(fake_hh):
+    corpus = fake_hh_module.synthetic_vacancies(1, seed=3, site_base=FAKE_BASE)
+    v = corpus[0]
+    v["salary"] = {"from": 60000, "to": None, "currency": "RUR", "gross": False}
+    v["snippet"] = {"responsibility": "Обслуживание гостей", "requirement": ""}
+    v["schedule"] = {"id": "shift", "name": "Сменный график"}
+    v["description"] = "<p>Оплата 4500 руб за смену, график 2/2</p>"
+    fake_hh(corpus=corpus)
+
+    items = run(hh_parser_ver2.fetch_vacancies("", pages=1, per_page=10))
+    counters = run(hh_parser_ver2.enrich_selectively(items))
+
+    assert counters["fetched"] == 1
+    parsed = hh_parser_ver2.extract_vacancy_fields(items[0])
+    assert parsed["salary_per_shift"]
+    assert parsed["salary_estimated_monthly"] == 67500
@@ -0,0 +1,62 @@
+from fastapi.testclient import TestClient
+
+import fake_hh as fake_hh_module
+import hh_parser_ver2
+import main
+from conftest import FAKE_BASE
+
+
+def test_parse_clusters_reads_salary_thresholds():
+    clusters = [
+        {"id": "schedule", "items": [{"name": "Полный день", "count": "7"}, {"name": "Вахтовый метод", "count": 2}]},
+        {"id": "salary", "items": [{"name": "Указан доход", "count": 9}, {"name": "от 50 000 ₽", "count": 6}, {"name": "от 100 000 ₽", "count": 2}]},
+    ]
+
+    facets = hh_parser_ver2.parse_clusters(clusters)
+
+    assert facets["schedule"] == [{"name": "Полный день", "count": 7}, {"name": "Вахтовый метод", "count": 2}]
+    assert facets["salary"][0] == {"name": "Указан доход", "count": 9}
+    assert [e["from"] for e in facets["salary"][1:]] == [50000, 100000]
+    assert hh_parser_ver2.parse_clusters(None) == {}
+
+
+def test_salary_bands_are_disjoint():
+    cluster = [{"name": "Указан доход", "count": 9}, {"name": "от 100 000 ₽", "count": 2, "from": 100000}, {"name": "от 50 000 ₽", "count": 6, "from": 50000}]
+
+    assert hh_parser_ver2.salary_bands(cluster) == [
+        {"from": 50000, "to": 100000, "count": 4},
+        {"from": 100000, "to": None, "count": 2},
+    ]
+
+
+def test_eligible_vacancy_count():
+    counts = {"found": 10, "clusters": {"schedule": [{"name": "Вахтовый метод", "count": 3}]}}
+    assert hh_parser_ver2.eligible_vacancy_count(counts) == 7
+    assert hh_parser_ver2.eligible_vacancy_count({"found": 4}) == 4
+
+
+def test_resume_stats_counts_every_matching_vacancy(fake_hh):
+    corpus = fake_hh_module.synthetic_vacancies(300, seed=5, site_base=FAKE_BASE)
+    for v in corpus[:30]:
+        v["schedule"] = {"id": "flyInFlyOut", "name": "Вахтовый метод"}
+    fake_hh(corpus=corpus)
+    rotation = sum(1 for v in corpus if (v.get("schedule") or {}).get("name") == "Вахтовый метод")
+
+    body = TestClient(main.app).get("/resume-stats", params={"vacancy_query": "", "auto_collect": "false", "per_page": 50}).json()
+
+    assert body["vacancy_found"] == 300
+    # Not capped at the first pages*per_page results
+    assert body["vacancy_count"] == 300 - rotation > 50
+
+
+def test_resume_stats_paging_params_are_deprecated(fake_hh):
+    fake_hh(vacancies=30)
+    client = TestClient(main.app)
+
+    body = client.get("/resume-stats", params={"vacancy_query": "", "auto_collect": "false", "pages": 9, "per_page": 500}).json()
+
+    assert body["vacancy_found"] == 30
+    assert body["vacancy_count_basis"].startswith("all matching vacancies")
+    params = {p["name"]: p for p in client.get("/openapi.json").json()["paths"]["/resume-stats"]["get"]["parameters"]}
+    assert params["pages"]["deprecated"] is True
+    assert params["per_page"]["deprecated"] is True
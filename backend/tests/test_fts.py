@@ -0,0 +1,45 @@
+import vacancy_store
+
+
+def _item(vid, title, responsibility="", description=None):
+    item = {"id": vid, "name": title, "snippet": {"responsibility": responsibility, "requirement": ""}, "published_at": "2026-01-10T10:00:00+0300"}
+    if description is not None:
+        item["description_text"] = description
+    return item
+
+
+def test_stem_strips_short_endings_of_long_russian_words():
+    assert vacancy_store._stem("водителя") == "водител"
+    assert vacancy_store._stem("водитель") == "водител"
+    # Short words and latin words are kept as is
+    assert vacancy_store._stem("кофе") == "кофе"
+    assert vacancy_store._stem("python") == "python"
+
+
+def test_build_fts_query():
+    assert vacancy_store.build_fts_query("") is None
+    assert vacancy_store.build_fts_query("   ") is None
+    assert vacancy_store.build_fts_query("Водителя автобуса") == '"водител"* AND "автобус"*'
+    assert vacancy_store.build_fts_query('"категории D" водитель') == '"категории d" AND "водител"*'
+
+
+def test_search_matches_inflections_and_descriptions():
+    vacancy_store.upsert_vacancies([
+        _item("1", "Водитель автобуса"),
+        _item("2", "Кассир", description="Нужен опыт работы водителем погрузчика"),
+        _item("3", "Повар"),
+    ])
+
+    found = [v["id"] for v in vacancy_store.search_vacancies("водителя")]
+
+    # Title matches rank above description matches
+    assert found == ["1", "2"]
+
+
+def test_index_follows_description_enrichment():
+    vacancy_store.upsert_vacancies([_item("1", "Кассир")])
+    assert vacancy_store.search_vacancies("инкассация") == []
+
+    vacancy_store.upsert_vacancies([_item("1", "Кассир", description="Инкассация и работа с кассой")])
+
+    assert [v["id"] for v in vacancy_store.search_vacancies("инкассация")] == ["1"]
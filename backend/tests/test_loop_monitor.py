@@ -0,0 +1,18 @@
+from fastapi.testclient import TestClient
+
+import loop_monitor
+import main
+
+
+def test_monitor_task_is_cancelled_on_shutdown(monkeypatch):
+    monkeypatch.setattr(loop_monitor, "LOOP_MONITOR_ENABLED", True)
+    with TestClient(main.app):
+        task = main.app.state.loop_monitor_task
+        assert not task.done()
+        watchdog = loop_monitor.monitor._watchdog
+
+    assert task.cancelled()
+    assert main.app.state.loop_monitor_task is None
+    assert loop_monitor.monitor.loop_thread is None
+    watchdog.join(timeout=2)
+    assert not watchdog.is_alive()
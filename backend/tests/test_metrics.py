@@ -0,0 +1,32 @@
+import httpx
+import pytest
+
+import metrics
+import upstream_budget
+from conftest import _free_port, run
+
+
+def _errors(endpoint):
+    return metrics.UPSTREAM_REQUESTS._values.get(metrics.UPSTREAM_REQUESTS._key({"endpoint": endpoint, "status": "error"}), 0.0)
+
+
+def test_failed_calls_are_counted_like_the_budget():
+    url = f"http://127.0.0.1:{_free_port()}/vacancies"
+    before_errors, before_budget = _errors("/vacancies"), upstream_budget.used()
+
+    async def _call():
+        timing, token = metrics.begin_request_timing("/test")
+        try:
+            async with httpx.AsyncClient(timeout=2.0, transport=metrics.UpstreamTransport(), event_hooks=metrics.UPSTREAM_EVENT_HOOKS) as client:
+                with pytest.raises(httpx.ConnectError):
+                    await client.get(url)
+        finally:
+            metrics.end_request_timing(token)
+        return timing
+
+    timing = run(_call())
+
+    assert upstream_budget.used() - before_budget == 1
+    assert timing.upstream_calls == 1
+    assert _errors("/vacancies") - before_errors == 1
+    assert 'hh_upstream_requests_total{endpoint="/vacancies",status="error"}' in metrics.render()
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+
+import fake_hh as fake_hh_module
+import hh_parser_ver2
+import sampling
+from conftest import FAKE_BASE, run
+
+
+def _corpus(recent, old, old_days=(40, 400)):
+    """`recent` items within the lookback window and `old` items spread over `old_days` ago."""
+    items = fake_hh_module.synthetic_vacancies(recent + old, seed=7, site_base=FAKE_BASE)
+    now = datetime.now(timezone.utc)
+    lo, hi = old_days
+    for i, v in enumerate(items):
+        if i < recent:
+            published = now - timedelta(days=20) * (i / max(1, recent))
+        else:
+            published = now - timedelta(days=lo) - timedelta(days=hi - lo) * ((i - recent) / max(1, old))
+        v["published_at"] = published.strftime("%Y-%m-%dT%H:%M:%S%z")
+    return sorted(items, key=lambda v: v["published_at"], reverse=True)
+
+
+def test_partitioned_crawl_reaches_old_vacancies_past_the_cap(fake_hh):
+    corpus = _corpus(recent=500, old=2500)
+    fake_hh(corpus=corpus)
+    meta = {}
+
+    items = run(hh_parser_ver2.fetch_vacancies("", pages=None, per_page=100, meta=meta))
+
+    assert meta["partitioned"] is True
+    assert meta["truncated"] is False
+    assert {v["id"] for v in items} == {v["id"] for v in corpus}
+
+
+def test_crawl_flags_windows_it_cannot_split(fake_hh):
+    corpus = _corpus(recent=0, old=2100)
+    same_second = corpus[0]["published_at"]
+    for v in corpus:
+        v["published_at"] = same_second
+    fake_hh(corpus=corpus)
+    meta = {}
+
+    items = run(hh_parser_ver2.fetch_vacancies("", pages=None, per_page=100, meta=meta))
+
+    assert meta["truncated"] is True
+    assert len(items) == 2000
+
+
+def test_unpartitioned_fetch_all_reports_truncation(fake_hh):
+    fake_hh(corpus=_corpus(recent=2100, old=0))
+    meta = {}
+
+    run(hh_parser_ver2.fetch_vacancies("", pages=None, per_page=100, meta=meta, partition=False))
+
+    assert meta["truncated"] is True
+
+
+def test_sampling_windows_cover_the_tail_under_the_cap(fake_hh):
+    corpus = _corpus(recent=500, old=2500)
+    fake_hh(corpus=corpus)
+
+    result = run(sampling.analyze_sampled("", per_page=100, sample_fraction=1.0, seed=1, bootstrap_samples=20))
+
+    meta = result["approximate"]
+    assert meta["found"] == len(corpus)
+    # Every vacancy sits in some window under the cap, so every one can be sampled
+    assert meta["exact"] is True
+    assert meta["reachable_items"] == meta["sampled_items"] == len(corpus)
+    assert meta["truncated"] is False
+
+
+def test_sampling_cost_scales_with_the_sample(fake_hh):
+    corpus = _corpus(recent=30000, old=0)
+    fake_hh(corpus=corpus)
+    full_crawl_pages = len(corpus) // 100
+
+    result = run(sampling.analyze_sampled("", per_page=100, sample_fraction=0.1, seed=2, bootstrap_samples=20))
+
+    meta = result["approximate"]
+    # Probes are paid only for the drawn windows, so the cost stays near the sampled share
+    assert meta["upstream_calls"] <= 0.15 * full_crawl_pages
+    assert abs(meta["reachable_items"] - len(corpus)) < 0.2 * len(corpus)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import pipeline
+from conftest import run
+from test_partitioning import _corpus
+
+
+def _rotation(corpus):
+    return sum(1 for v in corpus if (v.get("schedule") or {}).get("name") == "Вахтовый метод")
+
+
+def test_analyze_stream_counts_every_page(fake_hh):
+    app = fake_hh(vacancies=250)
+    corpus = app.state.vacancies
+
+    agg = run(pipeline.analyze_stream("", per_page=20, page_concurrency=3))
+
+    assert agg["count"] == len(corpus) - _rotation(corpus)
+    assert app.state.stats["requests"] == 13
+
+
+def test_partitioned_search_is_yielded_page_by_page(fake_hh):
+    corpus = _corpus(recent=500, old=2500)
+    fake_hh(corpus=corpus)
+    meta = {}
+
+    async def _pages():
+        return [page async for page in pipeline.search_pages("", per_page=100, meta=meta)]
+
+    pages = run(_pages())
+
+    assert meta["partitioned"] is True and meta["truncated"] is False
+    assert max(len(p) for p in pages) <= 100
+    assert {v["id"] for p in pages for v in p} == {v["id"] for v in corpus}
+
+
+def test_map_stage_stops_at_the_first_failure():
+    calls = []
+
+    async def _source():
+        for i in range(1000):
+            yield i
+
+    async def _fn(i):
+        calls.append(i)
+        if i == 3:
+            raise RuntimeError("429")
+        await asyncio.sleep(0.01)
+        return i
+
+    async def _drain():
+        return [r async for r in pipeline.map_stage(_source(), _fn, concurrency=4, maxsize=4)]
+
+    with pytest.raises(RuntimeError):
+        run(_drain())
+    assert len(calls) < 20
+
+
+def test_streaming_analyze_enriches_while_paging(fake_hh):
+    app = fake_hh(vacancies=120)
+    client = TestClient(main.app)
+    params = {"query": "", "source": "hh", "streaming": "true", "per_page": 20, "fetch_all": "true"}
+
+    plain = client.get("/analyze", params=params).json()
+    search_calls = app.state.stats["requests"]
+    enriched = client.get("/analyze", params={**params, "include_description": "true", "enrich_concurrency": 8}).json()
+
+    assert enriched["count"] == plain["count"]
+    # Skills are aggregated, so every item without key_skills gets its detail call
+    assert app.state.stats["requests"] - search_calls > search_calls
+    assert enriched["skills"]
@@ -0,0 +1,106 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import fake_hh as fake_hh_module
+import main
+import resume_service
+import slow_log
+import upstream_budget
+from conftest import FAKE_BASE, run
+
+ID1 = "6ebdba36ff02f7ec5b0039ed1f764b75707a65"
+ID2 = "0a1b2c3d4e5f60718293a4b5c6d7e8f9aabbcc"
+
+
+def _ids(body, chunk=7):
+    async def _chunks():
+        data = body.encode("utf-8")
+        for start in range(0, len(data), chunk):
+            yield data[start:start + chunk]
+
+    async def _collect():
+        return [rid async for rid in resume_service.iter_resume_ids(_chunks())]
+
+    return run(_collect())
+
+
+def test_resume_id_from():
+    assert resume_service.resume_id_from(f'"{ID1}"') == ID1
+    assert resume_service.resume_id_from(f"https://hh.ru/resume/{ID2}?query=x") == ID2
+    # Phone numbers, short hex and numeric ids are not resume ids
+    assert resume_service.resume_id_from("89161234567") is None
+    assert resume_service.resume_id_from("deadbeef") is None
+    assert resume_service.resume_id_from("1" * 38) is None
+
+
+def test_plain_lists_across_chunk_boundaries():
+    assert _ids(f"{ID1}\n{ID2}\n") == [ID1, ID2]
+    assert _ids(f'["{ID1}", "{ID2}"]') == [ID1, ID2]
+    assert _ids(f"{ID1};{ID2}", chunk=3) == [ID1, ID2]
+
+
+def test_csv_reads_the_resume_id_column():
+    body = (
+        "﻿ФИО;Телефон;ID резюме;Комментарий\n"
+        f"Иванов;89161234567;{ID1};перезвонить\n"
+        f'"Петров, Пётр";+7 921 000-00-00;{ID2};"{"f" * 40}"\n'
+    )
+
+    assert _ids(body) == [ID1, ID2]
+
+
+def test_csv_with_resume_links():
+    body = f"name,resume_url\nИванов,https://hh.ru/resume/{ID1}\nПетров,\n"
+
+    assert _ids(body) == [ID1]
+
+
+def test_bulk_counts_vacancies_like_resume_stats(fake_hh):
+    corpus = fake_hh_module.synthetic_vacancies(200, seed=5, site_base=FAKE_BASE)
+    rotation = sum(1 for v in corpus if (v.get("schedule") or {}).get("name") == "Вахтовый метод")
+    assert rotation
+    for v in corpus:
+        v["name"] = "Кассир"
+    fake_hh(corpus=corpus)
+
+    response = TestClient(main.app).post("/resume-stats/bulk", params={"vacancy_query": "Кассир"}, content=f"{ID1}\n{ID2}\n")
+
+    last = json.loads(response.text.strip().splitlines()[-1])
+    assert last["done"] is True
+    assert last["total_resumes"] == 2
+    assert last["vacancy_found"] == 200
+    assert last["vacancy_count"] == 200 - rotation
+
+
+def test_bulk_reports_its_cost_after_the_stream(fake_hh, monkeypatch):
+    app = fake_hh(vacancies=10)
+    monkeypatch.setattr(slow_log, "SLOW_REQUEST_MS", 0)
+    slow_log.clear()
+
+    response = TestClient(main.app).post("/resume-stats/bulk", content=f"{ID1}\n{ID2}\n")
+
+    last = json.loads(response.text.strip().splitlines()[-1])
+    assert last["upstream_calls"] == app.state.stats["requests"] > 0
+    # The header would be sent before any chunk is processed
+    assert "X-Upstream-Calls" not in response.headers
+    entry = slow_log.recent(route="/resume-stats/bulk")[0]
+    assert entry["upstream"]["pages"] + entry["upstream"]["details"] == last["upstream_calls"]
+
+
+def test_bulk_trims_uncached_ids_to_the_budget(fake_hh, monkeypatch):
+    fake_hh(vacancies=10)
+    ids = [ID1, ID2, "f" * 38]
+    # Room for one resume (API detail plus page fallback)
+    monkeypatch.setattr(upstream_budget, "remaining", lambda: 3)
+    client = TestClient(main.app)
+
+    response = client.post("/resume-stats/bulk", content="\n".join(ids))
+
+    last = json.loads(response.text.strip().splitlines()[-1])
+    assert last["trimmed_ids"] == 2
+    assert last["total_resumes"] == 1
+    assert response.headers["X-Upstream-Downgraded"] == "resumes=1"
+
+    monkeypatch.setattr(upstream_budget, "UPSTREAM_BUDGET_POLICY", "reject")
+    assert client.post("/resume-stats/bulk", content="\n".join(ids)).status_code == 429
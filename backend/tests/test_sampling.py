@@ -0,0 +1,45 @@
+import sampling
+from conftest import run
+
+
+def _rows(salaries):
+    return [{"salary": None, "salary_avg": s, "salary_per_shift": False, "salary_estimated_monthly": None, "schedule": None, "key_skills": None} for s in salaries]
+
+
+def test_bootstrap_is_reproducible_and_brackets_the_mean():
+    pages = [_rows([40000, 50000]), _rows([60000, 70000]), _rows([80000, 90000]), _rows([100000])]
+
+    first = sampling._bootstrap(pages, 50, seed=3)
+    assert first == sampling._bootstrap(pages, 50, seed=3)
+
+    salaries, hourly = first
+    assert len(salaries) == len(hourly) == 50
+    out = sampling._with_intervals({"count": 7, "avg": 70000}, salaries, scale=10)
+    low, high = out["ci"]["avg"]
+    assert low <= 70000 <= high
+    assert out["count"] == 70
+    assert out["sample_count"] == 7
+
+
+def test_full_sample_is_exact(fake_hh):
+    fake_hh(vacancies=120)
+
+    result = run(sampling.analyze_sampled("", per_page=20, sample_fraction=1.0, seed=1, bootstrap_samples=20))
+
+    meta = result["approximate"]
+    assert meta["exact"] is True
+    assert meta["sampled_pages"] == meta["total_pages"] == 6
+    assert meta["bootstrap_samples"] == 0
+    assert meta["upstream_calls"] == 1 + 6
+
+
+def test_partial_sample_has_intervals(fake_hh):
+    fake_hh(vacancies=400)
+
+    result = run(sampling.analyze_sampled("", per_page=20, sample_fraction=0.5, seed=1, bootstrap_samples=30))
+
+    meta = result["approximate"]
+    assert meta["exact"] is False
+    assert meta["sampled_pages"] == 10
+    assert meta["bootstrap_samples"] == 30
+    assert "avg" in result["salaries"]["ci"]
@@ -0,0 +1,68 @@
+import vacancy_store
+from conftest import run
+
+
+def _sync():
+    return run(vacancy_store.sync_vacancies(query="", per_page=20))
+
+
+def _run_ids():
+    return set(vacancy_store.run_vacancy_ids(vacancy_store.run_key("", None)))
+
+
+def test_churn_is_reconciled_without_relisting(fake_hh):
+    app = fake_hh(vacancies=300)
+    corpus = list(app.state.vacancies)
+    assert _sync()["mode"] == "full"
+    assert len(_run_ids()) == 300
+
+    closed = {corpus[40]["id"], corpus[210]["id"]}
+    app = fake_hh(corpus=[v for v in corpus if v["id"] not in closed])
+    result = _sync()
+
+    assert result["mode"] == "reconciled"
+    assert result["expired"] == 2
+    assert _run_ids() == {v["id"] for v in corpus} - closed
+    # A re-list would take 15 pages (300 items at 20 per page) plus the sync's own calls
+    assert app.state.stats["requests"] < 15
+
+
+def test_missing_items_are_merged_while_reconciling(fake_hh):
+    app = fake_hh(vacancies=300)
+    corpus = list(app.state.vacancies)
+    hidden = corpus[150]
+    fake_hh(corpus=[v for v in corpus if v["id"] != hidden["id"]])
+    _sync()
+
+    fake_hh(corpus=corpus)
+    result = _sync()
+
+    assert result["mode"] == "reconciled"
+    assert hidden["id"] in result["new_ids"]
+    assert hidden["id"] in _run_ids()
+
+
+def test_large_drift_relists(fake_hh):
+    app = fake_hh(vacancies=300)
+    corpus = list(app.state.vacancies)
+    _sync()
+
+    kept = corpus[:150]
+    fake_hh(corpus=kept)
+    result = _sync()
+
+    assert result["mode"] == "relisted"
+    assert result["expired"] == 150
+    assert _run_ids() == {v["id"] for v in kept}
+
+
+def test_unchanged_run_stays_incremental(fake_hh):
+    app = fake_hh(vacancies=120)
+    _sync()
+    before = app.state.stats["requests"]
+
+    result = _sync()
+
+    assert result["mode"] == "incremental"
+    # Watermark page plus the count-only check
+    assert app.state.stats["requests"] - before == 2
@@ -0,0 +1,69 @@
+import vacancy_store
+from conftest import run
+
+
+def _fetch(**kwargs):
+    return run(vacancy_store.fetch_vacancies_via_store(query="", **kwargs))
+
+
+def test_partial_run_does_not_answer_deeper_request(fake_hh):
+    app = fake_hh(vacancies=50)
+    assert len(_fetch(pages=1, per_page=10, source="auto")) == 10
+    before = app.state.stats["requests"]
+
+    items = _fetch(pages=3, per_page=10, source="auto")
+
+    assert len(items) == 30
+    assert app.state.stats["requests"] > before
+
+
+def test_partial_run_answers_shallower_request(fake_hh):
+    app = fake_hh(vacancies=50)
+    _fetch(pages=3, per_page=10, source="auto")
+    before = app.state.stats["requests"]
+
+    assert len(_fetch(pages=2, per_page=10, source="auto")) == 20
+    assert app.state.stats["requests"] == before
+
+
+def test_exhausted_partial_run_covers_any_depth(fake_hh):
+    app = fake_hh(vacancies=15)
+    assert len(_fetch(pages=2, per_page=10, source="auto")) == 15
+    before = app.state.stats["requests"]
+
+    assert len(_fetch(pages=5, per_page=10, source="auto")) == 15
+    assert app.state.stats["requests"] == before
+
+
+def test_partial_fetch_keeps_complete_run_membership(fake_hh):
+    fake_hh(vacancies=50)
+    assert len(_fetch(pages=None, per_page=20, source="hh")) == 50
+
+    _fetch(pages=1, per_page=10, source="hh")
+
+    run_info = vacancy_store.get_run(vacancy_store.run_key("", None))
+    assert run_info["complete"] == 1
+    assert run_info["item_count"] == 50
+    assert len(_fetch(pages=None, per_page=20, source="store")) == 50
+
+
+def test_run_covers():
+    assert vacancy_store.run_covers({"complete": 1, "item_count": 5, "depth": None}, None)
+    assert not vacancy_store.run_covers({"complete": 0, "item_count": 10, "depth": 10}, None)
+    assert vacancy_store.run_covers({"complete": 0, "item_count": 10, "depth": 10}, 10)
+    assert not vacancy_store.run_covers({"complete": 0, "item_count": 10, "depth": 10}, 30)
+    # Legacy rows without depth vouch only for the items they hold
+    assert not vacancy_store.run_covers({"complete": 0, "item_count": 10, "depth": None}, 30)
+
+
+def test_depth_column_added_to_existing_store(store_path):
+    import sqlite3
+
+    conn = sqlite3.connect(str(store_path))
+    conn.execute("CREATE TABLE query_runs (run_key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, complete INTEGER NOT NULL, item_count INTEGER NOT NULL)")
+    conn.commit()
+    conn.close()
+
+    vacancy_store.upsert_vacancies([{"id": "1", "name": "Повар"}], key="k", complete=False, depth=10)
+
+    assert vacancy_store.get_run("k")["depth"] == 10
@@ -0,0 +1,153 @@
+"""
+Rolling budget of hh.ru calls against a daily quota.
+
+Every upstream call is counted (by the httpx hook in metrics.py) against a
+24-hour rolling window, tagged with the API route that triggered it
+("background" for refresh jobs). Heavy endpoints estimate their worst-case
+cost up front with `plan_fetch` (`plan_items` for per-item fetches such as
+resume details); when it does not fit the remaining budget the
+request is downgraded (no description enrichment, fewer pages) or, with
+UPSTREAM_BUDGET_POLICY=reject or when nothing fits, rejected.
+
+HH_DAILY_QUOTA=0 disables the limit (calls are still counted).
+"""
+
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+HH_DAILY_QUOTA = int(os.getenv("HH_DAILY_QUOTA", "0"))
+UPSTREAM_BUDGET_POLICY = os.getenv("UPSTREAM_BUDGET_POLICY", "downgrade")  # downgrade | reject
+# Worst-case depth of a fetch-all search (hh.ru returns at most this many items)
+SEARCH_DEPTH = 2000
+WINDOW_SECONDS = 24 * 3600
+BUCKET_SECONDS = 60
+
+_lock = threading.Lock()
+# minute bucket -> route -> calls
+_buckets: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+
+def _prune(now: float) -> None:
+    oldest = int((now - WINDOW_SECONDS) // BUCKET_SECONDS)
+    for bucket in [b for b in _buckets if b <= oldest]:
+        del _buckets[bucket]
+
+
+def consume(route: Optional[str], calls: int = 1) -> None:
+    now = time.time()
+    with _lock:
+        _buckets[int(now // BUCKET_SECONDS)][route or "background"] += calls
+        _prune(now)
+
+
+def used() -> int:
+    with _lock:
+        _prune(time.time())
+        return sum(sum(routes.values()) for routes in _buckets.values())
+
+
+def remaining() -> Optional[int]:
+    """Calls left in the rolling window, or None when no quota is configured."""
+    if HH_DAILY_QUOTA <= 0:
+        return None
+    return max(0, HH_DAILY_QUOTA - used())
+
+
+def report() -> Dict[str, Any]:
+    by_route: Dict[str, int] = defaultdict(int)
+    with _lock:
+        _prune(time.time())
+        for routes in _buckets.values():
+            for route, calls in routes.items():
+                by_route[route] += calls
+    total = sum(by_route.values())
+    return {
+        "quota": HH_DAILY_QUOTA or None,
+        "policy": UPSTREAM_BUDGET_POLICY,
+        "window_hours": WINDOW_SECONDS // 3600,
+        "used": total,
+        "remaining": max(0, HH_DAILY_QUOTA - total) if HH_DAILY_QUOTA > 0 else None,
+        "by_route": dict(sorted(by_route.items(), key=lambda kv: kv[1], reverse=True)),
+    }
+
+
+def estimate_fetch_cost(pages: Optional[int], per_page: int, include_description: bool, live: bool = True, search: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Upper bound of hh.ru calls for a vacancy search: search pages plus one
+    detail call per item when descriptions are requested. `pages=None` = fetch all.
+    `search` = {"calls", "items"} sized from the live `found` (see
+    query_planner._search_calls); without it fetch-all assumes SEARCH_DEPTH items,
+    which undercounts partitioned crawls."""
+    if pages is None and search is not None:
+        search_pages = search["calls"] if live else 0
+        details = search["items"] if include_description else 0
+        return {"pages": search_pages, "details": details, "total": search_pages + details}
+    search_pages = 0
+    if live:
+        search_pages = math.ceil(SEARCH_DEPTH / per_page) if pages is None else pages
+    max_items = (math.ceil(SEARCH_DEPTH / per_page) if pages is None else pages) * per_page
+    details = min(max_items, SEARCH_DEPTH) if include_description else 0
+    return {"pages": search_pages, "details": details, "total": search_pages + details}
+
+
+def plan_fetch(pages: Optional[int], per_page: int, include_description: bool, live: bool = True, search: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Fit a search into the remaining budget.
+    Returns {"allowed", "pages", "include_description", "downgraded", "estimate", "remaining"}.
+    """
+    estimate = estimate_fetch_cost(pages, per_page, include_description, live, search)
+    left = remaining()
+    plan: Dict[str, Any] = {
+        "allowed": True,
+        "pages": pages,
+        "include_description": include_description,
+        "downgraded": [],
+        "estimate": estimate,
+        "remaining": left,
+    }
+    if left is None or estimate["total"] <= left:
+        return plan
+    if UPSTREAM_BUDGET_POLICY == "reject":
+        plan["allowed"] = False
+        return plan
+    downgraded: List[str] = []
+    if include_description:
+        include_description = False
+        downgraded.append("include_description")
+        estimate = estimate_fetch_cost(pages, per_page, False, live, search)
+    if estimate["total"] > left:
+        # Each page costs one search call; keep as many as fit
+        if left < 1:
+            plan["allowed"] = False
+            return plan
+        current = pages if pages is not None else math.ceil(SEARCH_DEPTH / per_page)
+        pages = min(current, left)
+        downgraded.append(f"pages={pages}")
+        estimate = estimate_fetch_cost(pages, per_page, False, live)
+    plan.update({"pages": pages, "include_description": include_description, "downgraded": downgraded, "estimate": estimate})
+    return plan
+
+
+def plan_items(items: int, calls_per_item: int) -> Dict[str, Any]:
+    """Fit `items` per-item fetches (e.g. resume details) into the remaining budget.
+    Downgrading keeps as many items as fit; reject (or nothing fitting) disallows.
+    Returns {"allowed", "items", "trimmed", "estimate", "remaining"}.
+    """
+    left = remaining()
+    plan: Dict[str, Any] = {
+        "allowed": True,
+        "items": items,
+        "trimmed": 0,
+        "estimate": items * calls_per_item,
+        "remaining": left,
+    }
+    if left is None or plan["estimate"] <= left:
+        return plan
+    fit = left // calls_per_item
+    if UPSTREAM_BUDGET_POLICY == "reject" or fit < 1:
+        plan["allowed"] = False
+        return plan
+    plan.update({"items": fit, "trimmed": items - fit, "estimate": fit * calls_per_item})
+    return plan
@@ -0,0 +1,649 @@
+"""
+Local SQLite vacancy warehouse.
+
+Vacancies are upserted by id with normalized columns taken from
+`extract_vacancy_fields`, plus the slim hh.ru item as JSON so the usual
+parse/analytics pipeline can run on stored rows unchanged. Each fetch is also
+recorded as a run for (query, area) with the depth it listed (pages*per_page,
+or everything for fetch-all), so callers can answer from the store while the
+last run is fresh and deep enough.
+
+Titles, snippets and enriched descriptions are also kept in an FTS5 index so
+free-text queries can be answered locally (source="index").
+
+Recurring fetch-all runs can be refreshed incrementally (`sync_vacancies`): only
+vacancies published since the run's watermark are requested and merged in.
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from .hh_parser_ver2 import extract_vacancy_fields, fetch_vacancies, fetch_vacancy_counts, reconcile_run_ids, slim_vacancy
+    from .metrics import record_cache, record_items
+except Exception:
+    from hh_parser_ver2 import extract_vacancy_fields, fetch_vacancies, fetch_vacancy_counts, reconcile_run_ids, slim_vacancy
+    from metrics import record_cache, record_items
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parent.parent / "data" / "vacancies.sqlite3"
+STORE_PATH = Path(os.getenv("VACANCY_STORE_PATH", str(DEFAULT_STORE_PATH)))
+# How long a recorded run may be answered from the store in source="auto" mode
+STORE_FRESH_SECONDS = int(os.getenv("VACANCY_STORE_FRESH_SECONDS", "900"))
+# Share of the live total by which a synced run may drift before it is re-listed
+# outright instead of reconciled window by window
+SYNC_RELIST_DRIFT = float(os.getenv("SYNC_RELIST_DRIFT", "0.2"))
+
+SOURCES = ("auto", "store", "hh", "index")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vacancies (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    area TEXT,
+    area_id TEXT,
+    published_at TEXT,
+    alternate_url TEXT,
+    salary_from REAL,
+    salary_to REAL,
+    salary_currency TEXT,
+    salary_gross INTEGER,
+    salary_avg REAL,
+    salary_estimated_monthly REAL,
+    salary_per_shift INTEGER,
+    experience TEXT,
+    responsibility TEXT,
+    requirement TEXT,
+    employer_id TEXT,
+    employer_name TEXT,
+    employer_trusted INTEGER,
+    schedule TEXT,
+    description_text TEXT,
+    item_json TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vacancies_area ON vacancies(area_id);
+CREATE INDEX IF NOT EXISTS idx_vacancies_employer ON vacancies(employer_id);
+CREATE INDEX IF NOT EXISTS idx_vacancies_schedule ON vacancies(schedule);
+CREATE INDEX IF NOT EXISTS idx_vacancies_published ON vacancies(published_at);
+CREATE INDEX IF NOT EXISTS idx_vacancies_salary ON vacancies(salary_avg);
+
+CREATE TABLE IF NOT EXISTS query_runs (
+    run_key TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    complete INTEGER NOT NULL,
+    item_count INTEGER NOT NULL,
+    depth INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS query_vacancies (
+    run_key TEXT NOT NULL,
+    vacancy_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (run_key, vacancy_id)
+);
+CREATE INDEX IF NOT EXISTS idx_query_vacancies_pos ON query_vacancies(run_key, position);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    run_key TEXT PRIMARY KEY,
+    watermark TEXT,
+    synced_at REAL NOT NULL
+);
+"""
+
+# FTS rows share rowid with `vacancies`; unicode61 folds case for Cyrillic and
+# morphology is approximated by prefix queries over stripped endings.
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE vacancies_fts USING fts5(
+    title, snippet, description_text,
+    tokenize = "unicode61 remove_diacritics 2"
+)
+"""
+
+_FTS_REFRESH_SQL = """
+INSERT INTO vacancies_fts (rowid, title, snippet, description_text)
+SELECT rowid, COALESCE(title, ''), COALESCE(responsibility, '') || ' ' || COALESCE(requirement, ''), COALESCE(description_text, '')
+FROM vacancies WHERE id IN ({placeholders})
+"""
+
+# bm25 column weights: title, snippet, description
+_FTS_WEIGHTS = (10.0, 3.0, 1.0)
+
+_initialized: set = set()
+
+
+def connect(path: Optional[Path] = None) -> sqlite3.Connection:
+    """Open the store, creating the schema on first use."""
+    db_path = Path(path or STORE_PATH)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.row_factory = sqlite3.Row
+    key = str(db_path)
+    if key not in _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        run_columns = {r["name"] for r in conn.execute("PRAGMA table_info(query_runs)")}
+        if "depth" not in run_columns:
+            # Stores created before runs recorded their depth
+            conn.execute("ALTER TABLE query_runs ADD COLUMN depth INTEGER")
+        has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'vacancies_fts'").fetchone()
+        if not has_fts:
+            with conn:
+                conn.execute(_FTS_SCHEMA)
+                # Backfill stores created before the index existed
+                conn.execute(
+                    "INSERT INTO vacancies_fts (rowid, title, snippet, description_text) "
+                    "SELECT rowid, COALESCE(title, ''), COALESCE(responsibility, '') || ' ' || COALESCE(requirement, ''), "
+                    "COALESCE(description_text, '') FROM vacancies"
+                )
+        _initialized.add(key)
+    return conn
+
+
+def _refresh_fts(conn: sqlite3.Connection, ids: List[str]) -> None:
+    """Re-index the given vacancy ids from their current rows."""
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        conn.execute(
+            f"DELETE FROM vacancies_fts WHERE rowid IN (SELECT rowid FROM vacancies WHERE id IN ({placeholders}))",
+            chunk,
+        )
+        conn.execute(_FTS_REFRESH_SQL.format(placeholders=placeholders), chunk)
+
+
+def run_key(query: Optional[str], area: Optional[int], employer_id: Optional[str] = None) -> str:
+    """Stable key for a (query, area[, employer]) fetch."""
+    q = (query or "").strip().lower()
+    parts = [f"q={q}", f"area={area if area is not None else ''}"]
+    if employer_id:
+        parts.append(f"employer={employer_id}")
+    return "|".join(parts)
+
+
+def _row_values(item: Dict[str, Any], now: float) -> tuple:
+    f = extract_vacancy_fields(item)
+    salary = item.get("salary") or {}
+    area = item.get("area") or {}
+    return (
+        str(f.get("id")),
+        f.get("title"),
+        f.get("area"),
+        area.get("id"),
+        f.get("published_at"),
+        f.get("alternate_url"),
+        salary.get("from"),
+        salary.get("to"),
+        salary.get("currency"),
+        None if salary.get("gross") is None else int(bool(salary.get("gross"))),
+        f.get("salary_avg"),
+        f.get("salary_estimated_monthly"),
+        int(bool(f.get("salary_per_shift"))),
+        f.get("experience"),
+        f.get("responsibility"),
+        f.get("requirement"),
+        f.get("employer_id"),
+        f.get("employer_name"),
+        None if f.get("employer_trusted") is None else int(bool(f.get("employer_trusted"))),
+        f.get("schedule"),
+        item.get("description_text"),
+        json.dumps(slim_vacancy(item), ensure_ascii=False),
+        now,
+    )
+
+
+_UPSERT_SQL = """
+INSERT INTO vacancies (
+    id, title, area, area_id, published_at, alternate_url,
+    salary_from, salary_to, salary_currency, salary_gross,
+    salary_avg, salary_estimated_monthly, salary_per_shift,
+    experience, responsibility, requirement,
+    employer_id, employer_name, employer_trusted, schedule,
+    description_text, item_json, fetched_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    title=excluded.title, area=excluded.area, area_id=excluded.area_id,
+    published_at=excluded.published_at, alternate_url=excluded.alternate_url,
+    salary_from=excluded.salary_from, salary_to=excluded.salary_to,
+    salary_currency=excluded.salary_currency, salary_gross=excluded.salary_gross,
+    salary_avg=excluded.salary_avg, salary_estimated_monthly=excluded.salary_estimated_monthly,
+    salary_per_shift=excluded.salary_per_shift, experience=excluded.experience,
+    responsibility=excluded.responsibility, requirement=excluded.requirement,
+    employer_id=excluded.employer_id, employer_name=excluded.employer_name,
+    employer_trusted=excluded.employer_trusted, schedule=excluded.schedule,
+    description_text=COALESCE(excluded.description_text, vacancies.description_text),
+    item_json=excluded.item_json, fetched_at=excluded.fetched_at
+"""
+
+
+def upsert_vacancies(
+    items: Iterable[Dict[str, Any]],
+    key: Optional[str] = None,
+    complete: bool = True,
+    path: Optional[Path] = None,
+    depth: Optional[int] = None,
+) -> int:
+    """Upsert items by vacancy id. When `key` is given, the items are recorded
+    as the current result set of that run (replacing the previous one);
+    `depth` is how many items a partial fetch asked for (pages*per_page).
+    A partial fetch never replaces the membership of a complete run: its rows
+    are upserted but the run keeps its full id list.
+    Returns the number of rows written.
+    """
+    now = time.time()
+    rows = [_row_values(it, now) for it in items if it.get("id") is not None]
+    conn = connect(path)
+    try:
+        with conn:
+            conn.executemany(_UPSERT_SQL, rows)
+            _refresh_fts(conn, [r[0] for r in rows])
+            if key is not None and not complete:
+                existing = conn.execute("SELECT complete FROM query_runs WHERE run_key = ?", (key,)).fetchone()
+                if existing and existing["complete"]:
+                    key = None
+            if key is not None:
+                conn.execute("DELETE FROM query_vacancies WHERE run_key = ?", (key,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO query_vacancies (run_key, vacancy_id, position) VALUES (?, ?, ?)",
+                    [(key, r[0], pos) for pos, r in enumerate(rows)],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_runs (run_key, fetched_at, complete, item_count, depth) VALUES (?, ?, ?, ?, ?)",
+                    (key, now, int(complete), len(rows), None if complete else depth),
+                )
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def merge_into_run(items: List[Dict[str, Any]], key: str, path: Optional[Path] = None) -> int:
+    """Upsert items and add them to the front of an existing run without
+    dropping its other members. Returns the run size after the merge.
+    """
+    now = time.time()
+    rows = [_row_values(it, now) for it in items if it.get("id") is not None]
+    conn = connect(path)
+    try:
+        with conn:
+            conn.executemany(_UPSERT_SQL, rows)
+            _refresh_fts(conn, [r[0] for r in rows])
+            first = conn.execute("SELECT MIN(position) FROM query_vacancies WHERE run_key = ?", (key,)).fetchone()[0]
+            start = (first if first is not None else 0) - len(rows)
+            conn.executemany(
+                "INSERT OR IGNORE INTO query_vacancies (run_key, vacancy_id, position) VALUES (?, ?, ?)",
+                [(key, r[0], start + pos) for pos, r in enumerate(rows)],
+            )
+            total = conn.execute("SELECT COUNT(*) FROM query_vacancies WHERE run_key = ?", (key,)).fetchone()[0]
+            conn.execute(
+                "UPDATE query_runs SET fetched_at = ?, item_count = ? WHERE run_key = ?",
+                (now, total, key),
+            )
+    finally:
+        conn.close()
+    return total
+
+
+def remove_from_run(ids: Iterable[str], key: str, path: Optional[Path] = None) -> int:
+    """Drop ids from a run's membership (their rows stay). Returns the run size after."""
+    id_list = [str(i) for i in ids]
+    conn = connect(path)
+    try:
+        with conn:
+            for start in range(0, len(id_list), 500):
+                chunk = id_list[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                conn.execute(f"DELETE FROM query_vacancies WHERE run_key = ? AND vacancy_id IN ({placeholders})", [key, *chunk])
+            total = conn.execute("SELECT COUNT(*) FROM query_vacancies WHERE run_key = ?", (key,)).fetchone()[0]
+            conn.execute("UPDATE query_runs SET item_count = ? WHERE run_key = ?", (total, key))
+    finally:
+        conn.close()
+    return total
+
+
+def run_members_published(key: str, path: Optional[Path] = None) -> List[tuple]:
+    """(id, published_at datetime) of a run's members with a parseable date."""
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT q.vacancy_id, v.published_at FROM query_vacancies q JOIN vacancies v ON v.id = q.vacancy_id WHERE q.run_key = ?",
+            (key,),
+        ).fetchall()
+    finally:
+        conn.close()
+    out = []
+    for row in rows:
+        dt = _parse_published(row["published_at"])
+        if dt is not None:
+            out.append((row["vacancy_id"], dt))
+    return out
+
+
+def run_vacancy_ids(key: str, path: Optional[Path] = None) -> List[str]:
+    conn = connect(path)
+    try:
+        return [r[0] for r in conn.execute("SELECT vacancy_id FROM query_vacancies WHERE run_key = ?", (key,))]
+    finally:
+        conn.close()
+
+
+def _parse_published(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+    except ValueError:
+        return None
+
+
+def latest_published(items: Iterable[Dict[str, Any]]) -> Optional[str]:
+    """Return the newest `published_at` string among items (compared as datetimes)."""
+    best: Optional[datetime] = None
+    best_raw: Optional[str] = None
+    for it in items:
+        raw = it.get("published_at")
+        dt = _parse_published(raw)
+        if dt is not None and (best is None or dt > best):
+            best, best_raw = dt, raw
+    return best_raw
+
+
+def get_watermark(key: str, path: Optional[Path] = None) -> Optional[str]:
+    conn = connect(path)
+    try:
+        row = conn.execute("SELECT watermark FROM sync_state WHERE run_key = ?", (key,)).fetchone()
+        return row["watermark"] if row else None
+    finally:
+        conn.close()
+
+
+def set_watermark(key: str, watermark: Optional[str], path: Optional[Path] = None) -> None:
+    conn = connect(path)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (run_key, watermark, synced_at) VALUES (?, ?, ?)",
+                (key, watermark, time.time()),
+            )
+    finally:
+        conn.close()
+
+
+def get_run(key: str, path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    conn = connect(path)
+    try:
+        row = conn.execute("SELECT * FROM query_runs WHERE run_key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def run_covers(run: Dict[str, Any], depth: Optional[int]) -> bool:
+    """True if a recorded run holds the first `depth` results (None = all of them)."""
+    if run.get("complete"):
+        return True
+    if depth is None:
+        return False
+    listed = run.get("depth")
+    if listed is None:
+        # Runs recorded before depth was tracked only vouch for the items they hold
+        return run.get("item_count", 0) >= depth
+    # Fewer items than asked for means the search ran out: deeper pages are empty too
+    return listed >= depth or run.get("item_count", 0) < listed
+
+
+def is_fresh(
+    key: str,
+    need_complete: bool = False,
+    max_age: Optional[int] = None,
+    path: Optional[Path] = None,
+    depth: Optional[int] = None,
+) -> bool:
+    """True if the run was recorded within `max_age` seconds and covers the request:
+    complete if required, otherwise at least `depth` items deep when given."""
+    run = get_run(key, path)
+    if not run:
+        return False
+    if need_complete and not run.get("complete"):
+        return False
+    if depth is not None and not run_covers(run, depth):
+        return False
+    age_limit = STORE_FRESH_SECONDS if max_age is None else max_age
+    return (time.time() - float(run["fetched_at"])) <= age_limit
+
+
+def _row_to_item(row: sqlite3.Row) -> Dict[str, Any]:
+    item = json.loads(row["item_json"])
+    if row["description_text"] and not item.get("description_text"):
+        item["description_text"] = row["description_text"]
+    return item
+
+
+def load_run_items(key: str, limit: Optional[int] = None, path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Return stored items of a run in their original order."""
+    sql = (
+        "SELECT v.item_json, v.description_text FROM query_vacancies q "
+        "JOIN vacancies v ON v.id = q.vacancy_id WHERE q.run_key = ? ORDER BY q.position"
+    )
+    params: List[Any] = [key]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    conn = connect(path)
+    try:
+        return [_row_to_item(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def query_vacancies(
+    area_id: Optional[int] = None,
+    employer_id: Optional[str] = None,
+    schedule: Optional[str] = None,
+    published_from: Optional[str] = None,
+    salary_min: Optional[float] = None,
+    limit: Optional[int] = None,
+    path: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """Indexed lookup over all stored vacancies, newest first."""
+    clauses: List[str] = []
+    params: List[Any] = []
+    if area_id is not None:
+        clauses.append("area_id = ?")
+        params.append(str(area_id))
+    if employer_id is not None:
+        clauses.append("employer_id = ?")
+        params.append(str(employer_id))
+    if schedule is not None:
+        clauses.append("schedule = ?")
+        params.append(schedule)
+    if published_from is not None:
+        clauses.append("published_at >= ?")
+        params.append(published_from)
+    if salary_min is not None:
+        clauses.append("salary_avg >= ?")
+        params.append(float(salary_min))
+    sql = "SELECT item_json, description_text FROM vacancies"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY published_at DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    conn = connect(path)
+    try:
+        return [_row_to_item(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+_RU_ENDING = re.compile(r"(?:[аяоеёиыуюйьэ]{1,2}|ов|ев|ам|ям|ах|ях|ом|ем)$")
+
+
+def _stem(word: str) -> str:
+    """Crude Russian stem: drop a short inflectional ending from longer words."""
+    if len(word) >= 5 and re.search(r"[а-яё]", word):
+        stripped = _RU_ENDING.sub("", word)
+        if len(stripped) >= 4:
+            return stripped
+    return word
+
+
+def build_fts_query(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression.
+    Quoted parts are matched as phrases; other words become prefix terms over
+    their stems (so 'водителя' also finds 'водитель'). All parts are ANDed.
+    """
+    if not text or not text.strip():
+        return None
+    parts: List[str] = []
+    for phrase in re.findall(r'"([^"]+)"', text):
+        words = re.findall(r"\w+", phrase.lower())
+        if words:
+            parts.append('"' + " ".join(words) + '"')
+    rest = re.sub(r'"[^"]*"', " ", text)
+    for word in re.findall(r"\w+", rest.lower()):
+        parts.append(f'"{_stem(word)}"*')
+    return " AND ".join(parts) if parts else None
+
+
+def search_vacancies(text: str, area_id: Optional[int] = None, limit: Optional[int] = None, path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Full-text search over stored titles, snippets and descriptions, best matches first."""
+    match = build_fts_query(text)
+    sql = (
+        "SELECT v.item_json, v.description_text FROM vacancies_fts f JOIN vacancies v ON v.rowid = f.rowid "
+        "WHERE vacancies_fts MATCH ?"
+    )
+    params: List[Any] = [match]
+    if match is None:
+        # Empty query: every stored vacancy, like an empty hh.ru search
+        sql = "SELECT v.item_json, v.description_text FROM vacancies v WHERE 1 = 1"
+        params = []
+    if area_id is not None:
+        sql += " AND v.area_id = ?"
+        params.append(str(area_id))
+    if match is not None:
+        sql += " ORDER BY bm25(vacancies_fts, {}, {}, {})".format(*_FTS_WEIGHTS)
+    else:
+        sql += " ORDER BY v.published_at DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    conn = connect(path)
+    try:
+        return [_row_to_item(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def store_stats(path: Optional[Path] = None) -> Dict[str, Any]:
+    conn = connect(path)
+    try:
+        vacancies = conn.execute("SELECT COUNT(*) FROM vacancies").fetchone()[0]
+        runs = conn.execute("SELECT COUNT(*) FROM query_runs").fetchone()[0]
+    finally:
+        conn.close()
+    return {"path": str(path or STORE_PATH), "vacancies": vacancies, "runs": runs, "fresh_seconds": STORE_FRESH_SECONDS}
+
+
+async def sync_vacancies(query: str, area: Optional[int] = None, per_page: int = 100) -> Dict[str, Any]:
+    """Refresh a fetch-all run incrementally using its published_at watermark.
+    - First sync (no watermark or run): full fetch, recorded as the run.
+    - Later syncs: request only vacancies with date_from=watermark and merge them in.
+      One extra count-only request reads the live total. When the stored run no
+      longer matches it (closed vacancies, normal churn), the differing
+      published-date windows are found by count probes and only those are listed,
+      so vanished ids expire at a cost proportional to the churn
+      (`reconcile_run_ids`). The run is re-listed in full only when the drift is
+      over SYNC_RELIST_DRIFT of the total or reconciling would cost more than
+      re-listing. Stored rows and descriptions are kept either way.
+    Returns {"items", "new_ids", "mode", "found", "expired", "reconcile_calls"};
+    mode is "full", "incremental", "reconciled" or "relisted".
+    """
+    key = run_key(query, area)
+    watermark = await asyncio.to_thread(get_watermark, key)
+    run = await asyncio.to_thread(get_run, key)
+    if not watermark or not run or not run.get("complete"):
+        meta: Dict[str, Any] = {}
+        items = await fetch_vacancies(query=query, area=area, pages=None, per_page=per_page, meta=meta)
+        await asyncio.to_thread(upsert_vacancies, items, key, True)
+        await asyncio.to_thread(set_watermark, key, latest_published(items))
+        return {"items": items, "new_ids": [str(it.get("id")) for it in items], "mode": "full", "found": meta.get("found"), "expired": 0, "reconcile_calls": None}
+
+    known_ids = set(await asyncio.to_thread(run_vacancy_ids, key))
+    fresh = await fetch_vacancies(query=query, area=area, pages=None, per_page=per_page, date_from=watermark)
+    new_ids = [str(it.get("id")) for it in fresh if str(it.get("id")) not in known_ids]
+    total = await asyncio.to_thread(merge_into_run, fresh, key)
+    await asyncio.to_thread(set_watermark, key, latest_published(fresh) or watermark)
+
+    expected = (await fetch_vacancy_counts(query=query, area=area))["found"]
+    mode, expired, calls = "incremental", 0, None
+    if expected != total:
+        # What a full re-list would cost; reconciling has to come in under it
+        relist_calls = max(1, math.ceil(expected / per_page))
+        drift = abs(expected - total)
+        result = None
+        if drift <= SYNC_RELIST_DRIFT * max(expected, total):
+            members = await asyncio.to_thread(run_members_published, key)
+            result = await reconcile_run_ids(query, area, members, max_calls=relist_calls)
+        if result is None:
+            listed = await fetch_vacancies(query=query, area=area, pages=None, per_page=per_page)
+            expired = len(known_ids - {str(it.get("id")) for it in listed})
+            await asyncio.to_thread(upsert_vacancies, listed, key, True)
+            mode = "relisted"
+        else:
+            if result["missing"]:
+                new_ids.extend(str(it.get("id")) for it in result["missing"] if str(it.get("id")) not in known_ids)
+                await asyncio.to_thread(merge_into_run, result["missing"], key)
+            if result["vanished"]:
+                await asyncio.to_thread(remove_from_run, result["vanished"], key)
+            expired, calls = len(result["vanished"]), result["calls"]
+            mode = "reconciled"
+    record_items("expired", expired)
+    print(f"🔄 Synced '{query}' (area={area}): {mode}, {len(new_ids)} new, {expired} expired, live total {expected}")
+    items = await asyncio.to_thread(load_run_items, key)
+    return {"items": items, "new_ids": new_ids, "mode": mode, "found": expected, "expired": expired, "reconcile_calls": calls}
+
+
+async def fetch_vacancies_via_store(
+    query: str,
+    area: Optional[int] = None,
+    pages: Optional[int] = None,
+    per_page: int = 100,
+    source: str = "auto",
+    incremental: bool = False,
+) -> List[Dict[str, Any]]:
+    """Fetch vacancies answering from the local store when possible.
+    - source="store": always read the store (empty list if the run was never recorded)
+    - source="auto": read the store if the run is fresh, otherwise fetch live and record it
+    - source="hh": always fetch live and record the result
+    - source="index": full-text search over everything accumulated in the store
+    - incremental: when a fetch-all run has to go to hh.ru, refresh it with
+      `sync_vacancies` instead of re-downloading every page
+    """
+    key = run_key(query, area)
+    limit = pages * per_page if pages is not None else None
+    if source == "index":
+        return await asyncio.to_thread(search_vacancies, query, area, limit)
+    if source == "auto":
+        fresh = await asyncio.to_thread(is_fresh, key, pages is None, depth=limit)
+        record_cache("vacancy_store", hits=int(fresh), misses=int(not fresh))
+        if fresh:
+            return await asyncio.to_thread(load_run_items, key, limit)
+    if source == "store":
+        return await asyncio.to_thread(load_run_items, key, limit)
+    if incremental and pages is None:
+        result = await sync_vacancies(query=query, area=area, per_page=per_page)
+        return result["items"]
+    items = await fetch_vacancies(query=query, area=area, pages=pages, per_page=per_page)
+    try:
+        await asyncio.to_thread(upsert_vacancies, items, key, pages is None, depth=limit)
+    except Exception as e:
+        print(f"Vacancy store write failed: {e}")
+    return items